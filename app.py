@@ -1,15 +1,27 @@
 from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+import calendar
 import json
 import os
-from datetime import datetime
+import threading
+from datetime import date, datetime
 import hashlib
-import pandas as pd
 from werkzeug.utils import secure_filename
 
 from colorimetry_analyzer import ColorimetryAnalyzer
 from outfit_generator import OutfitGenerator
-from wardrobe_manager import WardrobeManager
-from clothing_database import ClothingDatabase
+from wardrobe_manager import WardrobeManager, wardrobe_cache
+from wardrobe_import import detect_format, parse_rows
+from file_store import atomic_write_json, file_lock
+from clothing_database import ClothingDatabase, OCASIONES, CLIMAS, ESTACIONES
+from columnar_catalog import ColumnarClothingDatabase
+from sqlite_catalog import SQLiteClothingDatabase
+from clima_index import MESES, ClimaIndex, categorizar_clima
+from item_tags import PALABRAS_FEMENINAS, has_tag
+from color_engine import compile_palettes, get_palette
+from feature_matrix import FeatureMatrix, top_k
+from outfit_search import MAX_CANDIDATES, OutfitSearch
+from outfit_planner import PRIORIDAD_ARMARIO, assign_slot, dias_del_plan
+from recommendation_matrix import GENEROS, NOMBRE, open_matrix
 from gtts import gTTS
 
 app = Flask(__name__)
@@ -31,8 +43,20 @@ USERS_FILE = 'data/users.json'
 
 # Inicializar módulos
 colorimetry_analyzer = ColorimetryAnalyzer()
+# Paletas HEX de cada estación convertidas a CIELAB una sola vez
+palettes_lab = compile_palettes(colorimetry_analyzer.paletas)
 outfit_generator = OutfitGenerator()
-clothing_db = ClothingDatabase()
+# CATALOG_BACKEND=columnar -> catálogo en columnas (menos memoria por worker)
+# CATALOG_BACKEND=sqlite   -> catálogo en SQLite (data/clothing_items.sqlite)
+if os.environ.get('CATALOG_BACKEND') == 'columnar':
+    clothing_db = ColumnarClothingDatabase()
+elif os.environ.get('CATALOG_BACKEND') == 'sqlite':
+    clothing_db = SQLiteClothingDatabase(readonly=True)
+else:
+    clothing_db = ClothingDatabase(readonly=True)
+clima_index = ClimaIndex()
+# Recomendaciones de catálogo precalculadas (python recommendation_matrix.py build)
+recommendation_matrix = open_matrix(catalog_file=clothing_db.db_file, xlsx_file=clima_index.xlsx_file)
 
 # ========== FUNCIONES DE USUARIO ==========
 
@@ -88,91 +112,51 @@ def _sanitize_email(email):
 # ========== FUNCIONES DE HISTORIAL ==========
 
 def save_to_history(user_email, result_data):
-    """Guarda consulta en el historial del usuario"""
+    """
+    Guarda consulta en el historial del usuario.
+    Lectura-modificación-escritura bajo el cerrojo del fichero (varios
+    workers pueden guardar a la vez) y sustitución atómica del JSON.
+    """
     history_file = f'data/history/{_sanitize_email(user_email)}.json'
     
-    # Cargar historial existente
-    history = []
-    if os.path.exists(history_file):
-        try:
-            with open(history_file, 'r', encoding='utf-8') as f:
-                history = json.load(f)
-        except:
-            history = []
-    
-    # Añadir nueva consulta
-    history.append({
-        'timestamp': datetime.now().isoformat(),
-        'result': result_data
-    })
-    
-    # Guardar (mantener solo las últimas 20 consultas)
-    with open(history_file, 'w', encoding='utf-8') as f:
-        json.dump(history[-20:], f, indent=2, ensure_ascii=False)
+    with file_lock(history_file):
+        # Cargar historial existente
+        history = []
+        if os.path.exists(history_file):
+            try:
+                with open(history_file, 'r', encoding='utf-8') as f:
+                    history = json.load(f)
+            except ValueError as e:
+                # No se pierde: se aparta el fichero dañado y se empieza uno nuevo
+                print(f"Historial dañado ({history_file}): {e}")
+                os.replace(history_file, history_file + '.corrupt')
+        
+        # Añadir nueva consulta
+        history.append({
+            'timestamp': datetime.now().isoformat(),
+            'result': result_data
+        })
+        
+        # Guardar (mantener solo las últimas 20 consultas)
+        atomic_write_json(history_file, history[-20:], indent=2, ensure_ascii=False)
 
 def get_user_history(user_email):
-    """Obtiene historial de consultas del usuario"""
+    """Obtiene historial de consultas del usuario (sin cerrojo: se escribe de forma atómica)"""
     history_file = f'data/history/{_sanitize_email(user_email)}.json'
-    if os.path.exists(history_file):
-        try:
-            with open(history_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return []
-    return []
-
-# ========== FUNCIONES DE CLIMA ==========
-
-def load_clima_data():
-    """Carga datos climáticos desde Excel"""
     try:
-        # Carga datos
-        df = pd.read_excel('data/clima_provincias.xlsx')
-        print(" DEBUG: Archivo clima_provincias.xlsx cargado con éxito.")
-        return df
+        with open(history_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
     except FileNotFoundError:
-        # Se activa si el archivo no se encuentra en la ruta esperada
-        print(" Archivo clima_provincias.xlsx no encontrado (Fallo en la ruta).")
-        return None
-    except Exception as e:
-        # En caso de que no se cargue el excel
-        print(f" ERROR CRÍTICO al cargar clima_provincias.xlsx. Causa: {e}")
-        return None
+        return []
+    except (OSError, ValueError) as e:
+        print(f"Error leyendo historial {history_file}: {e}")
+        return []
+
+# ========== FUNCIONES DE CLIMA ==========
 
 def get_clima_info(provincia, mes):
     """Obtiene información climática de provincia y mes"""
-    df = load_clima_data()
-    
-    # Valores por defecto según provincia y mes (datos aproximados de España)
-    defaults_by_month = {
-        'Diciembre': {'temperatura': 11, 'prob_lluvia': 60},
-        'Enero': {'temperatura': 10, 'prob_lluvia': 55},
-        'Febrero': {'temperatura': 11, 'prob_lluvia': 50},
-        'Marzo': {'temperatura': 13, 'prob_lluvia': 45},
-        'Abril': {'temperatura': 15, 'prob_lluvia': 50},
-        'Mayo': {'temperatura': 18, 'prob_lluvia': 45},
-        'Junio': {'temperatura': 22, 'prob_lluvia': 30},
-        'Julio': {'temperatura': 25, 'prob_lluvia': 20},
-        'Agosto': {'temperatura': 25, 'prob_lluvia': 20},
-        'Septiembre': {'temperatura': 23, 'prob_lluvia': 35},
-        'Octubre': {'temperatura': 18, 'prob_lluvia': 50},
-        'Noviembre': {'temperatura': 13, 'prob_lluvia': 60}
-    }
-    
-    if df is None:
-        return defaults_by_month.get(mes, {"temperatura": 18, "prob_lluvia": 40})
-    
-    try:
-        row = df[(df['Provincia'] == provincia) & (df['Mes'] == mes)]
-        if not row.empty:
-            return {
-                "temperatura": int(row.iloc[0]['Temp_media']),
-                "prob_lluvia": int(row.iloc[0]['Prob_lluvia'])
-            }
-    except Exception as e:
-        print(f"Error al obtener clima: {e}")
-    
-    return defaults_by_month.get(mes, {"temperatura": 18, "prob_lluvia": 40})
+    return clima_index.get(provincia, mes)
 
 # ========== FUNCIONES DE AUDIO ==========
 
@@ -326,6 +310,14 @@ def results():
 
 # ========== FUNCIONES DE GENERACIÓN INTELIGENTE ==========
 
+# Mensajes de depuración del generador (se silencian por hilo al precalcular)
+_debug_state = threading.local()
+
+def _debug(message):
+    """print() salvo en el hilo que está precalculando outfits"""
+    if not getattr(_debug_state, 'quiet', False):
+        print(message)
+
 def detectar_preferencia_masculina(no_vestidos, no_faldas, no_tops, genero=None):
     """
     Detecta si el usuario tiene preferencia masculina.
@@ -337,7 +329,7 @@ def detectar_preferencia_masculina(no_vestidos, no_faldas, no_tops, genero=None)
         return True
     
     if no_vestidos and no_faldas and no_tops:
-        print(f"    Preferencia MASCULINA detectada (no vestidos + no faldas + no tops)")
+        _debug(f"    Preferencia MASCULINA detectada (no vestidos + no faldas + no tops)")
         return True
     
     return False
@@ -355,30 +347,22 @@ def filtrar_prendas_femeninas(items, categoria):
     - pendientes, aretes, diadema
     """
     
-    palabras_femeninas = {
-        'calzado': ['alpargata', 'sandalia'],
-        'complemento': ['bolso', 'bolsa', 'cartera', 'collar', 'pendiente', 'diadema', 'horquilla', 'pañuelo']
-    }
-    
-    if categoria not in palabras_femeninas:
+    if categoria not in PALABRAS_FEMENINAS:
         return items
     
     filtradas = []
     for item in items:
-        nombre = item.get('nombre', '').lower()
-        
-        # Verificar si contiene palabras femeninas
-        es_femenina = any(palabra in nombre for palabra in palabras_femeninas[categoria])
-        
-        if not es_femenina:
+        # Etiqueta precalculada al cargar/añadir la prenda (item_tags)
+        if not has_tag(item, 'is_feminine'):
             filtradas.append(item)
         else:
-            print(f"    Filtrado (femenino): {item.get('nombre')}")
+            _debug(f"    Filtrado (femenino): {item.get('nombre')}")
     
     return filtradas
 
 def generate_smart_outfit(user_items, db_items, ocasion, clima, temperatura, prob_lluvia, 
-                          estacion, palette_colors, fit_preference, no_vestidos, no_faldas, no_pantalones, no_tops=False, genero=None):
+                          estacion, palette_colors, fit_preference, no_vestidos, no_faldas, no_pantalones, no_tops=False, genero=None,
+                          user_features=None):
     """
     Genera outfit INTELIGENTE combinando prendas del usuario y base de datos.
     
@@ -387,204 +371,302 @@ def generate_smart_outfit(user_items, db_items, ocasion, clima, temperatura, pro
     2. Si hay vestido → NO buscar superior/inferior
     3. Clima inteligente: lluvia alta → botas/abrigo
     4. Colores de la paleta del usuario
+    
+    Sin prendas del usuario el resultado solo depende del catálogo y de
+    (ocasión, clima, estación, paleta, no_vestidos, preferencia masculina),
+    así que se sirve desde la tabla materializada de la base de datos.
+    
+    user_features: FeatureMatrix ya construida del armario (WardrobeManager.feature_matrix),
+    para no codificar user_items en cada petición.
+    """
+    args = (user_items, db_items, ocasion, clima, temperatura, prob_lluvia, estacion, palette_colors,
+            fit_preference, no_vestidos, no_faldas, no_pantalones, no_tops, genero)
+    
+    if not user_items:
+        preferencia_masculina = detectar_preferencia_masculina(no_vestidos, no_faldas, no_tops, genero)
+        key = ('smart', ocasion, clima, estacion, tuple(palette_colors), bool(no_vestidos), preferencia_masculina)
+        return db_items.get_materialized_outfit(key, lambda: _build_smart_outfit(*args))
+    
+    return _build_smart_outfit(*args, user_features=user_features)
+
+def warm_catalog_outfits(db):
     """
+    Precalcula la tabla de outfits del catálogo (usuarios sin armario)
+    para todas las combinaciones ocasión x clima x estación x paleta.
+    Se usa al arrancar y, al recargar el catálogo, antes de publicar la
+    nueva versión.
+    """
+    palettes = [p['colores_texto'] for p in colorimetry_analyzer.paletas.values()]
     
-    outfit = {}
+    # Los mensajes de depuración por prenda no aportan nada al precalcular
+    _debug_state.quiet = True
+    try:
+        for ocasion in OCASIONES:
+            for clima in CLIMAS:
+                for estacion in ESTACIONES:
+                    for palette_colors in palettes:
+                        for no_vestidos in (False, True):
+                            for genero in ('mujer', 'hombre'):
+                                generate_smart_outfit(
+                                    user_items=[], db_items=db, ocasion=ocasion, clima=clima,
+                                    temperatura=20, prob_lluvia=30, estacion=estacion,
+                                    palette_colors=palette_colors, fit_preference=None,
+                                    no_vestidos=no_vestidos, no_faldas=False, no_pantalones=False,
+                                    no_tops=False, genero=genero
+                                )
+        db.build_outfit_table(palettes)
+    finally:
+        _debug_state.quiet = False
+
+def _build_smart_outfit(user_items, db_items, ocasion, clima, temperatura, prob_lluvia, 
+                        estacion, palette_colors, fit_preference, no_vestidos, no_faldas, no_pantalones, no_tops=False, genero=None,
+                        user_features=None):
+    """
+    Construye el outfit (ver generate_smart_outfit): la mejor prenda de
+    cada hueco según _rank_outfit_slots.
+    Mismas reglas y mismas elecciones que la versión con listas
+    (benchmarks._legacy_smart_outfit).
+    """
+    ranked = _rank_outfit_slots(user_items, db_items, ocasion, clima, temperatura, prob_lluvia,
+                                estacion, palette_colors, fit_preference, no_vestidos, no_faldas, no_pantalones,
+                                no_tops, genero, k=1, user_features=user_features)
+    return {slot: candidates[0] for slot, candidates in ranked.items()}
+
+def generate_outfit_alternatives(user_items, db_items, ocasion, clima, temperatura, prob_lluvia, 
+                                 estacion, palette_colors, fit_preference, no_vestidos, no_faldas, no_pantalones,
+                                 no_tops=False, genero=None, k=3, user_features=None):
+    """
+    Alternativas ordenadas por hueco: las k mejores prendas de cada uno,
+    con las mismas reglas que generate_smart_outfit (la primera de cada
+    lista es la que elige el outfit).
+    
+    Returns:
+        dict: hueco -> lista de hasta k prendas, de mejor a peor
+    """
+    return _rank_outfit_slots(user_items, db_items, ocasion, clima, temperatura, prob_lluvia,
+                              estacion, palette_colors, fit_preference, no_vestidos, no_faldas, no_pantalones,
+                              no_tops, genero, k=k, user_features=user_features)
+
+def generate_top_outfits(user_items, db_items, ocasion, clima, temperatura, prob_lluvia, 
+                         estacion, palette_colors, fit_preference, no_vestidos, no_faldas, no_pantalones,
+                         no_tops=False, genero=None, n=5, user_features=None):
+    """
+    Los n mejores outfits completos (vestido o superior + inferior, más
+    calzado y complemento) puntuando la paleta de cada prenda y la armonía
+    de color entre ellas. Las candidatas de cada hueco son las mejores
+    MAX_CANDIDATES con las mismas reglas que generate_smart_outfit
+    (lluvia, frío, preferencia masculina, no faldas/pantalones).
+    
+    Returns:
+        list: [{'outfit': {hueco: prenda}, 'score': float}], de mejor a peor
+    """
+    ranked = _rank_outfit_slots(user_items, db_items, ocasion, clima, temperatura, prob_lluvia,
+                                estacion, palette_colors, fit_preference, no_vestidos, no_faldas, no_pantalones,
+                                no_tops, genero, k=MAX_CANDIDATES, user_features=user_features, separates=True)
+    comunes = [(slot, ranked.get(slot, [])) for slot in ('calzado', 'complemento')]
+    structures = []
+    if ranked.get('vestido'):
+        structures.append([('vestido', ranked['vestido'])] + comunes)
+    if ranked.get('superior') or ranked.get('inferior'):
+        structures.append([(slot, ranked.get(slot, [])) for slot in ('superior', 'inferior')] + comunes)
+    if not structures:
+        structures.append(comunes)
+    return OutfitSearch(structures, get_palette(palette_colors)).top(n)
+
+def generate_outfit_plan(user_items, db_items, provincia, mes, n_dias, ventana, ocasion,
+                         estacion, palette_colors, fit_preference, no_vestidos, no_faldas, no_pantalones,
+                         no_tops=False, genero=None, dia_inicio=1, user_features=None):
+    """
+    Plan de outfits para n_dias seguidos sin repetir ninguna prenda dentro
+    de una ventana de `ventana` días, con el clima de cada día.
+
+    El clima es mensual (ClimaIndex), así que los días se agrupan por
+    contexto (clima, temperatura, lluvia) y las candidatas de cada hueco se
+    calculan una sola vez por contexto con _rank_outfit_slots. Si el armario
+    tiene menos de `ventana` prendas para un hueco se completa con el
+    catálogo; las del armario van siempre antes (PRIORIDAD_ARMARIO).
+
+    Cada día lleva vestido o superior + inferior: primero se reparten los
+    vestidos del armario (o del catálogo si el armario no tiene ni vestidos
+    ni superiores/inferiores) y los días en que el vestido se repetiría
+    pasan a superior + inferior. Después cada hueco se reparte entre sus
+    días con assign_slot (asignación óptima por bloques); solo si no queda
+    ninguna candidata libre se repite y se marca.
+
+    Returns:
+        list: por día {'fecha', 'mes', 'clima', 'temperatura', 'prob_lluvia',
+              'outfit_items', 'repetidas'}
+    """
+    palette = get_palette(palette_colors)
+    k = min(max(ventana, 1) + 2, MAX_CANDIDATES)
+    dias = dias_del_plan(mes, n_dias, dia_inicio)
+    propias = {item.get('id') for item in user_items}
+
+    def candidatas(items):
+        """(prenda, puntuación) con prioridad para las del armario"""
+        scores = palette.scores(items).tolist()
+        return [(item, score + PRIORIDAD_ARMARIO if item.get('id') in propias else score)
+                for item, score in zip(items, scores)]
+
+    contextos = {}
+    dia_contexto = []
+    for fecha, mes_dia in dias:
+        clima_info = get_clima_info(provincia, mes_dia)
+        temperatura = clima_info.get('temperatura', 20)
+        prob_lluvia = clima_info.get('prob_lluvia', 30)
+        key = (categorizar_clima(temperatura), temperatura, prob_lluvia)
+        if key not in contextos:
+            ranked = _rank_outfit_slots(user_items, db_items, ocasion, key[0], temperatura, prob_lluvia,
+                                        estacion, palette_colors, fit_preference, no_vestidos, no_faldas,
+                                        no_pantalones, no_tops, genero, k=k, user_features=user_features,
+                                        separates=True, fill=ventana)
+            contexto = {slot: candidatas(items) for slot, items in ranked.items()}
+            # Vestidos del catálogo solo si el armario no tiene con qué vestir el cuerpo
+            vestidos = contexto.get('vestido', [])
+            propios = [c for c in vestidos if c[0].get('id') in propias]
+            separados = any(c[0].get('id') in propias
+                            for slot in ('superior', 'inferior') for c in contexto.get(slot, []))
+            contexto['vestido'] = propios or ([] if separados else vestidos)
+            contextos[key] = contexto
+        dia_contexto.append(key)
+
+    plan = [
+        {'fecha': fecha.isoformat(), 'mes': mes_dia, 'clima': key[0], 'temperatura': key[1],
+         'prob_lluvia': key[2], 'outfit_items': {}, 'repetidas': []}
+        for (fecha, mes_dia), key in zip(dias, dia_contexto)
+    ]
+    def asignar(slot, dias_slot, repetir=True):
+        """Reparte un hueco entre los días indicados (índices del plan)"""
+        por_dia = [contextos[dia_contexto[d]].get(slot) if d in dias_slot else None
+                   for d in range(len(plan))]
+        return assign_slot(por_dia, ventana, repetir)
+
+    # Vestido o superior + inferior: los días sin vestido libre llevan
+    # superior + inferior; solo si ese día no hay ninguno se repite vestido
+    con_vestido = set()
+    for d, elegida in enumerate(asignar('vestido', set(range(len(plan))), repetir=False)):
+        contexto = contextos[dia_contexto[d]]
+        if elegida is not None:
+            plan[d]['outfit_items']['vestido'] = elegida[0]
+        elif contexto.get('vestido') and not (contexto.get('superior') or contexto.get('inferior')):
+            plan[d]['outfit_items']['vestido'] = max(contexto['vestido'], key=lambda c: c[1])[0]
+            plan[d]['repetidas'].append('vestido')
+        else:
+            continue
+        con_vestido.add(d)
+
+    sin_vestido = set(range(len(plan))) - con_vestido
+    todos = set(range(len(plan)))
+    for slot, dias_slot in (('superior', sin_vestido), ('inferior', sin_vestido),
+                            ('calzado', todos), ('complemento', todos)):
+        for dia, elegida in zip(plan, asignar(slot, dias_slot)):
+            if elegida is None:
+                continue
+            item, repetida = elegida
+            dia['outfit_items'][slot] = item
+            if repetida:
+                dia['repetidas'].append(slot)
+    return plan
+
+def _rank_outfit_slots(user_items, db_items, ocasion, clima, temperatura, prob_lluvia, 
+                       estacion, palette_colors, fit_preference, no_vestidos, no_faldas, no_pantalones, no_tops=False, genero=None,
+                       k=1, user_features=None, separates=False, fill=0):
+    """
+    Candidatas de cada hueco sobre matrices de características: armario y
+    catálogo se filtran con máscaras NumPy y de cada hueco se extraen las
+    k mejores por puntuación de color (top-k, sin ordenar la lista entera).
+    Si el armario tiene candidatas para un hueco, solo se usan las suyas.
+    Con separates=True se clasifican superior e inferior aunque haya vestido.
+    Con fill, si el armario tiene menos de fill candidatas para un hueco se
+    completan hasta k con las mejores del catálogo (detrás de las suyas).
     
-    # DETECTAR PREFERENCIA MASCULINA
+    Returns:
+        dict: hueco -> lista de prendas, de mejor a peor
+    """
+    ranked = {}
     preferencia_masculina = detectar_preferencia_masculina(no_vestidos, no_faldas, no_tops, genero)
+    palette = get_palette(palette_colors)
     
-    def match_item(item, ocasion, clima, estacion, palette_colors):
-        """Verifica si una prenda cumple las condiciones - CASE INSENSITIVE"""
-        # Ocasión - manejar string o array
-        item_ocasiones = item.get('ocasion', [])
-        if isinstance(item_ocasiones, str):
-            try:
-                # Intentar parsear si es JSON string
-                import json
-                item_ocasiones = json.loads(item_ocasiones)
-            except:
-                item_ocasiones = [item_ocasiones]
-        if not isinstance(item_ocasiones, list):
-            item_ocasiones = [item_ocasiones]
-        
-        # CASE INSENSITIVE comparison
-        if ocasion.lower() not in [o.lower() for o in item_ocasiones]:
-            return False
-        
-        # Clima - manejar string o array
-        item_climas = item.get('clima_apropiado', item.get('clima', []))
-        if isinstance(item_climas, str):
-            try:
-                import json
-                item_climas = json.loads(item_climas)
-            except:
-                item_climas = [item_climas]
-        if not isinstance(item_climas, list):
-            item_climas = [item_climas]
-        
-        # CASE INSENSITIVE comparison
-        if clima.lower() not in [c.lower() for c in item_climas]:
-            return False
-        
-        # Estación 
-        if 'estacion' in item:
-            item_estaciones = item.get('estacion', [])
-            if isinstance(item_estaciones, str):
-                try:
-                    import json
-                    item_estaciones = json.loads(item_estaciones)
-                except:
-                    item_estaciones = [item_estaciones]
-            if not isinstance(item_estaciones, list):
-                item_estaciones = [item_estaciones]
-            
-            # CASE INSENSITIVE comparison
-            if estacion not in [e for e in item_estaciones]:
-                return False
-        
-        return True
+    user_fm = user_features if user_features is not None else FeatureMatrix(user_items, user=True)
+    db_fm = db_items.feature_matrix()
+    user_scores = user_fm.color_scores(palette)
+    # El catálogo solo se puntúa si algún hueco no se cubre con el armario
+    db_scores = []
     
-    def color_match_score(item, palette_colors):
-        """Score de coincidencia de color - CASE INSENSITIVE"""
-        item_colors = item.get('color', [])
-        
-        # Manejar string JSON
-        if isinstance(item_colors, str):
-            try:
-                import json
-                item_colors = json.loads(item_colors)
-            except:
-                item_colors = [item_colors]
-        
-        if not isinstance(item_colors, list):
-            item_colors = [item_colors]
-        
-        # Keywords de la paleta en minúsculas
-        palette_keywords = set()
-        for color_name in palette_colors:
-            words = color_name.lower().split()
-            palette_keywords.update(words)
-        
-        # Contar coincidencias
-        matches = sum(1 for item_color in item_colors 
-                     if any(kw in item_color.lower() for kw in palette_keywords))
-        
-        if matches > 0:
-            print(f"      Color match: {item_colors} vs {list(palette_keywords)[:3]} = {matches} coincidencias")
-        
-        return (matches / max(len(item_colors), 1)) * 100
+    def pick(slot, user_mask, db_mask):
+        """
+        Mejores prendas del usuario o, si no hay, del catálogo.
+        db_mask se calcula solo si hace falta recurrir al catálogo.
+        """
+        rows = top_k(user_scores, k, user_mask)
+        items = [user_fm.item(row) for row in rows]
+        if items and len(items) >= fill:
+            ranked[slot] = items
+            return
+        db_mask = db_mask()
+        if db_mask.any():
+            if not db_scores:
+                db_scores.append(db_fm.color_scores(palette))
+            propias = {item.get('id') for item in items}
+            for row in top_k(db_scores[0], k, db_mask):
+                if len(items) >= k:
+                    break
+                item = db_fm.item(row)
+                if item.get('id') not in propias:
+                    items.append(item)
+        if items:
+            ranked[slot] = items
+    
+    def sin_femeninas(mask):
+        """Quita las prendas femeninas si hay preferencia masculina"""
+        return mask & ~db_fm.has_tag('is_feminine') if preferencia_masculina else mask
     
     # 1. VESTIDO (si aplica)
     if not no_vestidos and ocasion in ['formal', 'casual']:
-        vestidos_usuario = [item for item in user_items 
-                           if item.get('tipo') == 'vestido' and match_item(item, ocasion, clima, estacion, palette_colors)]
-        
-        if vestidos_usuario:
-            vestidos_usuario.sort(key=lambda x: color_match_score(x, palette_colors), reverse=True)
-            outfit['vestido'] = vestidos_usuario[0]
-            print(f"   ✓ Vestido USUARIO: {outfit['vestido'].get('nombre')}")
-        else:
-            vestidos_db = db_items.search_items(tipo='vestido', ocasion=ocasion, clima=clima, estacion=estacion)
-            if vestidos_db:
-                vestidos_db.sort(key=lambda x: color_match_score(x, palette_colors), reverse=True)
-                outfit['vestido'] = vestidos_db[0]
+        pick('vestido', user_fm.eligible('vestido', ocasion, clima, estacion),
+             lambda: db_fm.eligible('vestido', ocasion, clima, estacion))
     
     # 2. SI NO HAY VESTIDO → SUPERIOR + INFERIOR
-    if 'vestido' not in outfit:
-        # SUPERIOR
-        superiores_usuario = [item for item in user_items 
-                             if item.get('tipo') == 'superior' and match_item(item, ocasion, clima, estacion, palette_colors)]
-        
-        if superiores_usuario:
-            superiores_usuario.sort(key=lambda x: color_match_score(x, palette_colors), reverse=True)
-            outfit['superior'] = superiores_usuario[0]
-            print(f"   ✓ Superior USUARIO: {outfit['superior'].get('nombre')}")
-        else:
-            superiores_db = db_items.search_items(tipo='superior', ocasion=ocasion, clima=clima, estacion=estacion)
-            if superiores_db:
-                superiores_db.sort(key=lambda x: color_match_score(x, palette_colors), reverse=True)
-                outfit['superior'] = superiores_db[0]
-        
-        # INFERIOR
-        inferiores_usuario = [item for item in user_items 
-                             if item.get('tipo') == 'inferior' and match_item(item, ocasion, clima, estacion, palette_colors)]
+    if 'vestido' not in ranked or separates:
+        pick('superior', user_fm.eligible('superior', ocasion, clima, estacion),
+             lambda: db_fm.eligible('superior', ocasion, clima, estacion))
         
+        inferiores_usuario = user_fm.eligible('inferior', ocasion, clima, estacion)
         if no_faldas:
-            inferiores_usuario = [item for item in inferiores_usuario 
-                                 if 'falda' not in item.get('nombre', '').lower()]
+            inferiores_usuario &= ~user_fm.has_tag('is_skirt')
         if no_pantalones:
-            inferiores_usuario = [item for item in inferiores_usuario 
-                                 if 'pantalon' not in item.get('nombre', '').lower()]
-        
-        if inferiores_usuario:
-            inferiores_usuario.sort(key=lambda x: color_match_score(x, palette_colors), reverse=True)
-            outfit['inferior'] = inferiores_usuario[0]
-            print(f"   ✓ Inferior USUARIO: {outfit['inferior'].get('nombre')}")
-        else:
-            inferiores_db = db_items.search_items(tipo='inferior', ocasion=ocasion, clima=clima, estacion=estacion)
-            if inferiores_db:
-                inferiores_db.sort(key=lambda x: color_match_score(x, palette_colors), reverse=True)
-                outfit['inferior'] = inferiores_db[0]
+            inferiores_usuario &= ~user_fm.has_tag('is_trousers')
+        pick('inferior', inferiores_usuario,
+             lambda: db_fm.eligible('inferior', ocasion, clima, estacion))
     
     # 3. CALZADO (lluvia → botas, filtrar femenino si aplica)
-    calzados_usuario = [item for item in user_items 
-                       if item.get('tipo') == 'calzado' and match_item(item, ocasion, clima, estacion, palette_colors)]
-    
-    # FILTRAR CALZADO FEMENINO si preferencia masculina
+    calzados_usuario = user_fm.eligible('calzado', ocasion, clima, estacion)
     if preferencia_masculina:
-        calzados_usuario = filtrar_prendas_femeninas(calzados_usuario, 'calzado')
-    
-    if prob_lluvia > 60 and calzados_usuario:
-        botas = [item for item in calzados_usuario if 'bota' in item.get('nombre', '').lower()]
-        if botas:
+        calzados_usuario &= ~user_fm.has_tag('is_feminine')
+    if prob_lluvia > 60 and calzados_usuario.any():
+        botas = calzados_usuario & user_fm.has_tag('is_boot')
+        if botas.any():
             calzados_usuario = botas
-            print(f"    Lluvia {prob_lluvia}% → Botas")
-    
-    if calzados_usuario:
-        calzados_usuario.sort(key=lambda x: color_match_score(x, palette_colors), reverse=True)
-        outfit['calzado'] = calzados_usuario[0]
-        print(f"   ✓ Calzado USUARIO: {outfit['calzado'].get('nombre')}")
-    else:
-        calzados_db = db_items.search_items(tipo='calzado', ocasion=ocasion, clima=clima)
-        if calzados_db:
-            # FILTRAR CALZADO FEMENINO de base de datos
-            if preferencia_masculina:
-                calzados_db = filtrar_prendas_femeninas(calzados_db, 'calzado')
-            if calzados_db:  # Verificar que aún hay opciones después del filtro
-                calzados_db.sort(key=lambda x: color_match_score(x, palette_colors), reverse=True)
-                outfit['calzado'] = calzados_db[0]
+    pick('calzado', calzados_usuario,
+         lambda: sin_femeninas(db_fm.eligible('calzado', ocasion, clima)))
     
     # 4. COMPLEMENTO (frío → bufanda, filtrar femenino si aplica)
-    complementos_usuario = [item for item in user_items 
-                           if item.get('tipo') == 'complemento' and match_item(item, ocasion, clima, estacion, palette_colors)]
-    
-    # FILTRAR COMPLEMENTOS FEMENINOS si hay preferencia masculina
+    complementos_usuario = user_fm.eligible('complemento', ocasion, clima, estacion)
     if preferencia_masculina:
-        complementos_usuario = filtrar_prendas_femeninas(complementos_usuario, 'complemento')
-    
-    if temperatura < 10 and complementos_usuario:
-        abrigados = [item for item in complementos_usuario 
-                    if 'bufanda' in item.get('nombre', '').lower() or 'gorro' in item.get('nombre', '').lower()]
-        if abrigados:
+        complementos_usuario &= ~user_fm.has_tag('is_feminine')
+    if temperatura < 10 and complementos_usuario.any():
+        abrigados = complementos_usuario & user_fm.has_tag('is_warm_accessory')
+        if abrigados.any():
             complementos_usuario = abrigados
-            print(f"    Frío {temperatura}°C → Bufanda/gorro")
-    
-    if complementos_usuario:
-        complementos_usuario.sort(key=lambda x: color_match_score(x, palette_colors), reverse=True)
-        outfit['complemento'] = complementos_usuario[0]
-        print(f"   ✓ Complemento USUARIO: {outfit['complemento'].get('nombre')}")
-    else:
-        complementos_db = db_items.search_items(tipo='complemento', ocasion=ocasion, clima=clima)
-        if complementos_db:
-            # FILTRAR COMPLEMENTOS FEMENINOS de base de datos
-            if preferencia_masculina:
-                complementos_db = filtrar_prendas_femeninas(complementos_db, 'complemento')
-            if complementos_db:  # Verificar que aún hay opciones después del filtro
-                complementos_db.sort(key=lambda x: color_match_score(x, palette_colors), reverse=True)
-                outfit['complemento'] = complementos_db[0]
+    pick('complemento', complementos_usuario,
+         lambda: sin_femeninas(db_fm.eligible('complemento', ocasion, clima)))
     
-    return outfit
+    return ranked
+
+# Tabla de outfits del catálogo precalculada al arrancar; el vigilante
+# recarga el catálogo en segundo plano y la vuelve a calcular
+warm_catalog_outfits(clothing_db)
+clothing_db.start_watcher(on_reload=warm_catalog_outfits)
 
 # ========== API DE RECOMENDACIÓN ==========
 
@@ -630,13 +712,7 @@ def onboarding():
         clima_info = get_clima_info(data.get('provincia'), data.get('mes'))
         
         # Categorizar temperatura
-        temp = clima_info.get('temperatura', 20)
-        if temp > 25:
-            clima_cat = 'calor'
-        elif temp > 15:
-            clima_cat = 'templado'
-        else:
-            clima_cat = 'frio'
+        clima_cat = categorizar_clima(clima_info.get('temperatura', 20))
         
         # Obtener outfit de la base de datos
         season = colorimetry_result['season']
@@ -656,35 +732,45 @@ def onboarding():
         print(f"   - Clima: {clima_cat} ({clima_info.get('temperatura')}°C)")
         print(f"   - Prob. lluvia: {clima_info.get('prob_lluvia')}%")
         
-        outfit_items = generate_smart_outfit(
-            user_items=user_items,
-            db_items=clothing_db,
-            ocasion=data.get('ocasion', 'casual').lower(),
-            clima=clima_cat,
-            temperatura=clima_info.get('temperatura', 20),
-            prob_lluvia=clima_info.get('prob_lluvia', 30),
-            estacion=season,
-            palette_colors=palette_colors,
-            fit_preference=data.get('fit'),
-            no_vestidos=data.get('no_vestidos', False),
-            no_faldas=data.get('no_faldas', False),
-            no_pantalones=data.get('no_pantalones', False),
-            no_tops=data.get('no_tops', False),
-            genero=data.get('genero')
-        )
+        # Sin armario: recomendación precalculada si la petición está en la matriz
+        precomputed = precomputed_recommendation(data, colorimetry_result) if not user_items else None
+        if precomputed is not None:
+            outfit_items, outfit_narrative = precomputed
+            outfit_source = "database"
+            print(" Outfit servido desde la matriz precalculada")
+        else:
+            outfit_items = generate_smart_outfit(
+                user_items=user_items,
+                db_items=clothing_db,
+                ocasion=data.get('ocasion', 'casual').lower(),
+                clima=clima_cat,
+                temperatura=clima_info.get('temperatura', 20),
+                prob_lluvia=clima_info.get('prob_lluvia', 30),
+                estacion=season,
+                palette_colors=palette_colors,
+                fit_preference=data.get('fit'),
+                no_vestidos=data.get('no_vestidos', False),
+                no_faldas=data.get('no_faldas', False),
+                no_pantalones=data.get('no_pantalones', False),
+                no_tops=data.get('no_tops', False),
+                genero=data.get('genero'),
+                user_features=wardrobe.feature_matrix()
+            )
         
-        outfit_source = "user" if any(item.get('id', '').startswith('item_') for item in outfit_items.values()) else "database"
-        print(f" Outfit generado desde: {outfit_source}")
+            outfit_source = "user" if any(item.get('id', '').startswith('item_') for item in outfit_items.values()) else "database"
+            print(f" Outfit generado desde: {outfit_source}")
         
-        # Generar narrativa completa (para voz)
-        print(" Generando recomendación narrativa...")
-        outfit_result = outfit_generator.generate_outfit_complete(
-            user_data=data,
-            clima_info=clima_info,
-            colorimetry_result=colorimetry_result,
-            outfit_items=outfit_items
-        )
-        outfit_narrative = outfit_result['outfit_narrative']
+            # Generar narrativa completa (para voz)
+            print(" Generando recomendación narrativa...")
+            outfit_result = outfit_generator.generate_outfit_complete(
+                user_data=data,
+                clima_info=clima_info,
+                colorimetry_result=colorimetry_result,
+                outfit_items=outfit_items
+            )
+            outfit_narrative = outfit_result['outfit_narrative']
+            # Outfit ya completado (puede ser una copia si venía de solo lectura)
+            outfit_items = outfit_result['outfit_items']
         
         # Generar texto SIMPLIFICADO (para pantalla)
         outfit_simple = generate_simple_outfit_text(outfit_items)
@@ -742,6 +828,36 @@ def onboarding():
         traceback.print_exc()
         return jsonify({'success': False, 'message': str(e)}), 500
 
+def precomputed_recommendation(data, colorimetry_result):
+    """
+    Outfit y narrativa de la matriz precalculada para usuarios sin armario.
+    Devuelve None (y se genera al vuelo) si no hay matriz al día o la
+    petición no es una de sus combinaciones: paleta distinta de la de su
+    estación, género distinto de mujer/hombre, preferencia masculina por
+    casillas, provincia sin datos...
+    
+    Returns:
+        tuple: (outfit_items, outfit_narrative) o None
+    """
+    if recommendation_matrix is None or not recommendation_matrix.is_fresh():
+        return None
+    season = colorimetry_result['season']
+    if colorimetry_result.get('palette_names', []) != recommendation_matrix.paletas.get(season):
+        return None
+    genero = data.get('genero', 'mujer').lower()
+    no_vestidos = data.get('no_vestidos', False)
+    preferencia_masculina = detectar_preferencia_masculina(no_vestidos, data.get('no_faldas', False),
+                                                           data.get('no_tops', False), data.get('genero'))
+    if genero not in GENEROS or preferencia_masculina != (genero == 'hombre'):
+        return None
+    record = recommendation_matrix.get(data.get('provincia'), data.get('mes'), data.get('ocasion', 'casual').lower(),
+                                       season, bool(no_vestidos), genero)
+    if record is None:
+        return None
+    narrative = record['narrative'].replace(NOMBRE, data.get('nombre', 'amigo'))
+    narrative += outfit_generator._fit_text(data.get('fit', 'Normal').lower())
+    return record['outfit_items'], narrative
+
 def generate_simple_outfit_text(outfit_items):
     """Genera texto simplificado del outfit para pantalla"""
     if not outfit_items:
@@ -765,6 +881,191 @@ def generate_simple_outfit_text(outfit_items):
     
     return " + ".join(parts) if parts else "Outfit personalizado"
 
+def _int_param(data, name, default, minimo, maximo, acotar=True):
+    """
+    Parámetro entero de la petición. Con acotar se lleva a [minimo, maximo];
+    si no, fuera de rango es un error.
+    
+    Raises:
+        ValueError: con el mensaje para el 400 si no es un número (o está fuera de rango)
+    """
+    value = data.get(name, default)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{name}' debe ser un número entero")
+    if acotar:
+        return max(minimo, min(value, maximo))
+    if not minimo <= value <= maximo:
+        raise ValueError(f"'{name}' debe estar entre {minimo} y {maximo}")
+    return value
+
+@app.route('/api/outfits/top', methods=['POST'])
+def top_outfits():
+    """
+    Los N mejores outfits completos para el usuario (sin narrativa ni audio).
+    Usa la colorimetría guardada (o la de por defecto) y el clima de
+    provincia y mes. Con 'alternativas' (k > 0) devuelve además las k
+    mejores prendas de cada hueco (generate_outfit_alternatives).
+    """
+    if 'user' not in session:
+        return jsonify({'success': False, 'message': 'No autenticado'}), 401
+    
+    data = request.get_json(silent=True) or request.form.to_dict()
+    try:
+        n = _int_param(data, 'n', 5, 1, 20)
+        alternativas = _int_param(data, 'alternativas', 0, 0, MAX_CANDIDATES)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    try:
+        user_email = session['user']
+        
+        colorimetry_result = get_user_colorimetry(user_email) or colorimetry_analyzer._get_default_result()
+        clima_info = get_clima_info(data.get('provincia'), data.get('mes'))
+        
+        wardrobe = WardrobeManager(user_email)
+        params = dict(
+            user_items=wardrobe.get_all_items(),
+            db_items=clothing_db,
+            ocasion=data.get('ocasion', 'casual').lower(),
+            clima=categorizar_clima(clima_info.get('temperatura', 20)),
+            temperatura=clima_info.get('temperatura', 20),
+            prob_lluvia=clima_info.get('prob_lluvia', 30),
+            estacion=colorimetry_result['season'],
+            palette_colors=colorimetry_result.get('palette_names', []),
+            fit_preference=data.get('fit'),
+            no_vestidos=data.get('no_vestidos', False),
+            no_faldas=data.get('no_faldas', False),
+            no_pantalones=data.get('no_pantalones', False),
+            no_tops=data.get('no_tops', False),
+            genero=data.get('genero'),
+            user_features=wardrobe.feature_matrix()
+        )
+        outfits = generate_top_outfits(n=n, **params)
+        
+        response = {
+            'success': True,
+            'colorimetria': colorimetry_result['season'],
+            'temperatura': clima_info.get('temperatura'),
+            'prob_lluvia': clima_info.get('prob_lluvia'),
+            'outfits': [
+                {
+                    'outfit_items': o['outfit'],
+                    'outfit_simple': generate_simple_outfit_text(o['outfit']),
+                    'score': o['score']
+                }
+                for o in outfits
+            ]
+        }
+        if alternativas:
+            response['alternativas'] = generate_outfit_alternatives(k=alternativas, **params)
+        return jsonify(response)
+    
+    except Exception as e:
+        print(f"Error generando outfits: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/api/outfits/plan', methods=['POST'])
+def outfit_plan():
+    """
+    Plan de outfits para varios días seguidos (por defecto una semana) sin
+    repetir prendas dentro de la ventana indicada, con el clima de cada día.
+    """
+    if 'user' not in session:
+        return jsonify({'success': False, 'message': 'No autenticado'}), 401
+    
+    data = request.get_json(silent=True) or request.form.to_dict()
+    mes = data.get('mes', 'Enero')
+    if mes not in MESES:
+        return jsonify({'success': False, 'message': f"'mes' debe ser uno de: {', '.join(MESES)}"}), 400
+    try:
+        n_dias = _int_param(data, 'dias', 7, 1, 31)
+        ventana = _int_param(data, 'ventana', 3, 1, n_dias)
+        # El plan empieza en un día que exista en el mes (año en curso, ver dias_del_plan)
+        dias_mes = calendar.monthrange(date.today().year, MESES.index(mes) + 1)[1]
+        dia_inicio = _int_param(data, 'dia_inicio', 1, 1, dias_mes, acotar=False)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    try:
+        user_email = session['user']
+        
+        colorimetry_result = get_user_colorimetry(user_email) or colorimetry_analyzer._get_default_result()
+        
+        wardrobe = WardrobeManager(user_email)
+        plan = generate_outfit_plan(
+            user_items=wardrobe.get_all_items(),
+            db_items=clothing_db,
+            provincia=data.get('provincia'),
+            mes=mes,
+            n_dias=n_dias,
+            ventana=ventana,
+            ocasion=data.get('ocasion', 'casual').lower(),
+            estacion=colorimetry_result['season'],
+            palette_colors=colorimetry_result.get('palette_names', []),
+            fit_preference=data.get('fit'),
+            no_vestidos=data.get('no_vestidos', False),
+            no_faldas=data.get('no_faldas', False),
+            no_pantalones=data.get('no_pantalones', False),
+            no_tops=data.get('no_tops', False),
+            genero=data.get('genero'),
+            dia_inicio=dia_inicio,
+            user_features=wardrobe.feature_matrix()
+        )
+        
+        for dia in plan:
+            dia['outfit_simple'] = generate_simple_outfit_text(dia['outfit_items'])
+        
+        return jsonify({
+            'success': True,
+            'colorimetria': colorimetry_result['season'],
+            'ventana': ventana,
+            'plan': plan
+        })
+    
+    except Exception as e:
+        print(f"Error generando plan: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/api/wardrobe/outfit', methods=['POST'])
+def wardrobe_outfit():
+    """
+    Outfit solo con prendas del armario: recorre el grafo de compatibilidad
+    (WardrobeManager.get_outfit_suggestions) con la paleta del usuario y
+    el clima de provincia y mes.
+    """
+    if 'user' not in session:
+        return jsonify({'success': False, 'message': 'No autenticado'}), 401
+
+    data = request.get_json(silent=True) or request.form.to_dict()
+
+    try:
+        user_email = session['user']
+
+        colorimetry_result = get_user_colorimetry(user_email) or colorimetry_analyzer._get_default_result()
+        clima_info = get_clima_info(data.get('provincia'), data.get('mes'))
+
+        wardrobe = WardrobeManager(user_email)
+        outfit = wardrobe.get_outfit_suggestions(
+            ocasion=data.get('ocasion', 'casual').lower(),
+            clima=categorizar_clima(clima_info.get('temperatura', 20)),
+            fit_preference=data.get('fit'),
+            season_colors=colorimetry_result.get('palette_names', [])
+        ) or {}
+
+        return jsonify({
+            'success': True,
+            'colorimetria': colorimetry_result['season'],
+            'temperatura': clima_info.get('temperatura'),
+            'outfit_items': outfit,
+            'outfit_simple': generate_simple_outfit_text(outfit)
+        })
+
+    except Exception as e:
+        print(f"Error generando outfit del armario: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
 # ========== API DEL ARMARIO ==========
 
 @app.route('/api/wardrobe/items', methods=['GET', 'POST'])
@@ -803,6 +1104,40 @@ def wardrobe_items():
         items = wardrobe.get_all_items()
         return jsonify({'success': True, 'items': items})
 
+@app.route('/api/wardrobe/import', methods=['POST'])
+def import_wardrobe_items():
+    """
+    Importación masiva de prendas (NDJSON o CSV), guardadas por bloques.
+    
+    La subida va como fichero 'file' (multipart) o como cuerpo de la
+    petición; el formato se deduce del nombre/tipo o de ?format=csv|ndjson.
+    Se lee línea a línea y las filas no válidas se informan sin abortar.
+    """
+    if 'user' not in session:
+        return jsonify({'success': False, 'message': 'No autenticado'}), 401
+    
+    user_email = session['user']
+    wardrobe = WardrobeManager(user_email)
+    
+    if 'file' in request.files:
+        upload = request.files['file']
+        stream = upload.stream
+        formato = request.args.get('format') or detect_format(upload.mimetype, upload.filename)
+    else:
+        stream = request.stream
+        formato = request.args.get('format') or detect_format(request.mimetype)
+    
+    try:
+        result = wardrobe.import_items(parse_rows(stream, formato))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        print(f"Error importando prendas: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+    
+    print(f" Importación de {user_email}: {result['added']} prendas, {result['n_errors']} filas con error")
+    return jsonify({'success': True, **result})
+
 @app.route('/api/wardrobe/items/<item_id>', methods=['DELETE'])
 def delete_wardrobe_item(item_id):
     """Elimina una prenda del armario"""
@@ -860,13 +1195,17 @@ def api_colorimetry():
 @app.route('/api/health')
 def health():
     """Endpoint de salud del sistema"""
+    catalog = clothing_db.catalog_info()
     return jsonify({
         'status': 'ok',
         'colorimetry_ready': colorimetry_analyzer is not None,
-        'clima_data_ready': load_clima_data() is not None,
+        'clima_data_ready': clima_index.ready,
         'outfit_generator_ready': outfit_generator is not None,
         'clothing_db_ready': clothing_db is not None,
-        'total_clothing_items': sum(len(items) for items in clothing_db.items.values())
+        'total_clothing_items': clothing_db.count_items(),
+        'catalog_version': catalog['version'],
+        'catalog_loaded_at': catalog['loaded_at'],
+        'wardrobe_cache': wardrobe_cache.stats()
     })
 
 @app.route('/api/dashboard/stats')
@@ -916,12 +1255,12 @@ if __name__ == '__main__':
     print(" Sistema de historial: ACTIVO")
     print(" Colorimetría guardada: ACTIVO")
     
-    if load_clima_data() is not None:
+    if clima_index.ready:
         print(" Datos de clima: CARGADOS")
     else:
         print(" Datos de clima: NO DISPONIBLES")
     
-    print(f" Prendas en base de datos: {sum(len(items) for items in clothing_db.items.values())}")
+    print(f" Prendas en base de datos: {clothing_db.count_items()}")
     
     print("=" * 60)
     print(" Accede a: http://localhost:5003")
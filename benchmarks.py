@@ -0,0 +1,733 @@
+"""
+Benchmarks de rendimiento del Armario Inteligente.
+
+Uso:
+    python benchmarks.py            # ejecuta todos
+    python benchmarks.py clima      # solo el indicado
+"""
+import copy
+import gc
+import json
+import pickle
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+
+def _run_python(code):
+    """Ejecuta código en un intérprete nuevo y devuelve el tiempo total (s)"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def bench_clima(repeats=5):
+    """Arranque en frío del índice de clima: Excel (pandas) vs snapshot (mmap)"""
+    from clima_index import build_snapshot
+
+    build_snapshot()
+    excel_code = (
+        "from clima_index import ClimaIndex; "
+        "i = ClimaIndex(snapshot_file='data/__no_snapshot__.bin'); assert i.source == 'excel'"
+    )
+    snapshot_code = (
+        "from clima_index import ClimaIndex; "
+        "i = ClimaIndex(); assert i.source == 'snapshot'; import sys; assert 'pandas' not in sys.modules"
+    )
+
+    print("\n Arranque del índice de clima (intérprete nuevo, mejor de %d):" % repeats)
+    for nombre, code in (('excel', excel_code), ('snapshot', snapshot_code)):
+        best = min(_run_python(code) for _ in range(repeats))
+        print(f"   {nombre:<10} {best * 1000:8.1f} ms")
+
+
+def _best_time(fn, repeats=3):
+    """Mejor tiempo de varias ejecuciones (s)"""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def synthetic_catalog(n_items, seed=42):
+    """
+    Catálogo sintético de n_items prendas con el mismo vocabulario
+    (tipos, ocasiones, climas, estaciones, colores) que el catálogo real.
+    """
+    with open('data/clothing_items.json', 'r', encoding='utf-8') as f:
+        base = json.load(f)
+
+    rng = random.Random(seed)
+    vocab = {'ocasion': set(), 'clima': set(), 'estacion': set(), 'color': set(), 'fit': set()}
+    for items in base.values():
+        for item in items:
+            for field in ('ocasion', 'clima', 'estacion', 'color'):
+                vocab[field].update(item.get(field, []))
+            vocab['fit'].add(item.get('fit', 'normal'))
+    vocab = {field: sorted(values) for field, values in vocab.items()}
+
+    tipos = list(base)
+    catalog = {tipo: [] for tipo in tipos}
+    for i in range(n_items):
+        tipo = tipos[i % len(tipos)]
+        modelo = base[tipo][rng.randrange(len(base[tipo]))]
+        catalog[tipo].append({
+            'id': f"syn_{i:07d}",
+            'nombre': modelo['nombre'],
+            'nombre_corto': modelo.get('nombre_corto', modelo['nombre']),
+            'color': rng.sample(vocab['color'], rng.randint(1, 2)),
+            'ocasion': rng.sample(vocab['ocasion'], rng.randint(1, 2)),
+            'clima': rng.sample(vocab['clima'], rng.randint(1, 2)),
+            'estacion': rng.sample(vocab['estacion'], rng.randint(1, 3)),
+            'fit': rng.choice(vocab['fit']),
+            'imagen': modelo.get('imagen', '')
+        })
+    return catalog
+
+
+def bench_catalog_search(sizes=(1_000, 100_000, 1_000_000)):
+    """search_items: índice invertido vs recorrido lineal"""
+    from clothing_database import ClothingDatabase
+
+    queries = [
+        {'tipo': 'superior', 'ocasion': 'formal', 'clima': 'calor', 'estacion': 'Verano'},
+        {'tipo': 'calzado', 'ocasion': 'casual', 'clima': 'frio'},
+        {'ocasion': 'deportiva', 'color': 'azul'},
+        {'tipo': 'complemento', 'color': 'rosa', 'estacion': 'Invierno'},
+    ]
+
+    print("\n search_items: índice invertido vs recorrido lineal (todas las consultas):")
+    for n in sizes:
+        db = ClothingDatabase.from_items(synthetic_catalog(n))
+        for q in queries:
+            assert db.search_items(**q) == db._search_items_scan(**q), q
+        repeats = 1 if n >= 1_000_000 else 3
+        t_index = _best_time(lambda: [db.search_items(**q) for q in queries], repeats)
+        t_scan = _best_time(lambda: [db._search_items_scan(**q) for q in queries], repeats)
+        print(f"   {n:>9} prendas  índice {t_index * 1000:9.1f} ms   lineal {t_scan * 1000:9.1f} ms"
+              f"   x{t_scan / max(t_index, 1e-9):.1f}")
+
+
+def _retained_memory(build):
+    """Memoria retenida (bytes) por el objeto que devuelve build()"""
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current
+
+
+def bench_catalog_memory(sizes=(10_000, 100_000)):
+    """Memoria por worker: catálogo en dicts vs columnar"""
+    from clothing_database import ClothingDatabase
+    from columnar_catalog import ColumnarClothingDatabase
+
+    print("\n Memoria del catálogo (cargado desde JSON, incluye índices):")
+    for n in sizes:
+        raw = json.dumps(synthetic_catalog(n), ensure_ascii=False)
+        _, dict_mem = _retained_memory(lambda: ClothingDatabase.from_items(json.loads(raw)))
+        _, col_mem = _retained_memory(lambda: ColumnarClothingDatabase.from_items(json.loads(raw)))
+        print(f"   {n:>9} prendas  dicts {dict_mem / 2**20:8.1f} MiB ({dict_mem / n:6.0f} B/prenda)"
+              f"   columnar {col_mem / 2**20:8.1f} MiB ({col_mem / n:6.0f} B/prenda)"
+              f"   x{dict_mem / max(col_mem, 1):.1f}")
+
+
+def bench_search_allocations(n_items=1_000, repeats=200):
+    """Bloques asignados por recomendación en las búsquedas del catálogo: copias vs solo lectura"""
+    from clothing_database import ClothingDatabase
+
+    catalog = synthetic_catalog(n_items)
+    # Las cinco búsquedas que hace generate_smart_outfit por recomendación
+    queries = [
+        {'tipo': 'vestido', 'ocasion': 'casual', 'clima': 'templado', 'estacion': 'Otoño'},
+        {'tipo': 'superior', 'ocasion': 'casual', 'clima': 'templado', 'estacion': 'Otoño'},
+        {'tipo': 'inferior', 'ocasion': 'casual', 'clima': 'templado', 'estacion': 'Otoño'},
+        {'tipo': 'calzado', 'ocasion': 'casual', 'clima': 'templado'},
+        {'tipo': 'complemento', 'ocasion': 'casual', 'clima': 'templado'},
+    ]
+
+    print(f"\n Asignaciones por recomendación ({n_items} prendas, 5 búsquedas):")
+    for nombre, readonly in (('copias', False), ('solo lectura', True)):
+        db = ClothingDatabase.from_items(catalog, readonly=readonly)
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        # Se retienen los resultados para contar todo lo que se asigna
+        kept = [[db.search_items(**q) for q in queries] for _ in range(repeats)]
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        stats = after.compare_to(before, 'filename')
+        blocks = sum(s.count_diff for s in stats)
+        size = sum(s.size_diff for s in stats)
+        elapsed = _best_time(lambda: [db.search_items(**q) for q in queries])
+        # Los registros de solo lectura se pueden copiar y enviar a otros procesos
+        item = kept[0][1][0]
+        for clon in (copy.copy(item), copy.deepcopy(item), pickle.loads(pickle.dumps(item))):
+            assert clon == item and type(clon) is type(item)
+        print(f"   {nombre:<13} {blocks / repeats:9.0f} bloques  {size / repeats / 1024:8.1f} KiB"
+              f"   {elapsed * 1000:7.2f} ms/recomendación")
+        del kept
+
+
+def _legacy_color_score(item, palette_colors):
+    """Puntuación de color tal y como se calculaba antes (palabras clave por prenda)"""
+    item_colors = item.get('color', [])
+    if isinstance(item_colors, str):
+        try:
+            item_colors = json.loads(item_colors)
+        except ValueError:
+            item_colors = [item_colors]
+    if not isinstance(item_colors, list):
+        item_colors = [item_colors]
+    palette_keywords = set()
+    for color_name in palette_colors:
+        palette_keywords.update(color_name.lower().split())
+    matches = sum(1 for item_color in item_colors
+                  if any(kw in item_color.lower() for kw in palette_keywords))
+    return (matches / max(len(item_colors), 1)) * 100
+
+
+def bench_palette_scoring(n_items=100_000):
+    """Puntuar prendas contra una paleta: palabras clave por prenda vs ΔE en CIELAB"""
+    import numpy as np
+    from colorimetry_analyzer import ColorimetryAnalyzer
+    from color_engine import compile_palettes
+
+    items = [item for items in synthetic_catalog(n_items).values() for item in items]
+    paletas = ColorimetryAnalyzer().paletas
+    palettes = compile_palettes(paletas)
+
+    print(f"\n Puntuación de color ({n_items} prendas por paleta):")
+    for season, palette in palettes.items():
+        palette_colors = paletas[season]['colores_texto']
+        assert np.allclose(palette.scores(items[:1000]), [palette.score(i) for i in items[:1000]])
+        t_legacy = _best_time(lambda: [_legacy_color_score(i, palette_colors) for i in items])
+        t_item = _best_time(lambda: [palette.score(i) for i in items])
+        t_batch = _best_time(lambda: palette.scores(items))
+        print(f"   {season:<10} palabras clave {t_legacy * 1000:7.1f} ms   ΔE por prenda {t_item * 1000:7.1f} ms"
+              f"   ΔE catálogo {t_batch * 1000:7.1f} ms")
+
+
+def _legacy_smart_outfit(user_items, db_items, ocasion, clima, temperatura, prob_lluvia,
+                         estacion, palette_colors, fit_preference, no_vestidos, no_faldas, no_pantalones, no_tops=False, genero=None):
+    """
+    Elección del outfit con listas, como era antes de las matrices de
+    características: referencia para comprobar que app._build_smart_outfit
+    elige lo mismo y para medir la diferencia.
+    """
+    from app import detectar_preferencia_masculina, filtrar_prendas_femeninas
+    from color_engine import get_palette
+    from item_tags import has_tag
+
+    outfit = {}
+
+    # DETECTAR PREFERENCIA MASCULINA
+    preferencia_masculina = detectar_preferencia_masculina(no_vestidos, no_faldas, no_tops, genero)
+
+    # Paleta en CIELAB (distancia ΔE de cada color de la tabla ya calculada)
+    palette = get_palette(palette_colors)
+
+    def match_item(item, ocasion, clima, estacion, palette_colors):
+        """Verifica si una prenda cumple las condiciones - CASE INSENSITIVE"""
+        # Listas ya normalizadas al guardar la prenda (item_schema)
+        if ocasion.lower() not in item.get('ocasion', []):
+            return False
+        if clima.lower() not in item.get('clima', []):
+            return False
+
+        # Estación
+        if 'estacion' in item and estacion not in item['estacion']:
+            return False
+
+        return True
+
+    def rank_by_color(items):
+        """Ordena las prendas por cercanía ΔE a la paleta (una sola pasada NumPy)"""
+        return palette.rank(items)
+
+    # 1. VESTIDO (si aplica)
+    if not no_vestidos and ocasion in ['formal', 'casual']:
+        vestidos_usuario = [item for item in user_items
+                           if item.get('tipo') == 'vestido' and match_item(item, ocasion, clima, estacion, palette_colors)]
+
+        if vestidos_usuario:
+            vestidos_usuario = rank_by_color(vestidos_usuario)
+            outfit['vestido'] = vestidos_usuario[0]
+        else:
+            vestidos_db = db_items.search_items(tipo='vestido', ocasion=ocasion, clima=clima, estacion=estacion)
+            if vestidos_db:
+                vestidos_db = rank_by_color(vestidos_db)
+                outfit['vestido'] = vestidos_db[0]
+
+    # 2. SI NO HAY VESTIDO → SUPERIOR + INFERIOR
+    if 'vestido' not in outfit:
+        # SUPERIOR
+        superiores_usuario = [item for item in user_items
+                             if item.get('tipo') == 'superior' and match_item(item, ocasion, clima, estacion, palette_colors)]
+
+        if superiores_usuario:
+            superiores_usuario = rank_by_color(superiores_usuario)
+            outfit['superior'] = superiores_usuario[0]
+        else:
+            superiores_db = db_items.search_items(tipo='superior', ocasion=ocasion, clima=clima, estacion=estacion)
+            if superiores_db:
+                superiores_db = rank_by_color(superiores_db)
+                outfit['superior'] = superiores_db[0]
+
+        # INFERIOR
+        inferiores_usuario = [item for item in user_items
+                             if item.get('tipo') == 'inferior' and match_item(item, ocasion, clima, estacion, palette_colors)]
+
+        if no_faldas:
+            inferiores_usuario = [item for item in inferiores_usuario
+                                 if not has_tag(item, 'is_skirt')]
+        if no_pantalones:
+            inferiores_usuario = [item for item in inferiores_usuario
+                                 if not has_tag(item, 'is_trousers')]
+
+        if inferiores_usuario:
+            inferiores_usuario = rank_by_color(inferiores_usuario)
+            outfit['inferior'] = inferiores_usuario[0]
+        else:
+            inferiores_db = db_items.search_items(tipo='inferior', ocasion=ocasion, clima=clima, estacion=estacion)
+            if inferiores_db:
+                inferiores_db = rank_by_color(inferiores_db)
+                outfit['inferior'] = inferiores_db[0]
+
+    # 3. CALZADO (lluvia → botas, filtrar femenino si aplica)
+    calzados_usuario = [item for item in user_items
+                       if item.get('tipo') == 'calzado' and match_item(item, ocasion, clima, estacion, palette_colors)]
+
+    # FILTRAR CALZADO FEMENINO si preferencia masculina
+    if preferencia_masculina:
+        calzados_usuario = filtrar_prendas_femeninas(calzados_usuario, 'calzado')
+
+    if prob_lluvia > 60 and calzados_usuario:
+        botas = [item for item in calzados_usuario if has_tag(item, 'is_boot')]
+        if botas:
+            calzados_usuario = botas
+
+    if calzados_usuario:
+        calzados_usuario = rank_by_color(calzados_usuario)
+        outfit['calzado'] = calzados_usuario[0]
+    else:
+        calzados_db = db_items.search_items(tipo='calzado', ocasion=ocasion, clima=clima)
+        if calzados_db:
+            # FILTRAR CALZADO FEMENINO de base de datos
+            if preferencia_masculina:
+                calzados_db = filtrar_prendas_femeninas(calzados_db, 'calzado')
+            if calzados_db:  # Verificar que aún hay opciones después del filtro
+                calzados_db = rank_by_color(calzados_db)
+                outfit['calzado'] = calzados_db[0]
+
+    # 4. COMPLEMENTO (frío → bufanda, filtrar femenino si aplica)
+    complementos_usuario = [item for item in user_items
+                           if item.get('tipo') == 'complemento' and match_item(item, ocasion, clima, estacion, palette_colors)]
+
+    # FILTRAR COMPLEMENTOS FEMENINOS si hay preferencia masculina
+    if preferencia_masculina:
+        complementos_usuario = filtrar_prendas_femeninas(complementos_usuario, 'complemento')
+
+    if temperatura < 10 and complementos_usuario:
+        abrigados = [item for item in complementos_usuario if has_tag(item, 'is_warm_accessory')]
+        if abrigados:
+            complementos_usuario = abrigados
+
+    if complementos_usuario:
+        complementos_usuario = rank_by_color(complementos_usuario)
+        outfit['complemento'] = complementos_usuario[0]
+    else:
+        complementos_db = db_items.search_items(tipo='complemento', ocasion=ocasion, clima=clima)
+        if complementos_db:
+            # FILTRAR COMPLEMENTOS FEMENINOS de base de datos
+            if preferencia_masculina:
+                complementos_db = filtrar_prendas_femeninas(complementos_db, 'complemento')
+            if complementos_db:  # Verificar que aún hay opciones después del filtro
+                complementos_db = rank_by_color(complementos_db)
+                outfit['complemento'] = complementos_db[0]
+
+    return outfit
+
+
+def bench_outfit_selection(n_wardrobe=10_000, n_catalog=1_000_000):
+    """Elección del outfit: listas por hueco vs matriz de características"""
+    import contextlib
+    import io
+    from clothing_database import ClothingDatabase
+    from feature_matrix import FeatureMatrix
+    from item_schema import normalize_item
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+    app._debug_state.quiet = True
+
+    db = ClothingDatabase.from_items(synthetic_catalog(n_catalog), readonly=True)
+    wardrobe = []
+    for tipo, items in synthetic_catalog(n_wardrobe, seed=7).items():
+        for item in items:
+            wardrobe.append(normalize_item(dict(item, tipo=tipo)))
+
+    start = time.perf_counter()
+    db.feature_matrix()
+    t_build = time.perf_counter() - start
+
+    palette = app.colorimetry_analyzer.paletas['Otoño']['colores_texto']
+    print(f"\n Elección de outfit ({n_wardrobe} prendas en el armario, {n_catalog} en el catálogo):")
+    print(f"   matriz del catálogo construida en {t_build * 1000:.0f} ms (una vez por versión)")
+    start = time.perf_counter()
+    user_features = FeatureMatrix(wardrobe, user=True)
+    print(f"   matriz del armario construida en {(time.perf_counter() - start) * 1000:.0f} ms (una vez por cambio)")
+    for nombre, user_items in (('solo catálogo', []), ('armario + catálogo', wardrobe)):
+        args = (user_items, db, 'casual', 'frio', 5, 80, 'Invierno', palette, None, False, False, False, False, 'hombre')
+        features = user_features if user_items else None
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert app._build_smart_outfit(*args, user_features=features) == _legacy_smart_outfit(*args)
+            t_lists = _best_time(lambda: _legacy_smart_outfit(*args))
+            t_matrix = _best_time(lambda: app._build_smart_outfit(*args, user_features=features))
+        print(f"   {nombre:<19} listas {t_lists * 1000:8.1f} ms   matriz {t_matrix * 1000:8.1f} ms"
+              f"   x{t_lists / max(t_matrix, 1e-9):.1f}")
+
+
+def bench_top_outfits(sizes=(100, 1_000, 5_000), n=10):
+    """N mejores outfits completos (best-first con poda) según el tamaño del armario"""
+    import contextlib
+    import io
+    from feature_matrix import FeatureMatrix
+    from item_schema import normalize_item
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+    app._debug_state.quiet = True
+    palette = app.colorimetry_analyzer.paletas['Verano']['colores_texto']
+
+    print(f"\n Top {n} outfits completos:")
+    for size in sizes:
+        wardrobe = []
+        for tipo, items in synthetic_catalog(size, seed=11).items():
+            for item in items:
+                wardrobe.append(normalize_item(dict(item, tipo=tipo)))
+        features = FeatureMatrix(wardrobe, user=True)
+        args = (wardrobe, app.clothing_db, 'casual', 'templado', 18, 40, 'Verano', palette,
+                None, False, False, False, False, 'mujer')
+        with contextlib.redirect_stdout(io.StringIO()):
+            elapsed = _best_time(lambda: app.generate_top_outfits(*args, n=n, user_features=features))
+            outfits = app.generate_top_outfits(*args, n=n, user_features=features)
+        print(f"   {size:>6} prendas  {elapsed * 1000:7.1f} ms   mejor {outfits[0]['score']:.1f}"
+              f"   {n}º {outfits[-1]['score']:.1f}")
+
+
+def bench_recommendation_matrix(n_requests=2_000):
+    """Matriz precalculada provincia x mes: generación, tamaño y consulta frente a generar al vuelo"""
+    import contextlib
+    import io
+    from recommendation_matrix import build_matrix, open_matrix
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+        stats = build_matrix()
+    app.recommendation_matrix = open_matrix()
+    app._debug_state.quiet = True
+
+    print("\n Matriz de recomendaciones (usuarios sin armario):")
+    print(f"   generación {stats['segundos']:8.2f} s   {stats['combinaciones']} combinaciones, "
+          f"{stats['registros']} registros distintos, {stats['bytes'] / 1024:.0f} KB")
+
+    rng = random.Random(5)
+    provincias = app.clima_index.provincias()
+    requests = []
+    for _ in range(n_requests):
+        season = rng.choice(list(app.colorimetry_analyzer.paletas))
+        colorimetry = {'season': season, 'palette_names': app.colorimetry_analyzer.paletas[season]['colores_texto']}
+        data = {'provincia': rng.choice(provincias), 'mes': rng.choice(['Enero', 'Abril', 'Julio', 'Octubre']),
+                'ocasion': rng.choice(['formal', 'casual', 'deportiva']), 'genero': rng.choice(['mujer', 'hombre'])}
+        requests.append((data, colorimetry))
+
+    def live():
+        for data, colorimetry in requests:
+            clima_info = app.get_clima_info(data['provincia'], data['mes'])
+            outfit = app.generate_smart_outfit(
+                [], app.clothing_db, data['ocasion'], app.categorizar_clima(clima_info['temperatura']),
+                clima_info['temperatura'], clima_info['prob_lluvia'], colorimetry['season'],
+                colorimetry['palette_names'], None, False, False, False, False, data['genero'])
+            app.outfit_generator.generate_outfit_complete(data, clima_info, colorimetry, outfit)
+
+    def precomputed():
+        for data, colorimetry in requests:
+            app.precomputed_recommendation(data, colorimetry)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        t_live = _best_time(live)
+        t_matrix = _best_time(precomputed)
+    print(f"   al vuelo   {t_live / n_requests * 1e6:8.1f} µs/petición")
+    print(f"   matriz     {t_matrix / n_requests * 1e6:8.1f} µs/petición   x{t_live / max(t_matrix, 1e-9):.1f}")
+
+
+def bench_wardrobe_cache(sizes=(100, 1_000, 5_000), repeats=20):
+    """Peticiones típicas al armario: releer el JSON cada vez vs caché del proceso"""
+    import os
+    from item_schema import SCHEMA_VERSION, normalize_item
+    from wardrobe_manager import WardrobeManager, wardrobe_cache
+
+    manager = WardrobeManager('benchmark@armario.local')
+    print("\n Armario (estadísticas + sugerencias + listado + búsqueda por petición):")
+    try:
+        for size in sizes:
+            items = []
+            for tipo, prendas in synthetic_catalog(size, seed=3).items():
+                for item in prendas:
+                    items.append(normalize_item(dict(item, tipo=tipo)))
+            wardrobe = {'items': items, 'schema_version': SCHEMA_VERSION}
+            manager._save_wardrobe(wardrobe)
+
+            def peticiones():
+                for _ in range(repeats):
+                    m = WardrobeManager('benchmark@armario.local')
+                    m.get_statistics()
+                    m.suggest_missing_items()
+                    m.get_all_items()
+                    m.search_items(tipo='superior')
+
+            def sin_cache():
+                for _ in range(repeats):
+                    wardrobe_cache.discard(manager.wardrobe_file)
+                    m = WardrobeManager('benchmark@armario.local')
+                    m.get_statistics()
+                    wardrobe_cache.discard(manager.wardrobe_file)
+                    m.suggest_missing_items()
+                    wardrobe_cache.discard(manager.wardrobe_file)
+                    m.get_all_items()
+                    wardrobe_cache.discard(manager.wardrobe_file)
+                    m.search_items(tipo='superior')
+
+            t_disk = _best_time(sin_cache)
+            t_cache = _best_time(peticiones)
+            print(f"   {size:>6} prendas  JSON {t_disk / repeats * 1000:8.2f} ms   caché {t_cache / repeats * 1000:8.2f} ms"
+                  f"   x{t_disk / max(t_cache, 1e-9):.1f}")
+        stats = wardrobe_cache.stats()
+        print(f"   aciertos {stats['hits']}  fallos {stats['misses']}  expulsiones {stats['evictions']}")
+    finally:
+        for f in (manager.wardrobe_file, manager.wardrobe_file + '.lock'):
+            os.remove(f)
+        wardrobe_cache.discard(manager.wardrobe_file)
+
+
+def bench_wardrobe_journal(base_items=500, added=100):
+    """Añadir prendas una a una: reescribir el JSON entero vs log de cambios (WARDROBE_STORAGE=journal)"""
+    import os
+    from item_schema import SCHEMA_VERSION, normalize_item
+    from wardrobe_manager import WardrobeManager, wardrobe_cache
+
+    items = []
+    for tipo, prendas in synthetic_catalog(base_items + added, seed=9).items():
+        for item in prendas:
+            items.append(normalize_item(dict(item, tipo=tipo)))
+    base, nuevas = items[:base_items], items[base_items:]
+
+    print(f"\n Añadir {added} prendas a un armario de {base_items}:")
+    for nombre, journal in (('JSON', False), ('log', True)):
+        manager = WardrobeManager(f'benchmark-{nombre}@armario.local', journal=journal)
+        try:
+            manager._save_wardrobe({'items': [dict(item) for item in base], 'schema_version': SCHEMA_VERSION})
+            # Grafo ya en la caché, como tras la primera sugerencia de outfit
+            manager.get_compatibility(base[0]['id'])
+            start = time.perf_counter()
+            for item in nuevas:
+                manager.add_item(dict(item, id=None))
+            elapsed = time.perf_counter() - start
+            size = sum(os.path.getsize(f) for f in (manager.wardrobe_file, manager.journal_file)
+                       if os.path.exists(f))
+            print(f"   {nombre:<5} {elapsed / added * 1000:8.2f} ms/prenda   {size / 1024:9.0f} KB en disco")
+        finally:
+            for f in (manager.wardrobe_file, manager.journal_file, manager.wardrobe_file + '.lock'):
+                if os.path.exists(f):
+                    os.remove(f)
+            wardrobe_cache.discard(manager.wardrobe_file)
+
+
+def bench_wardrobe_index(sizes=(10, 1_000, 50_000), repeats=200):
+    """Consultas al armario: recorrer todas las prendas vs índices (por id y secundarios)"""
+    import os
+    from item_schema import SCHEMA_VERSION, normalize_item
+    from wardrobe_index import WardrobeIndex, matches
+    from wardrobe_manager import WardrobeManager, wardrobe_cache
+
+    consultas = [
+        ('por id', None),
+        ('tipo', {'tipo': 'calzado'}),
+        ('tipo+ocasion', {'tipo': 'superior', 'ocasion': 'formal'}),
+        ('color+clima', {'color': 'azul', 'clima': 'frio'}),
+        ('tipo+fit', {'tipo': 'inferior', 'fit': 'holgada'}),
+        ('tags (sin índice)', {'tags': 'is_boot'}),
+    ]
+    manager = WardrobeManager('benchmark-indices@armario.local', journal=False)
+    print(f"\n Consultas al armario (µs por consulta):")
+    try:
+        for size in sizes:
+            items = []
+            for tipo, prendas in synthetic_catalog(size, seed=13).items():
+                for item in prendas:
+                    items.append(normalize_item(dict(item, tipo=tipo, id=f'item_{len(items)}')))
+            manager._save_wardrobe({'items': items, 'schema_version': SCHEMA_VERSION})
+            start = time.perf_counter()
+            manager._index()
+            t_build = time.perf_counter() - start
+            # Menos repeticiones del recorrido en armarios grandes (es O(n) por consulta)
+            n = max(5, min(repeats, 200_000 // size))
+            ids = [item['id'] for item in items]
+            ids = [ids[i * len(ids) // n] for i in range(n)]
+
+            fila = []
+            for nombre, filtros in consultas:
+                if filtros is None:
+                    def recorrido():
+                        for item_id in ids:
+                            next((item for item in manager.get_all_items() if item['id'] == item_id), None)
+
+                    def indice():
+                        for item_id in ids:
+                            manager.get_item_by_id(item_id)
+                else:
+                    assert manager.search_items(**filtros) == [i for i in manager.get_all_items() if matches(i, filtros)]
+
+                    def recorrido():
+                        for _ in range(n):
+                            [item for item in manager.get_all_items() if matches(item, filtros)]
+
+                    def indice():
+                        for _ in range(n):
+                            manager.search_items(**filtros)
+                t_scan = _best_time(recorrido) / n * 1e6
+                t_index = _best_time(indice) / n * 1e6
+                fila.append(f"{nombre} {t_scan:,.0f} → {t_index:,.0f}")
+            print(f"   {size:>6} prendas (índice en {t_build * 1000:.1f} ms)")
+            for celda in fila:
+                print(f"      {celda}")
+
+        # Coste de mantener el índice en cada cambio (copia de lo que toca la prenda)
+        index = WardrobeIndex(items)
+        nueva = dict(items[0], id='item_nueva')
+        t_change = _best_time(lambda: index.changed('item_nueva', nueva)) * 1e3
+        print(f"   actualizar el índice con {len(items)} prendas: {t_change:.2f} ms por cambio")
+    finally:
+        for f in (manager.wardrobe_file, manager.wardrobe_file + '.lock'):
+            os.remove(f)
+        wardrobe_cache.discard(manager.wardrobe_file)
+
+
+def bench_wardrobe_import(n_items=300):
+    """Cargar muchas prendas: add_item una a una vs importación masiva (una escritura por bloque)"""
+    import io
+    import os
+    import tracemalloc
+    from wardrobe_import import IMPORT_CHUNK, parse_rows
+    from wardrobe_manager import WardrobeManager, wardrobe_cache
+
+    prendas = [dict(item, tipo=tipo) for tipo, items in synthetic_catalog(n_items, seed=17).items() for item in items]
+    ndjson = '\n'.join(json.dumps(item, ensure_ascii=False) for item in prendas).encode('utf-8')
+
+    print(f"\n Cargar {len(prendas)} prendas en un armario vacío:")
+    for nombre, journal in (('JSON', False), ('log', True)):
+        manager = WardrobeManager(f'benchmark-import-{nombre}@armario.local', journal=journal)
+        try:
+            start = time.perf_counter()
+            for item in prendas:
+                manager.add_item(dict(item))
+            t_one = time.perf_counter() - start
+            print(f"   add_item ({nombre:<4})  {t_one:7.2f} s")
+        finally:
+            for f in (manager.wardrobe_file, manager.journal_file, manager.wardrobe_file + '.lock'):
+                if os.path.exists(f):
+                    os.remove(f)
+            wardrobe_cache.discard(manager.wardrobe_file)
+
+    manager = WardrobeManager('benchmark-import@armario.local', journal=False)
+    try:
+        start = time.perf_counter()
+        result = manager.import_items(parse_rows(io.BytesIO(ndjson), 'ndjson'))
+        t_bulk = time.perf_counter() - start
+        print(f"   importación     {t_bulk:7.2f} s   ({result['added']} prendas, bloques de {IMPORT_CHUNK})")
+
+        # Filas no válidas: la memoria de la lectura no crece con la subida
+        for veces in (1, 20):
+            invalida = b'\n'.join([json.dumps({'nombre': 'sin campos'}).encode('utf-8')] * (len(prendas) * veces))
+            tracemalloc.start()
+            manager.import_items(parse_rows(io.BytesIO(invalida), 'ndjson'))
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"   lectura de {len(invalida) / 1024:8.0f} KB: pico {peak / 1024:6.0f} KB")
+    finally:
+        for f in (manager.wardrobe_file, manager.wardrobe_file + '.lock'):
+            os.remove(f)
+        wardrobe_cache.discard(manager.wardrobe_file)
+
+
+def _mint_ids(n):
+    from item_ids import new_item_id
+    return [new_item_id() for _ in range(n)]
+
+
+def bench_item_ids(n=300_000, workers=4):
+    """Generar ids de prenda: id por milisegundo (antes) vs item_ids; colisiones entre hilos y procesos"""
+    import multiprocessing
+    import threading
+    from item_ids import new_item_id
+
+    def legacy():
+        return f"item_{int(time.time() * 1000)}"
+
+    print(f"\n Ids de prenda ({n} por prueba):")
+    for nombre, generar in (('item_<ms>', legacy), ('item_ids', new_item_id)):
+        start = time.perf_counter()
+        ids = [generar() for _ in range(n)]
+        elapsed = time.perf_counter() - start
+        print(f"   {nombre:<10} {n / elapsed:12,.0f} ids/s   repetidos {n - len(set(ids)):7}"
+              f"   ordenados {ids == sorted(ids)}")
+
+    por_hilo = [[] for _ in range(workers)]
+    hilos = [threading.Thread(target=lambda out: out.extend(new_item_id() for _ in range(n // workers)), args=(out,))
+             for out in por_hilo]
+    start = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    elapsed = time.perf_counter() - start
+    ids = [item_id for out in por_hilo for item_id in out]
+    print(f"   {workers} hilos    {len(ids) / elapsed:12,.0f} ids/s   repetidos {len(ids) - len(set(ids)):7}")
+
+    # Procesos creados con fork (como los workers de gunicorn con preload)
+    metodo = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+    new_item_id()
+    with multiprocessing.get_context(metodo).Pool(workers) as pool:
+        ids = [item_id for out in pool.map(_mint_ids, [n // workers] * workers) for item_id in out]
+    print(f"   {workers} procesos ({metodo}) repetidos {len(ids) - len(set(ids))} de {len(ids)}")
+
+
+BENCHMARKS = {
+    'clima': bench_clima,
+    'catalogo': bench_catalog_search,
+    'memoria': bench_catalog_memory,
+    'asignaciones': bench_search_allocations,
+    'paleta': bench_palette_scoring,
+    'outfit': bench_outfit_selection,
+    'outfits': bench_top_outfits,
+    'matriz': bench_recommendation_matrix,
+    'armario': bench_wardrobe_cache,
+    'journal': bench_wardrobe_journal,
+    'indices': bench_wardrobe_index,
+    'importacion': bench_wardrobe_import,
+    'ids': bench_item_ids,
+}
+
+
+if __name__ == "__main__":
+    nombres = sys.argv[1:] or list(BENCHMARKS)
+    for nombre in nombres:
+        BENCHMARKS[nombre]()
@@ -0,0 +1,259 @@
+import hashlib
+import mmap
+import os
+import struct
+import sys
+
+MESES = [
+    'Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
+    'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre'
+]
+
+# Valores por defecto según mes (datos aproximados de España)
+DEFAULTS_BY_MONTH = {
+    'Diciembre': {'temperatura': 11, 'prob_lluvia': 60},
+    'Enero': {'temperatura': 10, 'prob_lluvia': 55},
+    'Febrero': {'temperatura': 11, 'prob_lluvia': 50},
+    'Marzo': {'temperatura': 13, 'prob_lluvia': 45},
+    'Abril': {'temperatura': 15, 'prob_lluvia': 50},
+    'Mayo': {'temperatura': 18, 'prob_lluvia': 45},
+    'Junio': {'temperatura': 22, 'prob_lluvia': 30},
+    'Julio': {'temperatura': 25, 'prob_lluvia': 20},
+    'Agosto': {'temperatura': 25, 'prob_lluvia': 20},
+    'Septiembre': {'temperatura': 23, 'prob_lluvia': 35},
+    'Octubre': {'temperatura': 18, 'prob_lluvia': 50},
+    'Noviembre': {'temperatura': 13, 'prob_lluvia': 60}
+}
+
+DEFAULT_CLIMA = {'temperatura': 18, 'prob_lluvia': 40}
+
+
+def categorizar_clima(temp):
+    """Categoría de clima (calor, templado, frio) según la temperatura"""
+    if temp > 25:
+        return 'calor'
+    elif temp > 15:
+        return 'templado'
+    return 'frio'
+
+# Formato del snapshot binario:
+#   cabecera  -> magic, versión, nº provincias, sha1 del Excel de origen
+#   nombres   -> por provincia: longitud (uint16) + nombre en UTF-8
+#   datos     -> array fijo [provincia][mes] de (temperatura, prob_lluvia) int16
+SNAPSHOT_MAGIC = b'CLIM'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct('<4sHH20s')
+SNAPSHOT_NAME_LEN = struct.Struct('<H')
+SNAPSHOT_RECORD = struct.Struct('<hh')
+SNAPSHOT_MISSING = -32768
+
+
+def file_digest(path):
+    """sha1 del fichero (el Excel pesa pocos KB)"""
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).digest()
+
+
+def build_snapshot(xlsx_file='data/clima_provincias.xlsx', snapshot_file='data/clima_provincias.bin'):
+    """
+    Convierte el Excel de clima en el snapshot binario.
+    Es el único punto que necesita pandas/openpyxl.
+
+    Returns:
+        int: nº de provincias escritas
+    """
+    import pandas as pd
+
+    df = pd.read_excel(xlsx_file)
+    provincias = list(dict.fromkeys(df['Provincia']))
+    prov_idx = {p: i for i, p in enumerate(provincias)}
+    mes_idx = {m: i for i, m in enumerate(MESES)}
+
+    data = [(SNAPSHOT_MISSING, SNAPSHOT_MISSING)] * (len(provincias) * len(MESES))
+    for provincia, mes, temp, lluvia in zip(df['Provincia'], df['Mes'], df['Temp_media'], df['Prob_lluvia']):
+        if mes in mes_idx:
+            data[prov_idx[provincia] * len(MESES) + mes_idx[mes]] = (int(temp), int(lluvia))
+
+    tmp_file = snapshot_file + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(provincias), file_digest(xlsx_file)))
+        for provincia in provincias:
+            nombre = str(provincia).encode('utf-8')
+            f.write(SNAPSHOT_NAME_LEN.pack(len(nombre)))
+            f.write(nombre)
+        for temp, lluvia in data:
+            f.write(SNAPSHOT_RECORD.pack(temp, lluvia))
+    os.replace(tmp_file, snapshot_file)
+    return len(provincias)
+
+
+class ClimaSnapshot:
+    """
+    Vista de solo lectura sobre el snapshot binario mapeado en memoria.
+    Solo se decodifican los nombres de provincia; los datos se leen
+    directamente del mmap en cada consulta.
+    """
+
+    def __init__(self, snapshot_file):
+        with open(snapshot_file, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, n_provincias, self.source_digest = SNAPSHOT_HEADER.unpack_from(self._mm, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            self._mm.close()
+            raise ValueError(f"Snapshot de clima no válido: {snapshot_file}")
+
+        offset = SNAPSHOT_HEADER.size
+        self._provincias = {}
+        for i in range(n_provincias):
+            (length,) = SNAPSHOT_NAME_LEN.unpack_from(self._mm, offset)
+            offset += SNAPSHOT_NAME_LEN.size
+            self._provincias[self._mm[offset:offset + length].decode('utf-8')] = i
+            offset += length
+        self._data_offset = offset
+        self._meses = {m: i for i, m in enumerate(MESES)}
+
+    def get(self, provincia, mes):
+        """Clima de provincia y mes, o None si no está en el snapshot"""
+        p = self._provincias.get(provincia)
+        m = self._meses.get(mes)
+        if p is None or m is None:
+            return None
+        temp, lluvia = SNAPSHOT_RECORD.unpack_from(
+            self._mm, self._data_offset + (p * len(MESES) + m) * SNAPSHOT_RECORD.size
+        )
+        if temp == SNAPSHOT_MISSING:
+            return None
+        return {'temperatura': temp, 'prob_lluvia': lluvia}
+
+    def provincias(self):
+        """Provincias del snapshot, en orden"""
+        return list(self._provincias)
+
+    def close(self):
+        self._mm.close()
+
+
+class ClimaIndex:
+    """
+    Índice climático en memoria por (provincia, mes).
+    Se construye una sola vez al arrancar y se recarga solo si cambia
+    la fecha de modificación del Excel, así las consultas no tocan pandas.
+
+    Si existe un snapshot binario generado a partir del Excel actual
+    (mismo sha1), se usa directamente y no se importa pandas.
+    """
+
+    def __init__(self, xlsx_file='data/clima_provincias.xlsx', snapshot_file='data/clima_provincias.bin'):
+        self.xlsx_file = xlsx_file
+        self.snapshot_file = snapshot_file
+        self.ready = False
+        self.source = None
+        self._mtime = None
+        self._index = {}
+        self._snapshot = None
+        self.reload()
+
+    def _build_defaults(self):
+        """Entradas por defecto, clave (None, mes)"""
+        return {(None, mes): dict(valores) for mes, valores in DEFAULTS_BY_MONTH.items()}
+
+    def _read_excel(self):
+        """Lee el Excel y devuelve {(provincia, mes): clima}"""
+        import pandas as pd
+
+        df = pd.read_excel(self.xlsx_file)
+        index = {}
+        for provincia, mes, temp, lluvia in zip(df['Provincia'], df['Mes'], df['Temp_media'], df['Prob_lluvia']):
+            index[(provincia, mes)] = {
+                'temperatura': int(temp),
+                'prob_lluvia': int(lluvia)
+            }
+        return index
+
+    def _stat_sources(self):
+        """mtime del Excel y del snapshot (None si no existen)"""
+        mtimes = []
+        for path in (self.xlsx_file, self.snapshot_file):
+            try:
+                mtimes.append(os.path.getmtime(path))
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def _open_fresh_snapshot(self):
+        """Abre el snapshot si corresponde al Excel actual, si no None"""
+        if not os.path.exists(self.snapshot_file):
+            return None
+        try:
+            snapshot = ClimaSnapshot(self.snapshot_file)
+        except (OSError, ValueError, struct.error) as e:
+            print(f" Snapshot de clima ignorado: {e}")
+            return None
+        if os.path.exists(self.xlsx_file) and snapshot.source_digest != file_digest(self.xlsx_file):
+            print(" Snapshot de clima desactualizado, se usa el Excel.")
+            snapshot.close()
+            return None
+        return snapshot
+
+    def reload(self):
+        """(Re)construye el índice desde el snapshot o, si no está al día, desde el Excel"""
+        index = self._build_defaults()
+        self._mtime = self._stat_sources()
+        # El snapshot anterior no se cierra: puede haber lecturas en curso
+        # y el mmap se libera solo cuando deja de estar referenciado
+        self._snapshot = self._open_fresh_snapshot()
+        if self._snapshot is not None:
+            self._index = index
+            self.ready = True
+            self.source = 'snapshot'
+            return
+
+        self.source = 'defaults'
+        try:
+            index.update(self._read_excel())
+            self.ready = True
+            self.source = 'excel'
+            print(" DEBUG: Archivo clima_provincias.xlsx cargado con éxito.")
+        except FileNotFoundError:
+            # Se activa si el archivo no se encuentra en la ruta esperada
+            print(" Archivo clima_provincias.xlsx no encontrado (Fallo en la ruta).")
+            self.ready = False
+        except Exception as e:
+            # En caso de que no se cargue el excel
+            print(f" ERROR CRÍTICO al cargar clima_provincias.xlsx. Causa: {e}")
+            self.ready = False
+        self._index = index
+
+    def _check_reload(self):
+        """Recarga el índice si el Excel o el snapshot han cambiado en disco"""
+        if self._stat_sources() != self._mtime:
+            self.reload()
+
+    def get(self, provincia, mes):
+        """Clima de provincia y mes en O(1), con fallback al valor del mes"""
+        self._check_reload()
+        if self._snapshot is not None:
+            clima = self._snapshot.get(provincia, mes)
+            if clima is not None:
+                return clima
+        index = self._index
+        clima = index.get((provincia, mes)) or index.get((None, mes)) or DEFAULT_CLIMA
+        return dict(clima)
+
+    def provincias(self):
+        """Provincias con datos propios (sin las entradas por defecto del mes)"""
+        self._check_reload()
+        if self._snapshot is not None:
+            return self._snapshot.provincias()
+        return list(dict.fromkeys(p for p, _ in self._index if p is not None))
+
+
+if __name__ == "__main__":
+    # python clima_index.py build  -> genera data/clima_provincias.bin
+    if len(sys.argv) > 1 and sys.argv[1] == 'build':
+        n = build_snapshot()
+        print(f" Snapshot de clima generado: {n} provincias x {len(MESES)} meses")
+    else:
+        index = ClimaIndex()
+        print(f" Índice de clima listo ({index.source}): Madrid, Enero -> {index.get('Madrid', 'Enero')}")
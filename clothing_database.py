@@ -1,5 +1,68 @@
+import copy
 import json
 import os
+import threading
+import time
+from datetime import datetime
+
+from item_tags import derive_tags
+from color_engine import get_palette
+from feature_matrix import FeatureMatrix, top_k
+
+# Dominio cerrado de entradas del catálogo
+OCASIONES = ['formal', 'casual', 'deportiva']
+CLIMAS = ['calor', 'templado', 'frio']
+ESTACIONES = ['Primavera', 'Verano', 'Otoño', 'Invierno']
+
+class FrozenItem(dict):
+    """
+    Registro de solo lectura del catálogo.
+    
+    Sigue siendo un dict (jsonify, sesión y .get() funcionan igual) pero
+    cualquier modificación lanza TypeError. Quien necesite modificarlo
+    debe pedir una copia con thaw() (copy-on-write).
+    """
+    __slots__ = ()
+    readonly = True
+    
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Registro del catálogo de solo lectura: usa thaw() para obtener una copia modificable")
+    
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+    
+    def thaw(self):
+        """Copia modificable del registro"""
+        return dict(self)
+    
+    # copy y pickle reconstruyen un dict llamando a __setitem__; aquí se
+    # reconstruye con el constructor (dict.__init__), que no está bloqueado
+    def __reduce__(self):
+        return FrozenItem, (dict(self),)
+    
+    def __copy__(self):
+        return FrozenItem(self)
+    
+    def __deepcopy__(self, memo):
+        return FrozenItem(copy.deepcopy(dict(self), memo))
+
+class CatalogSnapshot:
+    """
+    Una versión del catálogo junto con todas sus estructuras derivadas
+    (índices, tabla de outfits). Se construye completa fuera del camino
+    de las peticiones y se publica con una única asignación, así que los
+    lectores nunca ven un catálogo a medio construir.
+    """
+    
+    def __init__(self, items, mtime, version):
+        self.items = items
+        self.mtime = mtime
+        self.version = version
+        self.loaded_at = datetime.now().isoformat()
+        # Outfits precalculados, dependen solo de esta versión del catálogo
+        self.outfit_table = {}
+        # Matriz de características (se construye la primera vez que se pide)
+        self.features = None
 
 class ClothingDatabase:
     """
@@ -7,12 +70,61 @@ class ClothingDatabase:
     Permite búsquedas avanzadas por características.
     """
     
-    def __init__(self):
+    # Atributos indexados: listas de posiciones por valor
+    INDEXED_FIELDS = ('tipo', 'ocasion', 'clima', 'estacion', 'color', 'tags')
+    
+    def __init__(self, readonly=False):
+        """
+        Args:
+            readonly: bool - si es True las prendas se guardan como FrozenItem
+                      (ya con 'tipo') y las búsquedas las devuelven por
+                      referencia, sin copiar cada resultado
+        """
         self.db_file = 'data/clothing_items.json'
         self.images_dir = 'static/clothing_images'
+        self.readonly = readonly
+        self._snapshot = None
+        self._reload_lock = threading.Lock()
+        self._on_reload = None
+        self._failed_mtime = None
         self._ensure_structure()
         self._load_database()
     
+    @classmethod
+    def from_items(cls, items, readonly=False):
+        """Crea una base de datos en memoria a partir de {tipo: [prendas]} (pruebas y benchmarks)"""
+        db = cls.__new__(cls)
+        db.db_file = None
+        db.images_dir = 'static/clothing_images'
+        db.readonly = readonly
+        db._reload_lock = threading.Lock()
+        db._on_reload = None
+        db._failed_mtime = None
+        db._snapshot = db._build_snapshot(items, None, 1)
+        return db
+    
+    @property
+    def items(self):
+        """Prendas {tipo: [prendas]} de la versión publicada (dict en todos los backends)"""
+        return self._catalog_items(self._snapshot)
+    
+    def _catalog_items(self, snapshot):
+        """
+        {tipo: [prendas]} de una versión. Aquí son los dicts cargados; los
+        backends que no los guardan (columnar, SQLite) los materializan en
+        cada llamada (O(n), para herramientas y comprobaciones).
+        """
+        return snapshot.items
+    
+    @staticmethod
+    def _group_by_tipo(items):
+        """{tipo: [prendas sin 'tipo']} a partir de prendas como las de search_items"""
+        catalog = {}
+        for item in items:
+            item = dict(item)
+            catalog.setdefault(item.pop('tipo'), []).append(item)
+        return catalog
+    
     def _ensure_structure(self):
         """Crea estructura de carpetas si no existe"""
         os.makedirs('data', exist_ok=True)
@@ -23,19 +135,148 @@ class ClothingDatabase:
         for t in types:
             os.makedirs(f'{self.images_dir}/{t}', exist_ok=True)
     
-    def _load_database(self):
-        """Carga base de datos desde JSON"""
+    def _source_file(self):
+        """Fichero del que se carga el catálogo"""
+        return self.db_file
+    
+    def _read_source(self):
+        """Lee el catálogo desde JSON (lo crea si no existe)"""
         if os.path.exists(self.db_file):
             with open(self.db_file, 'r', encoding='utf-8') as f:
-                self.items = json.load(f)
-        else:
-            self.items = self._create_default_database()
-            self._save_database()
+                return json.load(f)
+        items = self._create_default_database()
+        self._save_database(items)
+        return items
+    
+    def _load_database(self):
+        """Carga base de datos desde JSON y publica la primera versión"""
+        # mtime antes de leer: si el fichero cambia durante la lectura, el vigilante recargará
+        source = self._source_file()
+        mtime = os.path.getmtime(source) if os.path.exists(source) else None
+        items = self._read_source()
+        if mtime is None:
+            mtime = os.path.getmtime(source)
+        self._snapshot = self._build_snapshot(items, mtime, 1)
+    
+    def _build_snapshot(self, items, mtime, version):
+        """Construye una versión completa del catálogo (sin publicarla)"""
+        snapshot = CatalogSnapshot(items, mtime, version)
+        self._build_index(snapshot)
+        return snapshot
+    
+    def _build_index(self, snapshot):
+        """
+        Construye el índice invertido del catálogo.
+        
+        Cada prenda recibe una posición global (en el orden de items) y
+        para cada valor de tipo/ocasión/clima/estación/color se guarda el
+        conjunto de posiciones que lo contienen. Los colores se indexan en
+        minúsculas. Aquí también se calculan las etiquetas derivadas ('tags')
+        y, en modo readonly, cada prenda se congela una sola vez.
+        """
+        positions = []
+        postings = {field: {} for field in self.INDEXED_FIELDS}
+        
+        for item_type, items in snapshot.items.items():
+            for item in items:
+                pos = len(positions)
+                tags = derive_tags(item, item_type)
+                if self.readonly:
+                    item = FrozenItem(item, tipo=item_type, tags=tags)
+                else:
+                    item['tags'] = tags
+                positions.append((item_type, item))
+                postings['tipo'].setdefault(item_type, set()).add(pos)
+                for field in ('ocasion', 'clima', 'estacion', 'tags'):
+                    for value in item.get(field, []):
+                        postings[field].setdefault(value, set()).add(pos)
+                for c in item.get('color', []):
+                    postings['color'].setdefault(c.lower(), set()).add(pos)
+        
+        snapshot.positions = positions
+        snapshot.postings = postings
+    
+    # ---------- Recarga en caliente ----------
     
-    def _save_database(self):
+    def reload(self, force=False):
+        """
+        Reconstruye el catálogo si el fichero ha cambiado y publica la
+        nueva versión con un único cambio de referencia.
+        
+        Si hay callback on_reload se ejecuta antes de publicar, sobre una
+        vista que ya apunta a la nueva versión (p. ej. para precalcular la
+        tabla de outfits). Si falla la carga o el callback, la versión no
+        se publica y ese mtime no se vuelve a intentar.
+        
+        Returns:
+            bool: True si se ha publicado una versión nueva
+        """
+        with self._reload_lock:
+            current = self._snapshot
+            try:
+                mtime = os.path.getmtime(self._source_file())
+            except OSError:
+                return False
+            if not force and mtime in (current.mtime, self._failed_mtime):
+                return False
+            
+            try:
+                snapshot = self._build_snapshot(self._read_source(), mtime, current.version + 1)
+                if self._on_reload is not None:
+                    view = copy.copy(self)
+                    view._snapshot = snapshot
+                    self._on_reload(view)
+            except Exception:
+                # Ni la versión ni su precálculo: se mantiene la publicada y
+                # no se reintenta hasta que el fichero vuelva a cambiar
+                self._failed_mtime = mtime
+                raise
+            self._snapshot = snapshot
+            print(f" Catálogo recargado: versión {snapshot.version} ({self.count_items()} prendas)")
+            return True
+    
+    def start_watcher(self, interval=2.0, on_reload=None):
+        """
+        Lanza un hilo en segundo plano que vigila el fichero del catálogo
+        y recarga cuando cambia. Si la recarga falla (p. ej. JSON a medio
+        escribir) se mantiene la versión publicada y se reintenta cuando el
+        fichero vuelva a cambiar.
+        """
+        self._on_reload = on_reload
+        
+        def watch():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reload()
+                except Exception as e:
+                    print(f" Error recargando catálogo: {e}")
+        
+        thread = threading.Thread(target=watch, name='catalog-watcher', daemon=True)
+        thread.start()
+        return thread
+    
+    def catalog_info(self):
+        """Versión publicada del catálogo y hora de la última carga"""
+        snapshot = self._snapshot
+        return {'version': snapshot.version, 'loaded_at': snapshot.loaded_at}
+    
+    def count_items(self):
+        """Número total de prendas del catálogo"""
+        return len(self._snapshot.positions)
+    
+    def _color_postings(self, postings, color):
+        """Posiciones cuyo color contiene el texto buscado (misma semántica que 'in')"""
+        color = color.lower()
+        matches = [positions for token, positions in postings['color'].items() if color in token]
+        if len(matches) == 1:
+            return matches[0]
+        return set().union(*matches)
+    
+    def _save_database(self, items):
         """Guarda base de datos a JSON"""
         with open(self.db_file, 'w', encoding='utf-8') as f:
-            json.dump(self.items, f, indent=2, ensure_ascii=False)
+            json.dump(items, f, indent=2, ensure_ascii=False)
     
     def _create_default_database(self):
         """Crea base de datos por defecto con prendas ejemplo"""
@@ -256,7 +497,7 @@ class ClothingDatabase:
             ]
         }
     
-    def search_items(self, tipo=None, ocasion=None, clima=None, estacion=None, color=None):
+    def search_items(self, tipo=None, ocasion=None, clima=None, estacion=None, color=None, tags=None):
         """
         Búsqueda avanzada de prendas
         
@@ -266,17 +507,85 @@ class ClothingDatabase:
             clima: str - calor, templado, frio
             estacion: str - Primavera, Verano, Otoño, Invierno
             color: str - cualquier color
+            tags: str - etiqueta derivada (is_feminine, is_boot, ...)
         
         Returns:
             list: Prendas que coinciden con los criterios
         """
+        snapshot = self._snapshot
+        filters = []
+        for field, value in (('tipo', tipo), ('ocasion', ocasion), ('clima', clima), ('estacion', estacion),
+                             ('tags', tags)):
+            if value:
+                filters.append(snapshot.postings[field].get(value, set()))
+        if color:
+            filters.append(self._color_postings(snapshot.postings, color))
+        
+        if filters:
+            # Intersección empezando por la lista más selectiva
+            filters.sort(key=len)
+            positions = set(filters[0])
+            for posting in filters[1:]:
+                if not positions:
+                    break
+                positions &= posting
+            positions = sorted(positions)
+        else:
+            positions = range(len(snapshot.positions))
+        
+        if self.readonly:
+            return [snapshot.positions[pos][1] for pos in positions]
+        
+        results = []
+        for pos in positions:
+            item_type, item = snapshot.positions[pos]
+            item_copy = item.copy()
+            item_copy['tipo'] = item_type
+            results.append(item_copy)
+        
+        return results
+    
+    def _item_at(self, snapshot, pos):
+        """Prenda en una posición del catálogo, como la devolvería search_items"""
+        item_type, item = snapshot.positions[pos]
+        if self.readonly:
+            return item
+        item_copy = item.copy()
+        item_copy['tipo'] = item_type
+        return item_copy
+    
+    def _feature_rows(self, snapshot):
+        """
+        Prendas de una versión en orden de posición, con los campos que
+        codifica FeatureMatrix. Se recorren una sola vez: los backends que
+        no guardan dicts (columnar, SQLite) las generan de una en una desde
+        sus columnas en lugar de cargar el catálogo entero.
+        """
+        return (self._item_at(snapshot, pos) for pos in range(len(snapshot.positions)))
+    
+    def feature_matrix(self):
+        """
+        Matriz de características del catálogo (ver FeatureMatrix), una fila
+        por posición. Se construye una vez por versión del catálogo.
+        """
+        snapshot = self._snapshot
+        if snapshot.features is None:
+            # Sin cerrojo: en el peor caso dos hilos la construyen a la vez
+            snapshot.features = FeatureMatrix(
+                self._feature_rows(snapshot), fetch=lambda pos: self._item_at(snapshot, pos)
+            )
+        return snapshot.features
+    
+    def _search_items_scan(self, tipo=None, ocasion=None, clima=None, estacion=None, color=None, tags=None):
+        """Búsqueda por recorrido lineal (referencia para comprobar el índice)"""
         results = []
+        catalog = self.items
         
         # Si se especifica tipo, buscar solo en ese tipo
         if tipo:
-            items_to_search = {tipo: self.items.get(tipo, [])}
+            items_to_search = {tipo: catalog.get(tipo, [])}
         else:
-            items_to_search = self.items
+            items_to_search = catalog
         
         for item_type, items in items_to_search.items():
             for item in items:
@@ -294,6 +603,10 @@ class ClothingDatabase:
                 if estacion and estacion not in item.get('estacion', []):
                     match = False
                 
+                # Filtrar por etiqueta
+                if tags and tags not in item.get('tags', []):
+                    match = False
+                
                 # Filtrar por color
                 if color:
                     item_colors = item.get('color', [])
@@ -307,6 +620,47 @@ class ClothingDatabase:
         
         return results
     
+    def get_materialized_outfit(self, key, builder):
+        """
+        Devuelve un outfit de la tabla materializada del catálogo.
+        
+        Si la clave no está, se calcula una vez con builder() y se guarda.
+        La tabla pertenece a cada versión del catálogo, así que se
+        reconstruye al recargar clothing_items.json.
+        
+        Returns:
+            dict: copia superficial del outfit (las prendas se comparten);
+                  en modo readonly, el propio FrozenItem de la tabla
+        """
+        outfit_table = self._snapshot.outfit_table
+        outfit = outfit_table.get(key)
+        if outfit is None:
+            outfit = builder()
+            if self.readonly:
+                outfit = FrozenItem(outfit)
+            outfit_table[key] = outfit
+        if self.readonly:
+            return outfit
+        return dict(outfit)
+    
+    def build_outfit_table(self, palettes):
+        """
+        Precalcula get_outfit_suggestion para todas las combinaciones
+        ocasión x clima x estación x paleta.
+        
+        Args:
+            palettes: list - listas de colores favorables (una por paleta)
+        
+        Returns:
+            int: nº de outfits en la tabla
+        """
+        for ocasion in OCASIONES:
+            for clima in CLIMAS:
+                for estacion in ESTACIONES:
+                    for colores in palettes:
+                        self.get_outfit_suggestion(ocasion, clima, estacion, colores)
+        return len(self._snapshot.outfit_table)
+    
     def get_outfit_suggestion(self, ocasion, clima, estacion, colores_favorables):
         """
         Genera sugerencia de outfit completo con imágenes
@@ -320,6 +674,14 @@ class ClothingDatabase:
         Returns:
             dict: Outfit completo con prendas e imágenes
         """
+        key = ('suggestion', ocasion, clima, estacion, tuple(colores_favorables))
+        return self.get_materialized_outfit(
+            key,
+            lambda: self._compute_outfit_suggestion(ocasion, clima, estacion, colores_favorables)
+        )
+    
+    def _compute_outfit_suggestion(self, ocasion, clima, estacion, colores_favorables):
+        """Calcula la sugerencia de outfit recorriendo el catálogo"""
         outfit = {}
         
         # 1. Buscar superior
@@ -330,23 +692,10 @@ class ClothingDatabase:
             estacion=estacion
         )
         
-        # Priorizar prendas con colores favorables
-        # Convertir nombres complejos ("amarillo dorado") a palabras clave ("amarillo", "dorado")
-        color_keywords = set()
-        for color_name in colores_favorables:
-            # Extraer palabras clave de colores compuestos
-            words = color_name.lower().split()
-            color_keywords.update(words)
-        
-        superiores_favorables = [s for s in superiores if any(
-            any(keyword in c.lower() for keyword in color_keywords) 
-            for c in s.get('color', [])
-        )]
-        
-        if superiores_favorables:
-            outfit['superior'] = superiores_favorables[0]
-        elif superiores:
-            outfit['superior'] = superiores[0]
+        # Priorizar prendas con colores favorables (distancia ΔE en CIELAB)
+        palette = get_palette(colores_favorables)
+        if superiores:
+            outfit['superior'] = superiores[top_k(palette.scores(superiores), 1)[0]]
         
         # 2. Buscar inferior o vestido
         vestidos = self.search_items(
@@ -390,6 +739,11 @@ class ClothingDatabase:
     
     def get_item_by_id(self, item_id):
         """Obtiene una prenda por su ID"""
+        if self.readonly:
+            for tipo, item in self._snapshot.positions:
+                if item['id'] == item_id:
+                    return item
+            return None
         for tipo, items in self.items.items():
             for item in items:
                 if item['id'] == item_id:
@@ -0,0 +1,283 @@
+import functools
+import json
+import threading
+import unicodedata
+
+import numpy as np
+
+# Tabla de nombres de color (sin tildes, minúsculas) -> HEX.
+# Cubre el vocabulario del catálogo, los nombres de las paletas de
+# ColorimetryAnalyzer y los colores más habituales en los armarios.
+COLOR_HEX = {
+    'negro': '#000000',
+    'blanco': '#FFFFFF',
+    'hueso': '#F5F0E1',
+    'crema': '#FFFDD0',
+    'gris': '#808080',
+    'gris claro': '#D3D3D3',
+    'gris oscuro': '#696969',
+    'gris plateado': '#C0C0C0',
+    'plata': '#C0C0C0',
+    'plateado': '#C0C0C0',
+    'beige': '#F5F5DC',
+    'beige nude': '#F5DEB3',
+    'beige calido': '#F5DEB3',
+    'nude': '#E3BC9A',
+    'camel': '#C19A6B',
+    'marron': '#8B4513',
+    'marron claro': '#A0522D',
+    'marron oscuro': '#5C3317',
+    'chocolate': '#7B3F00',
+    'caqui': '#C3B091',
+    'siena': '#A0522D',
+    'bronce': '#CD853F',
+    'dorado': '#D4AF37',
+    'dorado oscuro': '#B8860B',
+    'amarillo': '#FFD700',
+    'amarillo dorado': '#FFD700',
+    'amarillo calido': '#F0E68C',
+    'amarillo claro': '#FFFACD',
+    'mostaza': '#E1AD01',
+    'ocre': '#CC7722',
+    'naranja': '#FF8C00',
+    'naranja coral': '#FF6347',
+    'naranja oscuro': '#FF8C00',
+    'coral': '#FF7F50',
+    'salmon': '#FFA07A',
+    'melocoton': '#FFDAB9',
+    'teja': '#B5542C',
+    'rojo': '#DC143C',
+    'burdeos': '#800020',
+    'granate': '#800000',
+    'vino': '#722F37',
+    'rosa': '#F4A7B9',
+    'rosa claro': '#FFB6C1',
+    'rosa pastel': '#FFB6C1',
+    'fucsia': '#FF00FF',
+    'lila': '#C8A2C8',
+    'lavanda': '#E6E6FA',
+    'violeta': '#8F00FF',
+    'violeta claro': '#D8BFD8',
+    'morado': '#800080',
+    'azul': '#1E50A0',
+    'azul claro': '#B0E0E6',
+    'celeste': '#87CEEB',
+    'azul cielo': '#87CEEB',
+    'azul oscuro': '#00008B',
+    'azul marino': '#000080',
+    'azul acero': '#4682B4',
+    'azul medianoche': '#191970',
+    'vaquero': '#5D7FA3',
+    'denim': '#5D7FA3',
+    'turquesa': '#40E0D0',
+    'turquesa claro': '#AFEEEE',
+    'verde': '#228B22',
+    'verde claro': '#90EE90',
+    'verde oscuro': '#006400',
+    'verde menta': '#98FB98',
+    'menta': '#98FB98',
+    'verde agua': '#B2DFDB',
+    'verde oliva': '#556B2F',
+    'oliva': '#556B2F',
+    'kaki': '#C3B091',
+    'esmeralda': '#2E8B57',
+}
+
+# ΔE a partir del cual un color ya no se parece en nada a la paleta
+DELTA_E_MAX = 50.0
+
+# Referencia D65 para XYZ -> Lab
+_WHITE_D65 = np.array([0.95047, 1.0, 1.08883])
+_RGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+
+
+def hex_to_lab(hex_colors):
+    """
+    Convierte colores HEX (sRGB, D65) a CIELAB.
+
+    Args:
+        hex_colors: list - colores '#RRGGBB'
+
+    Returns:
+        np.ndarray: matriz (n, 3) con L*, a*, b*
+    """
+    rgb = np.array(
+        [[int(h.lstrip('#')[i:i + 2], 16) for i in (0, 2, 4)] for h in hex_colors], dtype=float
+    ).reshape(-1, 3) / 255.0
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ _RGB_TO_XYZ.T / _WHITE_D65
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.column_stack([
+        116 * f[:, 1] - 16,
+        500 * (f[:, 0] - f[:, 1]),
+        200 * (f[:, 1] - f[:, 2]),
+    ])
+
+
+def _strip_accents(text):
+    return ''.join(c for c in unicodedata.normalize('NFD', text) if unicodedata.category(c) != 'Mn')
+
+
+# Tabla Lab precalculada: código de color -> fila de COLOR_LAB
+COLOR_NAMES = list(COLOR_HEX)
+COLOR_LAB = hex_to_lab([COLOR_HEX[name] for name in COLOR_NAMES])
+_TABLE_CODES = {name: code for code, name in enumerate(COLOR_NAMES)}
+UNKNOWN = -1
+
+# Nombres distintos (tal y como vienen en las prendas) que se memorizan:
+# el texto del color lo escribe el usuario, así que la caché tiene tope
+COLOR_CODE_CACHE = 4096
+
+
+@functools.lru_cache(maxsize=COLOR_CODE_CACHE)
+def color_code(name):
+    """
+    Código del color en la tabla Lab, o UNKNOWN si no se reconoce.
+    Se busca el nombre completo ("azul marino") y, si no existe, la
+    combinación más larga de sus palabras que sí esté en la tabla.
+    """
+    code = UNKNOWN
+    if isinstance(name, str):
+        words = _strip_accents(name.lower()).replace('-', ' ').split()
+        for size in range(len(words), 0, -1):
+            for start in range(len(words) - size + 1):
+                code = _TABLE_CODES.get(' '.join(words[start:start + size]), UNKNOWN)
+                if code != UNKNOWN:
+                    break
+            if code != UNKNOWN:
+                break
+    return code
+
+
+def normalize_colors(value):
+    """
+    Normaliza el campo 'color' de una prenda a lista.
+    Acepta lista, texto simple o lista serializada como JSON (armarios antiguos).
+    """
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            value = [value]
+    if not isinstance(value, list):
+        value = [value]
+    return value
+
+
+def item_colors(item):
+    """Colores de una prenda como lista (ver normalize_colors)"""
+    colors = item.get('color', [])
+    if not isinstance(colors, list):
+        colors = normalize_colors(colors)
+    return colors
+
+
+class ColorPalette:
+    """
+    Paleta personal en CIELAB.
+
+    Al crearla se calcula, con una sola operación de NumPy, la similitud de
+    cada color de la tabla con su color más cercano de la paleta:
+        similitud = max(0, 1 - ΔE*ab / DELTA_E_MAX)
+    La puntuación de una prenda es la media de la similitud de sus colores
+    (0-100); los colores que no están en la tabla puntúan 0.
+    """
+
+    def __init__(self, lab, palette_colors=()):
+        self.palette_colors = tuple(palette_colors)
+        self.lab = np.asarray(lab, dtype=float).reshape(-1, 3)
+        if len(self.lab):
+            delta_e = np.linalg.norm(COLOR_LAB[:, None, :] - self.lab[None, :, :], axis=2).min(axis=1)
+            similarity = np.clip(1.0 - delta_e / DELTA_E_MAX, 0.0, 1.0)
+        else:
+            similarity = np.zeros(len(COLOR_NAMES))
+        # La última posición es la de UNKNOWN (-1)
+        self.similarity = np.append(similarity, 0.0) * 100
+
+    @classmethod
+    def from_colors(cls, colors):
+        """Paleta a partir de colores HEX ('#RRGGBB') o nombres de la tabla"""
+        lab = []
+        for color in colors:
+            if isinstance(color, str) and color.startswith('#'):
+                lab.append(hex_to_lab([color])[0])
+            else:
+                code = color_code(color)
+                if code != UNKNOWN:
+                    lab.append(COLOR_LAB[code])
+        return cls(lab, colors)
+
+    def score(self, item):
+        """Puntuación de color de una prenda (0-100)"""
+        colors = item_colors(item)
+        if not colors:
+            return 0.0
+        similarity = self.similarity
+        return float(sum(similarity[color_code(c)] for c in colors) / len(colors))
+
+    def scores(self, items):
+        """Puntuaciones de todas las prendas en una sola pasada de NumPy"""
+        counts = []
+        codes = []
+        for item in items:
+            colors = item_colors(item)
+            counts.append(len(colors))
+            codes.extend(color_code(c) for c in colors)
+        if not codes:
+            return np.zeros(len(items))
+        counts = np.array(counts, dtype=np.int64)
+        per_color = self.similarity[np.array(codes, dtype=np.int64)]
+        # Suma por prenda (segmentos consecutivos) / nº de colores
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        totals = np.add.reduceat(np.append(per_color, 0.0), offsets[:-1])
+        totals[counts == 0] = 0.0
+        return totals / np.maximum(counts, 1)
+
+    def rank(self, items):
+        """Prendas ordenadas de mejor a peor color (estable ante empates)"""
+        if not items:
+            return []
+        order = np.argsort(-self.scores(items), kind='stable')
+        return [items[i] for i in order]
+
+
+# Paletas registradas: tupla de colores -> ColorPalette
+_PALETTES = {}
+_PALETTES_LOCK = threading.Lock()
+
+
+def get_palette(palette_colors):
+    """
+    Paleta Lab de una lista de colores. Las de las estaciones se registran
+    al arrancar con sus HEX exactos (compile_palettes); cualquier otra lista
+    se compila la primera vez a partir de la tabla de nombres.
+    """
+    key = tuple(palette_colors)
+    palette = _PALETTES.get(key)
+    if palette is None:
+        with _PALETTES_LOCK:
+            palette = _PALETTES.setdefault(key, ColorPalette.from_colors(key))
+    return palette
+
+
+def compile_palettes(paletas):
+    """
+    Convierte una sola vez las paletas HEX de ColorimetryAnalyzer.paletas a Lab.
+    Cada una queda registrada tanto por sus nombres ('colores_texto', lo que
+    recibe el generador) como por sus HEX.
+
+    Returns:
+        dict: estación -> ColorPalette
+    """
+    compiled = {}
+    with _PALETTES_LOCK:
+        for season, paleta in paletas.items():
+            palette = ColorPalette(hex_to_lab(paleta['colores']), paleta['colores_texto'])
+            _PALETTES[tuple(paleta['colores_texto'])] = palette
+            _PALETTES[tuple(paleta['colores'])] = palette
+            compiled[season] = palette
+    return compiled
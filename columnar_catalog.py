@@ -0,0 +1,238 @@
+from array import array
+
+import numpy as np
+
+from clothing_database import ClothingDatabase
+from item_tags import derive_tags
+
+
+class _Vocab:
+    """Enum internado: cada valor distinto recibe un código entero"""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def code(self, value):
+        c = self.codes.get(value)
+        if c is None:
+            c = len(self.values)
+            self.values.append(value)
+            self.codes[value] = c
+        return c
+
+
+class _StringColumn:
+    """Columna de textos: un único bloque UTF-8 más sus offsets"""
+
+    def __init__(self, values):
+        blob = bytearray()
+        self._offsets = array('Q', [0])
+        self._none = set()
+        for pos, value in enumerate(values):
+            if value is None:
+                self._none.add(pos)
+            else:
+                blob += value.encode('utf-8')
+            self._offsets.append(len(blob))
+        self._blob = bytes(blob)
+
+    def get(self, pos):
+        if pos in self._none:
+            return None
+        return self._blob[self._offsets[pos]:self._offsets[pos + 1]].decode('utf-8')
+
+
+class ColumnarClothingDatabase(ClothingDatabase):
+    """
+    Catálogo en formato columnar, misma API que ClothingDatabase.
+
+    - tipo y fit: códigos uint8 sobre vocabularios internados
+    - ocasion, clima, estacion, tags: columnas de bits (uint64, un bit por valor)
+    - color: códigos en formato CSR (se conserva el orden de cada prenda)
+    - textos (id, nombre, ...): un bloque UTF-8 por columna
+
+    Tras construir las columnas de cada versión se libera el grafo de
+    dicts; solo se materializan como dict las prendas que devuelve cada
+    búsqueda.
+    El orden de ocasion/clima/estacion/tags en los resultados es el del
+    vocabulario, no el del JSON original.
+    """
+
+    STRING_FIELDS = ('id', 'nombre', 'nombre_corto', 'imagen', 'descripcion')
+    MASK_FIELDS = ('ocasion', 'clima', 'estacion', 'tags')
+    KNOWN_FIELDS = set(STRING_FIELDS) | set(MASK_FIELDS) | {'color', 'fit', 'tipo'}
+
+    def _build_index(self, snapshot):
+        """Convierte snapshot.items en columnas y descarta los dicts"""
+        snapshot.vocab = {field: _Vocab() for field in ('tipo', 'fit', 'color') + self.MASK_FIELDS}
+        tipos = array('B')
+        fits = array('B')
+        masks = {field: array('Q') for field in self.MASK_FIELDS}
+        color_offsets = array('I', [0])
+        color_codes = array('H')
+        color_owner = array('I')
+        strings = {field: [] for field in self.STRING_FIELDS}
+        # Campos poco frecuentes: {pos: {campo: valor}} y campos multivalor ausentes
+        snapshot.extras = {}
+        snapshot.missing = {}
+
+        pos = 0
+        for item_type, items in snapshot.items.items():
+            for item in items:
+                item['tags'] = derive_tags(item, item_type)
+                tipos.append(snapshot.vocab['tipo'].code(item_type))
+                fits.append(snapshot.vocab['fit'].code(item.get('fit')))
+
+                for field in self.MASK_FIELDS:
+                    if field not in item:
+                        snapshot.missing.setdefault(pos, set()).add(field)
+                    values = item.get(field, [])
+                    if isinstance(values, str):
+                        values = [values]
+                    mask = 0
+                    for value in values:
+                        code = snapshot.vocab[field].code(value)
+                        if code >= 64:
+                            raise ValueError(f"Demasiados valores distintos para '{field}' (máx. 64)")
+                        mask |= 1 << code
+                    masks[field].append(mask)
+
+                if 'color' not in item:
+                    snapshot.missing.setdefault(pos, set()).add('color')
+                colors = item.get('color', [])
+                if isinstance(colors, str):
+                    colors = [colors]
+                for c in colors:
+                    color_codes.append(snapshot.vocab['color'].code(c))
+                    color_owner.append(pos)
+                color_offsets.append(len(color_codes))
+
+                for field in self.STRING_FIELDS:
+                    strings[field].append(item.get(field))
+
+                extras = {k: v for k, v in item.items() if k not in self.KNOWN_FIELDS}
+                if extras:
+                    snapshot.extras[pos] = extras
+                pos += 1
+
+        snapshot.n = pos
+        snapshot.tipo = np.frombuffer(tipos, dtype=np.uint8) if pos else np.zeros(0, np.uint8)
+        snapshot.fit = fits
+        snapshot.masks = {
+            field: np.frombuffer(col, dtype=np.uint64) if pos else np.zeros(0, np.uint64)
+            for field, col in masks.items()
+        }
+        snapshot.color_offsets = color_offsets
+        snapshot.color_codes = np.frombuffer(color_codes, dtype=np.uint16) if len(color_codes) else np.zeros(0, np.uint16)
+        snapshot.color_owner = np.frombuffer(color_owner, dtype=np.uint32) if len(color_owner) else np.zeros(0, np.uint32)
+        snapshot.color_lower = [c.lower() for c in snapshot.vocab['color'].values]
+        snapshot.strings = {field: _StringColumn(values) for field, values in strings.items()}
+
+        # Búsqueda por id: hashes ordenados + comprobación contra la columna
+        hashes = np.fromiter((hash(i) for i in strings['id']), dtype=np.int64, count=pos)
+        snapshot.id_order = np.argsort(hashes, kind='stable')
+        snapshot.id_hashes = hashes[snapshot.id_order]
+
+        snapshot.items = None
+
+    def _decode_attrs(self, snapshot, pos, item):
+        """Añade a item los campos codificados (color, ocasion, clima, estacion, tags, fit)"""
+        missing = snapshot.missing.get(pos, ())
+        if 'color' not in missing:
+            colors = snapshot.vocab['color'].values
+            start, end = snapshot.color_offsets[pos], snapshot.color_offsets[pos + 1]
+            item['color'] = [colors[c] for c in snapshot.color_codes[start:end]]
+        for field in self.MASK_FIELDS:
+            if field in missing:
+                continue
+            mask = int(snapshot.masks[field][pos])
+            values = snapshot.vocab[field].values
+            item[field] = [values[code] for code in range(len(values)) if mask >> code & 1]
+
+        fit = snapshot.vocab['fit'].values[snapshot.fit[pos]]
+        if fit is not None:
+            item['fit'] = fit
+        return item
+
+    def _materialize(self, snapshot, pos):
+        """Crea el dict de una prenda (solo para las que se devuelven)"""
+        item = {}
+        strings = snapshot.strings
+        for field in ('id', 'nombre', 'nombre_corto'):
+            value = strings[field].get(pos)
+            if value is not None:
+                item[field] = value
+
+        self._decode_attrs(snapshot, pos, item)
+        for field in ('imagen', 'descripcion'):
+            value = strings[field].get(pos)
+            if value is not None:
+                item[field] = value
+        item.update(snapshot.extras.get(pos, {}))
+        item['tipo'] = snapshot.vocab['tipo'].values[snapshot.tipo[pos]]
+        return item
+
+    def _item_at(self, snapshot, pos):
+        """Prenda en una posición del catálogo"""
+        return self._materialize(snapshot, pos)
+
+    def _catalog_items(self, snapshot):
+        """{tipo: [prendas]} materializado desde las columnas (ver ClothingDatabase.items)"""
+        return self._group_by_tipo(self._materialize(snapshot, pos) for pos in range(snapshot.n))
+
+    def _feature_rows(self, snapshot):
+        """Prendas para FeatureMatrix decodificadas de las columnas, sin textos ni extras"""
+        tipos = snapshot.vocab['tipo'].values
+        for pos in range(snapshot.n):
+            yield self._decode_attrs(snapshot, pos, {'tipo': tipos[snapshot.tipo[pos]]})
+
+    def count_items(self):
+        """Número total de prendas del catálogo"""
+        return self._snapshot.n
+
+    def search_items(self, tipo=None, ocasion=None, clima=None, estacion=None, color=None, tags=None):
+        """
+        Búsqueda avanzada de prendas (mismos criterios que ClothingDatabase)
+
+        Returns:
+            list: Prendas que coinciden con los criterios
+        """
+        snapshot = self._snapshot
+        mask = np.ones(snapshot.n, dtype=bool)
+
+        if tipo:
+            code = snapshot.vocab['tipo'].codes.get(tipo)
+            if code is None:
+                return []
+            mask &= snapshot.tipo == code
+
+        for field, value in (('ocasion', ocasion), ('clima', clima), ('estacion', estacion), ('tags', tags)):
+            if value:
+                code = snapshot.vocab[field].codes.get(value)
+                if code is None:
+                    return []
+                mask &= (snapshot.masks[field] & np.uint64(1 << code)) != 0
+
+        if color:
+            color = color.lower()
+            matching = [code for code, value in enumerate(snapshot.color_lower) if color in value]
+            if not matching:
+                return []
+            color_mask = np.zeros(snapshot.n, dtype=bool)
+            color_mask[snapshot.color_owner[np.isin(snapshot.color_codes, matching)]] = True
+            mask &= color_mask
+
+        return [self._materialize(snapshot, int(pos)) for pos in np.flatnonzero(mask)]
+
+    def get_item_by_id(self, item_id):
+        """Obtiene una prenda por su ID"""
+        snapshot = self._snapshot
+        h = hash(item_id)
+        lo = np.searchsorted(snapshot.id_hashes, h, side='left')
+        hi = np.searchsorted(snapshot.id_hashes, h, side='right')
+        for k in range(lo, hi):
+            pos = int(snapshot.id_order[k])
+            if snapshot.strings['id'].get(pos) == item_id:
+                return self._materialize(snapshot, pos)
+        return None
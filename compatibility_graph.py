@@ -0,0 +1,213 @@
+import numpy as np
+
+from outfit_search import color_codes, harmony_matrix, harmony_profiles
+
+# Tipos que se combinan en un mismo outfit (vestido no va con superior ni inferior)
+COMPLEMENTARY = {
+    'superior': {'inferior', 'calzado', 'complemento'},
+    'inferior': {'superior', 'calzado', 'complemento'},
+    'vestido': {'calzado', 'complemento'},
+    'calzado': {'superior', 'inferior', 'vestido', 'complemento'},
+    'complemento': {'superior', 'inferior', 'vestido', 'calzado'},
+}
+
+# Pesos de cada componente de la compatibilidad (suman 1)
+PESO_COLOR = 0.5
+PESO_OCASION = 0.25
+PESO_CLIMA = 0.25
+
+# Aristas que se guardan por prenda y tipo complementario (las mejores):
+# el grafo ocupa O(n) en lugar de O(n²)
+TOP_EDGES = 10
+
+# Prendas por bloque al puntuar con NumPy (memoria ~ bloque x armario)
+BLOCK = 256
+
+
+def _values(item, field):
+    """Valores de un campo multivalor (ya en minúsculas, ver item_schema)"""
+    return set(item.get(field, ()))
+
+
+def _one_hot(items, field):
+    """Matriz prendas x valores (1 si la prenda tiene el valor) y nº de valores por prenda"""
+    vocab = {}
+    rows = [[vocab.setdefault(v, len(vocab)) for v in _values(item, field)] for item in items]
+    matrix = np.zeros((len(items), max(len(vocab), 1)), dtype=np.int32)
+    for r, cols in enumerate(rows):
+        matrix[r, cols] = 1
+    return matrix, matrix.sum(axis=1)
+
+
+def _jaccard(matrix_a, sizes_a, matrix_b, sizes_b):
+    """Índice de Jaccard entre cada fila de a y cada una de b (0 si alguna está vacía)"""
+    inter = matrix_a @ matrix_b.T
+    union = sizes_a[:, None] + sizes_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1), 0.0)
+
+
+class _Scorer:
+    """
+    Compatibilidad entre prendas de un armario calculada por bloques con
+    NumPy: ocasión y clima con matrices de valores (Jaccard) y color con
+    harmony_matrix. Se prepara una vez por armario (O(n)).
+    """
+
+    def __init__(self, items):
+        self.items = items
+        self.ids = [item['id'] for item in items]
+        self.tipo = [item.get('tipo') for item in items]
+        self.by_tipo = {}
+        for pos, tipo in enumerate(self.tipo):
+            self.by_tipo.setdefault(tipo, []).append(pos)
+        self.by_tipo = {tipo: np.array(cols, dtype=np.int64) for tipo, cols in self.by_tipo.items()}
+        codes = {tipo: code for code, tipo in enumerate(self.by_tipo)}
+        self.tipo_codes = np.array([codes[tipo] for tipo in self.tipo], dtype=np.int64)
+        self.complementary = np.array([[b in COMPLEMENTARY.get(a, ()) for b in codes] for a in codes], dtype=bool)
+        self.ocasiones, self.n_ocasiones = _one_hot(items, 'ocasion')
+        self.climas, self.n_climas = _one_hot(items, 'clima')
+        self.profiles = harmony_profiles(items) if items else None
+        self.color_codes = color_codes(items) if items else None
+
+    def scores(self, rows, cols):
+        """
+        Compatibilidad (0-1) de cada prenda de rows con cada una de cols
+        (posiciones): -1 si no pueden ir juntas (tipos no complementarios
+        o sin ninguna ocasión o clima en común).
+        """
+        valid = self.complementary[self.tipo_codes[rows][:, None], self.tipo_codes[cols][None, :]]
+        ocasion = _jaccard(self.ocasiones[rows], self.n_ocasiones[rows], self.ocasiones[cols], self.n_ocasiones[cols])
+        clima = _jaccard(self.climas[rows], self.n_climas[rows], self.climas[cols], self.n_climas[cols])
+        valid = valid & (ocasion > 0) & (clima > 0)
+        color = harmony_matrix(None, None, self.profiles[rows], self.color_codes[cols]) / 100
+        scores = np.round(PESO_COLOR * color + PESO_OCASION * ocasion + PESO_CLIMA * clima, 3)
+        return np.where(valid, scores, -1.0)
+
+    def top_edges(self, rows, tipo, cols=None, scores=None):
+        """
+        Las TOP_EDGES mejores aristas de cada prenda de rows con las de un
+        tipo (todas las de ese tipo o solo cols): lista de {id: compatibilidad}.
+        scores: self.scores(rows, cols) si ya se ha calculado.
+        """
+        if cols is None:
+            cols = self.by_tipo.get(tipo, np.zeros(0, dtype=np.int64))
+        if not len(cols) or not len(rows):
+            return [{} for _ in rows]
+        if scores is None:
+            scores = self.scores(rows, cols)
+        k = min(TOP_EDGES, len(cols))
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        values = np.take_along_axis(scores, best, axis=1)
+        return [
+            {self.ids[cols[j]]: score for j, score in zip(row_best, row_values) if score >= 0}
+            for row_best, row_values in zip(best.tolist(), values.tolist())
+        ]
+
+
+def build_graph(items, block=BLOCK):
+    """
+    Grafo {id: {tipo: {id_vecino: compatibilidad}}}: para cada prenda, las
+    TOP_EDGES más compatibles de cada tipo complementario (al cargar el
+    armario en la caché). Coste O(n²) en NumPy por bloques, memoria O(n).
+    """
+    scorer = _Scorer(items)
+    graph = {item_id: {} for item_id in scorer.ids}
+    for tipo_a, rows_a in scorer.by_tipo.items():
+        for tipo_b in COMPLEMENTARY.get(tipo_a, ()):
+            if tipo_b not in scorer.by_tipo:
+                continue
+            for start in range(0, len(rows_a), block):
+                rows = rows_a[start:start + block]
+                for r, edges in zip(rows.tolist(), scorer.top_edges(rows, tipo_b)):
+                    if edges:
+                        graph[scorer.ids[r]][tipo_b] = edges
+    return graph
+
+
+def graph_changed(graph, items, item_id, item=None):
+    """
+    Grafo con la prenda item_id añadida o recalculada (item) o quitada
+    (item None), sin modificar el recibido (es el que comparten los
+    lectores de la caché): se copia el índice del grafo y solo las filas
+    de las prendas afectadas.
+
+    - las prendas que tenían a item_id entre sus mejores de su tipo
+      recalculan esa lista sin ella (NumPy, solo contra ese tipo)
+    - la prenda nueva calcula sus aristas y entra en la lista de las
+      prendas en las que supera a la peor (o que tienen hueco)
+
+    Args:
+        items: list - prendas del armario antes del cambio
+    """
+    rest = []
+    old = None
+    for other in items:
+        if other['id'] == item_id:
+            old = other
+        else:
+            rest.append(other)
+    scorer = _Scorer(rest + [item] if item is not None else rest)
+    n_rest = len(rest)
+    new = dict(graph)
+    new.pop(item_id, None)
+
+    if old is not None:
+        old_tipo = old.get('tipo')
+        affected = [other_id for other_id, row in new.items() if item_id in row.get(old_tipo, ())]
+        if affected:
+            positions = {other_id: pos for pos, other_id in enumerate(scorer.ids[:n_rest])}
+            rows = np.array([positions[other_id] for other_id in affected], dtype=np.int64)
+            cols = scorer.by_tipo.get(old_tipo, np.zeros(0, dtype=np.int64))
+            cols = cols[cols < n_rest]
+            for other_id, edges in zip(affected, scorer.top_edges(rows, old_tipo, cols)):
+                row = new[other_id] = dict(new[other_id])
+                if edges:
+                    row[old_tipo] = edges
+                else:
+                    row.pop(old_tipo, None)
+
+    if item is not None:
+        tipo = item.get('tipo')
+        pos = np.array([n_rest], dtype=np.int64)
+        row = new[item_id] = {}
+        for other_tipo in COMPLEMENTARY.get(tipo, ()):
+            cols = scorer.by_tipo.get(other_tipo)
+            if cols is None:
+                continue
+            scores = scorer.scores(pos, cols)
+            edges = scorer.top_edges(pos, other_tipo, cols, scores)[0]
+            if edges:
+                row[other_tipo] = edges
+            # Entra en la lista de las prendas de ese tipo en las que supera a la peor
+            for c, score in zip(cols.tolist(), scores[0].tolist()):
+                if score < 0:
+                    continue
+                other_id = scorer.ids[c]
+                current = new[other_id].get(tipo, {})
+                if len(current) >= TOP_EDGES:
+                    worst = min(current, key=current.get)
+                    if score <= current[worst]:
+                        continue
+                    current = {k: v for k, v in current.items() if k != worst}
+                else:
+                    current = dict(current)
+                current[item_id] = score
+                other_row = new[other_id] = dict(new[other_id])
+                other_row[tipo] = current
+    return new
+
+
+def neighbours(graph, item_id):
+    """Aristas de una prenda con todos los tipos: {id: compatibilidad}"""
+    return {other_id: score for edges in graph.get(item_id, {}).values() for other_id, score in edges.items()}
+
+
+def edge_score(graph, item_a, item_b):
+    """
+    Compatibilidad entre dos prendas si una está entre las mejores de la
+    otra para su tipo (0 si no hay arista en ninguno de los dos sentidos)
+    """
+    score = graph.get(item_a['id'], {}).get(item_b.get('tipo'), {}).get(item_b['id'])
+    if score is None:
+        score = graph.get(item_b['id'], {}).get(item_a.get('tipo'), {}).get(item_a['id'], 0)
+    return score
@@ -0,0 +1,165 @@
+import numpy as np
+
+from color_engine import color_code
+from item_tags import TAGS, derive_tags
+
+TIPOS = ('superior', 'inferior', 'vestido', 'calzado', 'complemento')
+MASK_FIELDS = ('ocasion', 'clima', 'estacion')
+
+
+def top_k(scores, k, mask=None):
+    """
+    Filas con las k mejores puntuaciones, de mejor a peor.
+    
+    Selección parcial con argpartition (O(n) más O(k log k) para ordenar
+    las k elegidas) en lugar de ordenar todo. Ante empates gana la fila
+    anterior, igual que una ordenación estable descendente.
+    
+    Args:
+        scores: np.ndarray - puntuación por fila
+        k: int - nº de filas a devolver
+        mask: np.ndarray de bool - filas candidatas (todas si es None)
+    
+    Returns:
+        list: índices de fila
+    """
+    rows = np.flatnonzero(mask) if mask is not None else np.arange(len(scores))
+    if k <= 0 or not len(rows):
+        return []
+    values = scores[rows]
+    if k < len(rows):
+        kth = values[np.argpartition(-values, k - 1)[k - 1]]
+        above = np.flatnonzero(values > kth)
+        # De los empatados con la k-ésima, los de fila más baja
+        ties = np.flatnonzero(values == kth)[:k - len(above)]
+        chosen = np.concatenate((above, ties))
+    else:
+        chosen = np.arange(len(rows))
+    order = np.lexsort((chosen, -values[chosen]))
+    return rows[chosen[order]].tolist()
+
+
+class FeatureMatrix:
+    """
+    Prendas codificadas como matriz de características para elegir el
+    outfit con NumPy en lugar de filtrar y ordenar listas por hueco.
+
+    Una fila por prenda:
+    - tipo y fit: códigos enteros
+    - ocasion, clima, estacion, tags: máscaras de bits (uint64)
+    - color: códigos de la tabla Lab de color_engine en formato CSR
+
+    Hay dos semánticas de filtrado, las mismas que antes:
+    - armario del usuario (user=True): ocasión y clima sin distinguir
+      mayúsculas (las prendas ya están en minúsculas, ver item_schema) y
+      las prendas sin 'estacion' valen para cualquier estación
+    - catálogo (user=False): igualdad exacta como search_items
+    """
+
+    def __init__(self, items, user=False, fetch=None):
+        """
+        Args:
+            items: iterable - prendas (con 'tipo'); con fetch basta con que
+                   lleven los campos codificados y se recorren una sola vez
+            user: bool - semántica del armario del usuario
+            fetch: callable(fila) -> prenda; si no se indica se guardan las prendas
+        """
+        if fetch is None:
+            items = list(items)
+        self.user = user
+        self._items = None if fetch else items
+        self._fetch = fetch
+        self.vocab = {field: {} for field in MASK_FIELDS + ('fit',)}
+        self._tipo_codes = {tipo: code for code, tipo in enumerate(TIPOS)}
+
+        tipo = []
+        fit = []
+        masks = {field: [] for field in MASK_FIELDS}
+        tags = []
+        has_estacion = []
+        color_counts = []
+        color_codes = []
+        tag_bits = {tag: 1 << bit for bit, tag in enumerate(TAGS)}
+        tipo_codes = self._tipo_codes
+
+        for item in items:
+            tipo.append(tipo_codes.get(item.get('tipo'), -1))
+            fit.append(self._code('fit', item.get('fit')))
+            has_estacion.append('estacion' in item)
+            for field in MASK_FIELDS:
+                mask = 0
+                for value in item.get(field, []):
+                    mask |= 1 << self._code(field, value)
+                masks[field].append(mask)
+            item_tags = item.get('tags')
+            if item_tags is None:
+                item_tags = derive_tags(item)
+            bits = 0
+            for t in item_tags:
+                bits |= tag_bits.get(t, 0)
+            tags.append(bits)
+            colors = item.get('color', [])
+            color_counts.append(len(colors))
+            color_codes.extend(color_code(c) for c in colors)
+
+        self.n = len(tipo)
+        self.tipo = np.array(tipo, dtype=np.int16)
+        self.fit = np.array(fit, dtype=np.int16)
+        self.masks = {field: np.array(values, dtype=np.uint64) for field, values in masks.items()}
+        self.tags = np.array(tags, dtype=np.uint64)
+        self.has_estacion = np.array(has_estacion, dtype=bool)
+        self.color_counts = np.array(color_counts, dtype=np.int64)
+        self.color_codes = np.array(color_codes, dtype=np.int64)
+        self.color_offsets = np.concatenate(([0], np.cumsum(self.color_counts)))[:-1].astype(np.int64)
+        self._tag_bits = tag_bits
+
+    def _code(self, field, value):
+        codes = self.vocab[field]
+        code = codes.get(value)
+        if code is None:
+            code = len(codes)
+            if code >= 64 and field != 'fit':
+                raise ValueError(f"Demasiados valores distintos para '{field}' (máx. 64)")
+            codes[value] = code
+        return code
+
+    def _has(self, field, value):
+        """Filas cuyo campo multivalor contiene value"""
+        if self.user and field != 'estacion':
+            value = value.lower()
+        code = self.vocab[field].get(value)
+        if code is None:
+            return np.zeros(self.n, dtype=bool)
+        return (self.masks[field] & np.uint64(1 << code)) != 0
+
+    def has_tag(self, tag):
+        """Filas con la etiqueta derivada"""
+        return (self.tags & np.uint64(self._tag_bits[tag])) != 0
+
+    def eligible(self, tipo, ocasion, clima, estacion=None):
+        """Máscara de prendas del tipo que valen para ocasión, clima y (si se indica) estación"""
+        code = self._tipo_codes.get(tipo)
+        if code is None:
+            return np.zeros(self.n, dtype=bool)
+        mask = (self.tipo == code) & self._has('ocasion', ocasion) & self._has('clima', clima)
+        if estacion is not None:
+            in_season = self._has('estacion', estacion)
+            if self.user:
+                in_season |= ~self.has_estacion
+            mask &= in_season
+        return mask
+
+    def color_scores(self, palette):
+        """Puntuación de color de todas las filas (mismo cálculo que ColorPalette.scores)"""
+        if not len(self.color_codes):
+            return np.zeros(self.n)
+        per_color = palette.similarity[self.color_codes]
+        totals = np.add.reduceat(np.append(per_color, 0.0), self.color_offsets)
+        totals[self.color_counts == 0] = 0.0
+        return totals / np.maximum(self.color_counts, 1)
+
+    def item(self, row):
+        """Prenda de una fila"""
+        if self._fetch is not None:
+            return self._fetch(row)
+        return self._items[row]
@@ -0,0 +1,100 @@
+import json
+import os
+import stat
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo cerrojo entre hilos del proceso
+    fcntl = None
+
+
+class FileLock:
+    """
+    Cerrojo de escritura de un fichero: exclusivo entre procesos (flock
+    sobre <fichero>.lock, para varios workers de gunicorn) y entre hilos,
+    reentrante dentro del mismo hilo.
+
+    Los lectores no lo usan: los ficheros se sustituyen de forma atómica
+    con atomic_write_json, así que nunca se ven a medio escribir.
+    """
+
+    def __init__(self, path):
+        self.lock_file = path + '.lock'
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+            except BaseException:
+                self._thread_lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0:
+            fd, self._fd = self._fd, None
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        self._thread_lock.release()
+
+
+# umask del proceso (solo se puede leer cambiándola: se hace una vez al importar)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def _file_mode(path):
+    """Permisos para el fichero reescrito: los que ya tenía o, si es nuevo, los de open() (0666 & ~umask)"""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+# Un FileLock por fichero en todo el proceso
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def file_lock(path):
+    """Cerrojo de escritura del fichero (el mismo para todas las instancias del proceso)"""
+    with _locks_lock:
+        lock = _locks.get(path)
+        if lock is None:
+            lock = _locks[path] = FileLock(path)
+        return lock
+
+
+def atomic_write_json(path, data, **dump_kwargs):
+    """
+    Escribe JSON en un temporal del mismo directorio y lo renombra sobre
+    path: quien lea ve el fichero anterior o el nuevo, nunca uno truncado.
+    El temporal (mkstemp lo crea con 0600) toma los permisos de _file_mode.
+    """
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_file = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_file, _file_mode(path))
+        os.replace(tmp_file, path)
+    except BaseException:
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+        raise
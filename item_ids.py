@@ -0,0 +1,50 @@
+# Identificadores de prendas del armario.
+#
+# Formato (al estilo ULID, pero legible y compatible con los ids antiguos
+# 'item_<ms>'):
+#     item_<ms, 13 dígitos>_<nodo, 8 hex><contador, 10 hex>
+# - ms: milisegundos desde epoch; no retrocede aunque lo haga el reloj
+# - nodo: aleatorio por proceso (se regenera en cada fork, p. ej. workers
+#   de gunicorn), así dos procesos no generan el mismo id
+# - contador: crece en cada id del proceso
+#
+# Todos los campos tienen ancho fijo, así que los ids se ordenan como texto
+# por momento de creación, también respecto a los antiguos 'item_<ms>'
+# (mismo prefijo de 13 dígitos). El prefijo 'item_' es el que usa la app
+# para distinguir prendas del usuario de las del catálogo.
+
+import os
+import threading
+import time
+
+PREFIX = 'item_'
+
+
+class ItemIdGenerator:
+    """Generador de ids únicos, monótono y seguro entre hilos"""
+
+    def __init__(self, prefix=PREFIX):
+        self.prefix = prefix
+        self._reset()
+
+    def _reset(self):
+        """Nodo nuevo y contador a cero (al crearlo y en el hijo tras un fork)"""
+        self._lock = threading.Lock()
+        self._node = f"{int.from_bytes(os.urandom(4), 'big'):08x}"
+        self._last_ms = 0
+        self._counter = 0
+
+    def __call__(self):
+        with self._lock:
+            ms = max(time.time_ns() // 1_000_000, self._last_ms)
+            self._last_ms = ms
+            self._counter += 1
+            counter = self._counter
+        return f"{self.prefix}{ms:013d}_{self._node}{counter:010x}"
+
+
+new_item_id = ItemIdGenerator()
+
+if hasattr(os, 'register_at_fork'):
+    # Un proceso hijo no debe repetir el nodo ni el contador del padre
+    os.register_at_fork(after_in_child=new_item_id._reset)
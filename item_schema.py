@@ -0,0 +1,167 @@
+# Esquema canónico de las prendas del armario.
+# Se aplica al escribir (add/update, log de cambios) y, una sola vez, a los
+# armarios ya guardados (migrate_wardrobes), así el recomendador trabaja con
+# datos limpios y no tiene que parsear JSON ni comparar sin mayúsculas en
+# cada petición.
+#
+# Prenda canónica:
+# - color, ocasion, clima: listas de textos en minúsculas, sin repetidos
+# - clima: un único campo, igual que el catálogo ('clima_apropiado' solo
+#   se acepta como nombre de entrada y se renombra)
+# - estacion (opcional): lista con los nombres de ESTACIONES ('Otoño'...)
+# - tipo, fit: texto en minúsculas
+# - tags: etiquetas derivadas de item_tags
+
+import json
+import os
+import sys
+
+from clothing_database import ESTACIONES
+from file_store import atomic_write_json, file_lock
+from item_tags import derive_tags
+from wardrobe_journal import journal_path
+
+SCHEMA_VERSION = 1
+
+LIST_FIELDS = ('color', 'ocasion', 'clima')
+TEXT_FIELDS = ('tipo', 'fit')
+
+_ESTACIONES = {estacion.lower(): estacion for estacion in ESTACIONES}
+
+
+def as_list(value):
+    """
+    Valor de un campo multivalor como lista de textos sin repetidos.
+    Acepta lista, texto simple o lista serializada como JSON (formularios
+    y armarios antiguos).
+    """
+    if value is None:
+        return []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            value = [value]
+    if not isinstance(value, list):
+        value = [value]
+
+    values = []
+    for v in value:
+        if v is None:
+            continue
+        v = str(v).strip()
+        if v and v not in values:
+            values.append(v)
+    return values
+
+
+def check_item_types(item):
+    """
+    Comprueba los tipos de los campos de entrada (formularios, importación)
+    antes de normalizar: nombre, tipo y fit son texto; los multivalor,
+    texto o lista de textos.
+
+    Raises:
+        ValueError: con el primer campo que no tiene el tipo esperado
+    """
+    for field in ('nombre',) + TEXT_FIELDS:
+        if field in item and not isinstance(item[field], str):
+            raise ValueError(f"El campo '{field}' debe ser texto")
+    for field in LIST_FIELDS + ('clima_apropiado', 'estacion'):
+        value = item.get(field)
+        if value is None or isinstance(value, str):
+            continue
+        if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+            raise ValueError(f"El campo '{field}' debe ser texto o lista de textos")
+
+
+def normalize_item(item):
+    """
+    Lleva una prenda al esquema canónico, en el sitio.
+
+    Returns:
+        dict: la misma prenda
+    """
+    if 'clima_apropiado' in item:
+        item['clima'] = item.pop('clima_apropiado')
+
+    for field in LIST_FIELDS:
+        if field in item:
+            item[field] = list(dict.fromkeys(v.lower() for v in as_list(item[field])))
+
+    if 'estacion' in item:
+        item['estacion'] = list(dict.fromkeys(_ESTACIONES.get(v.lower(), v) for v in as_list(item['estacion'])))
+
+    for field in TEXT_FIELDS:
+        if isinstance(item.get(field), str):
+            item[field] = item[field].strip().lower()
+
+    item['tags'] = derive_tags(item)
+    return item
+
+
+def copy_item(item):
+    """
+    Copia independiente de una prenda (también sus listas), para entregar
+    las del armario en caché sin que quien las recibe pueda modificarlas.
+    """
+    return {key: list(value) if isinstance(value, list) else value for key, value in item.items()}
+
+
+def migrate_wardrobe(wardrobe):
+    """
+    Migra un armario cargado al esquema actual, en el sitio.
+    El grafo de compatibilidad ya no se guarda (se calcula en memoria) y
+    las estadísticas se descartan: se recuentan al leerlo.
+
+    Returns:
+        bool: True si hubo que migrarlo
+    """
+    if wardrobe.get('schema_version') == SCHEMA_VERSION:
+        return False
+    for item in wardrobe['items']:
+        normalize_item(item)
+    wardrobe.pop('compatibility', None)
+    wardrobe.pop('stats', None)
+    wardrobe['schema_version'] = SCHEMA_VERSION
+    return True
+
+
+def migrate_wardrobes(directory='data/wardrobes'):
+    """
+    Migración única de los armarios guardados en disco (cada uno con su
+    cerrojo de escritura y sustitución atómica). Los que tienen log de
+    cambios pendiente se dejan: se migran al leerlos y al compactar.
+
+    Returns:
+        list: ficheros migrados
+    """
+    migrated = []
+    if not os.path.isdir(directory):
+        return migrated
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.json'):
+            continue
+        path = os.path.join(directory, name)
+        with file_lock(path):
+            if os.path.exists(journal_path(path)):
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                wardrobe = json.load(f)
+            if migrate_wardrobe(wardrobe):
+                atomic_write_json(path, wardrobe, indent=2, ensure_ascii=False)
+                migrated.append(path)
+    return migrated
+
+
+if __name__ == "__main__":
+    # python item_schema.py migrate  -> migra data/wardrobes al esquema actual
+    if len(sys.argv) > 1 and sys.argv[1] == 'migrate':
+        migrated = migrate_wardrobes()
+        print(f" {len(migrated)} armarios migrados al esquema v{SCHEMA_VERSION}")
+        for path in migrated:
+            print(f"   - {path}")
+    else:
+        item = normalize_item({'nombre': 'Botas marrones', 'tipo': 'Calzado', 'color': '["Marron"]',
+                               'ocasion': 'Casual', 'clima_apropiado': '["FRIO", "templado"]'})
+        print(f" Prenda canónica: {item}")
@@ -0,0 +1,48 @@
+# Etiquetas derivadas de prendas (catálogo y armario).
+# Se calculan una sola vez al cargar o añadir la prenda a partir de su
+# nombre y tipo, así el generador filtra comprobando una etiqueta en lugar
+# de buscar subcadenas en cada petición.
+
+# Palabras que marcan una prenda como femenina, por categoría
+PALABRAS_FEMENINAS = {
+    'calzado': ['alpargata', 'sandalia'],
+    'complemento': ['bolso', 'bolsa', 'cartera', 'collar', 'pendiente', 'diadema', 'horquilla', 'pañuelo']
+}
+
+TAGS = ('is_feminine', 'is_boot', 'is_warm_accessory', 'is_skirt', 'is_trousers')
+
+
+def derive_tags(item, tipo=None):
+    """
+    Calcula las etiquetas de una prenda.
+
+    Args:
+        item: dict - prenda con 'nombre' (y 'tipo' si no se pasa tipo)
+        tipo: str - tipo de la prenda, si no está en el propio dict
+
+    Returns:
+        list: etiquetas de TAGS que aplican
+    """
+    tipo = tipo or item.get('tipo')
+    nombre = (item.get('nombre') or '').lower()
+
+    tags = []
+    if any(palabra in nombre for palabra in PALABRAS_FEMENINAS.get(tipo, [])):
+        tags.append('is_feminine')
+    if 'bota' in nombre:
+        tags.append('is_boot')
+    if 'bufanda' in nombre or 'gorro' in nombre:
+        tags.append('is_warm_accessory')
+    if 'falda' in nombre:
+        tags.append('is_skirt')
+    if 'pantalon' in nombre:
+        tags.append('is_trousers')
+    return tags
+
+
+def has_tag(item, tag):
+    """Comprueba una etiqueta (la calcula si la prenda aún no las tiene)"""
+    tags = item.get('tags')
+    if tags is None:
+        tags = derive_tags(item)
+    return tag in tags
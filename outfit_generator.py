@@ -37,11 +37,18 @@ class OutfitGenerator:
     # =========================
     # Asegurar prendas obligatorias
     # =========================
+    def _writable(self, outfit_items):
+        """Copy-on-write: los outfits de solo lectura del catálogo se copian antes de modificarlos"""
+        if getattr(outfit_items, 'readonly', False):
+            return outfit_items.thaw()
+        return outfit_items
+
     def ensure_complete_outfit(self, outfit_items, genero='mujer'):
         es_mujer = 'mujer' in genero.lower()
 
         # Vestido o superior
         if 'vestido' not in outfit_items and 'superior' not in outfit_items:
+            outfit_items = self._writable(outfit_items)
             outfit_items['superior'] = {
                 'nombre': 'blusa básica' if es_mujer else 'camisa básica',
                 'nombre_corto': 'blusa' if es_mujer else 'camisa',
@@ -50,6 +57,7 @@ class OutfitGenerator:
 
         # Inferior si no hay vestido
         if 'vestido' not in outfit_items and 'inferior' not in outfit_items:
+            outfit_items = self._writable(outfit_items)
             outfit_items['inferior'] = {
                 'nombre': 'falda negra' if es_mujer else 'pantalón negro',
                 'nombre_corto': 'falda' if es_mujer else 'pantalón',
@@ -58,6 +66,7 @@ class OutfitGenerator:
 
         # Calzado obligatorio
         if 'calzado' not in outfit_items:
+            outfit_items = self._writable(outfit_items)
             outfit_items['calzado'] = {
                 'nombre': 'tacones' if es_mujer else 'zapatillas',
                 'nombre_corto': 'tacones' if es_mujer else 'zapatillas',
@@ -223,14 +232,18 @@ class OutfitGenerator:
             narrativa += f"\n\n{self.explicaciones_color[season]} "
             narrativa += f"Apuesta por colores como {colores_texto}. "
         
+        narrativa += self._fit_text(fit)
+        
+        return narrativa
+    
+    def _fit_text(self, fit):
+        """Frase final de la narrativa según el corte preferido"""
         fit_texts = {
             'ajustada': "Como prefieres corte ajustado, busca prendas que marquen tu silueta sin perder comodidad.",
             'holgada': "Como prefieres ropa holgada, elige prendas oversized que te den libertad de movimiento.",
             'normal': "Un corte regular te permitirá jugar con diferentes estilos."
         }
-        narrativa += fit_texts.get(fit, "")
-        
-        return narrativa
+        return fit_texts.get(fit, "")
     
     # =========================
     # OUTFIT GENÉRICO COMPLETO
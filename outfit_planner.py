@@ -0,0 +1,107 @@
+from datetime import date, timedelta
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from clima_index import MESES
+
+# Coste de una asignación prohibida (prenda repetida dentro de la ventana)
+PROHIBIDO = 1e9
+
+# Ventaja de las prendas del armario sobre las del catálogo en el plan
+# (mayor que cualquier puntuación de color, que va de 0 a 100)
+PRIORIDAD_ARMARIO = 1000.0
+
+
+def dias_del_plan(mes, n_dias, dia_inicio=1, anio=None):
+    """
+    Fechas del plan a partir del día indicado del mes.
+    Si el plan pasa al mes siguiente, cada día usa el clima de su mes.
+
+    Returns:
+        list: [(date, nombre del mes)]
+    """
+    anio = anio or date.today().year
+    inicio = date(anio, MESES.index(mes) + 1, dia_inicio)
+    dias = []
+    for i in range(n_dias):
+        dia = inicio + timedelta(days=i)
+        dias.append((dia, MESES[dia.month - 1]))
+    return dias
+
+
+def _key(item):
+    """Identidad de una prenda para detectar repeticiones"""
+    return item.get('id') or id(item)
+
+
+def assign_slot(candidates_by_day, ventana, repetir=True):
+    """
+    Asigna una prenda de un hueco a cada día sin repetir ninguna dentro de
+    la ventana, maximizando la puntuación total.
+
+    Los días se procesan en bloques de `ventana` días: dentro de un bloque
+    todas las prendas deben ser distintas, lo que es exactamente un problema
+    de asignación (se resuelve óptimo con el algoritmo húngaro); las prendas
+    de los bloques anteriores quedan prohibidas en los días que caen dentro
+    de su ventana. Si no hay prendas suficientes se repite la mejor posible
+    o, con repetir=False, ese día se queda sin prenda.
+
+    Args:
+        candidates_by_day: list - por día, lista de (prenda, puntuación) o None
+                           si ese día no lleva este hueco
+        ventana: int - días en los que una prenda no puede repetirse
+        repetir: bool - repetir prenda cuando no queda ninguna libre
+
+    Returns:
+        list: por día, (prenda, repetida) o None
+    """
+    n = len(candidates_by_day)
+    ventana = max(1, ventana)
+    result = [None] * n
+    last_used = {}
+
+    for start in range(0, n, ventana):
+        block = [d for d in range(start, min(start + ventana, n)) if candidates_by_day[d]]
+        if not block:
+            continue
+
+        columns = {}
+        for d in block:
+            for item, _ in candidates_by_day[d]:
+                columns.setdefault(_key(item), item)
+        keys = list(columns)
+        index = {key: j for j, key in enumerate(keys)}
+
+        cost = np.full((len(block), len(keys)), PROHIBIDO)
+        for i, d in enumerate(block):
+            for item, score in candidates_by_day[d]:
+                key = _key(item)
+                if key in last_used and d - last_used[key] < ventana:
+                    continue
+                cost[i, index[key]] = -score
+
+        rows, cols = linear_sum_assignment(cost)
+        for i, j in zip(rows, cols):
+            if cost[i, j] < PROHIBIDO:
+                result[block[i]] = columns[keys[j]]
+
+        # Días sin prenda libre: se repite la de mayor puntuación
+        if repetir:
+            for d in block:
+                if result[d] is None:
+                    result[d] = max(candidates_by_day[d], key=lambda c: c[1])[0]
+
+        for d in block:
+            if result[d] is not None:
+                last_used[_key(result[d])] = d
+
+    # Prendas repetidas dentro de la ventana
+    last_used = {}
+    for d, item in enumerate(result):
+        if item is None:
+            continue
+        key = _key(item)
+        result[d] = (item, key in last_used and d - last_used[key] < ventana)
+        last_used[key] = d
+    return result
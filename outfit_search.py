@@ -0,0 +1,155 @@
+import heapq
+import itertools
+
+import numpy as np
+
+from color_engine import COLOR_LAB, COLOR_NAMES, DELTA_E_MAX, UNKNOWN, color_code, item_colors
+
+# Colores que combinan con cualquier otro
+NEUTRALES = ('negro', 'blanco', 'gris', 'gris claro', 'gris oscuro', 'gris plateado', 'beige', 'crema',
+             'hueso', 'nude', 'camel', 'plata', 'plateado', 'vaquero', 'denim')
+
+# Peso de la armonía de cada par de prendas frente a la puntuación de paleta
+HARMONY_WEIGHT = 0.25
+
+# Límites de la búsqueda: candidatas por hueco y nodos expandidos
+MAX_CANDIDATES = 25
+MAX_EXPANSIONS = 20000
+
+
+def _build_harmony_table():
+    """
+    Armonía (0-100) entre cada par de colores de la tabla: los neutros
+    combinan con todo y el resto según su cercanía ΔE en CIELAB.
+    La última fila/columna es la de UNKNOWN (-1) y vale 0.
+    """
+    delta_e = np.linalg.norm(COLOR_LAB[:, None, :] - COLOR_LAB[None, :, :], axis=2)
+    table = np.clip(1.0 - delta_e / DELTA_E_MAX, 0.0, 1.0) * 100
+    neutral = np.array([name in NEUTRALES for name in COLOR_NAMES])
+    table[neutral, :] = 100
+    table[:, neutral] = 100
+    n = len(COLOR_NAMES)
+    padded = np.zeros((n + 1, n + 1))
+    padded[:n, :n] = table
+    return padded
+
+
+HARMONY = _build_harmony_table()
+
+
+def color_codes(items):
+    """Códigos de color por prenda, rellenados repitiendo el primero (no cambia el máximo)"""
+    codes = [[color_code(c) for c in item_colors(item)] or [UNKNOWN] for item in items]
+    width = max(len(c) for c in codes)
+    return np.array([c + [c[0]] * (width - len(c)) for c in codes], dtype=np.int64)
+
+
+def harmony_profiles(items):
+    """Armonía de cada prenda con cada color de la tabla (la de su mejor color): prendas x colores"""
+    return HARMONY[color_codes(items)].max(axis=1)
+
+
+def harmony_matrix(items_a, items_b, profiles_a=None, codes_b=None):
+    """
+    Armonía entre cada prenda de items_a y cada una de items_b (mejor par
+    de colores): el perfil de cada prenda de a evaluado en los colores de b.
+    profiles_a / codes_b: harmony_profiles(items_a) / color_codes(items_b)
+    ya calculados (el grafo de compatibilidad los prepara una vez por armario).
+    """
+    if profiles_a is None:
+        profiles_a = harmony_profiles(items_a)
+    if codes_b is None:
+        codes_b = color_codes(items_b)
+    return profiles_a[:, codes_b].max(axis=2)
+
+
+class OutfitSearch:
+    """
+    Búsqueda de los N mejores outfits completos.
+
+    Puntuación de un outfit = suma de la puntuación de paleta de cada prenda
+    + HARMONY_WEIGHT * armonía de cada par de prendas, dividida por su máximo
+    posible para que outfits con vestido (3 prendas) y con superior e
+    inferior (4 prendas) se comparen en la misma escala 0-100.
+
+    Búsqueda best-first: cada nodo es un outfit parcial (los primeros huecos
+    ya elegidos) con una cota superior de lo que puede llegar a sumar; se
+    expande siempre el de mayor cota, así que los outfits completos salen en
+    orden exacto de puntuación y las ramas con cota baja no se exploran.
+    """
+
+    def __init__(self, structures, palette, harmony_weight=HARMONY_WEIGHT, max_expansions=MAX_EXPANSIONS):
+        """
+        Args:
+            structures: list - estructuras alternativas de outfit, cada una
+                        una lista de (hueco, candidatas) en orden de búsqueda
+            palette: ColorPalette - paleta del usuario
+        """
+        self.weight = harmony_weight
+        self.max_expansions = max_expansions
+        self.structures = []
+        for structure in structures:
+            slots = [(slot, list(items)) for slot, items in structure if items]
+            if not slots:
+                continue
+            scores = [np.array([palette.score(item) for item in items]) for _, items in slots]
+            pairs = {}
+            for i, j in itertools.combinations(range(len(slots)), 2):
+                pairs[i, j] = harmony_matrix(slots[i][1], slots[j][1])
+            # Máxima armonía posible entre cada par de huecos
+            pair_max = {key: matrix.max() for key, matrix in pairs.items()}
+            norm = len(slots) + self.weight * len(pairs)
+            self.structures.append({'slots': slots, 'scores': scores, 'pairs': pairs, 'pair_max': pair_max,
+                                    'norm': norm})
+
+    def _bound(self, structure, chosen):
+        """Cota superior de cualquier outfit que complete la elección parcial"""
+        depth = len(chosen)
+        slots = structure['slots']
+        bound = 0.0
+        for s in range(depth, len(slots)):
+            # Mejor candidata del hueco teniendo en cuenta lo ya elegido
+            best = structure['scores'][s].copy()
+            for a, row in enumerate(chosen):
+                best += self.weight * structure['pairs'][a, s][row]
+            bound += best.max()
+            for t in range(s + 1, len(slots)):
+                bound += self.weight * structure['pair_max'][s, t]
+        return bound
+
+    def top(self, n):
+        """
+        Los n mejores outfits (o los encontrados antes de agotar el límite de expansiones).
+
+        Returns:
+            list: [{'outfit': {hueco: prenda}, 'score': float}], de mejor a peor
+        """
+        heap = []
+        counter = itertools.count()
+        for index, structure in enumerate(self.structures):
+            heapq.heappush(heap, (-self._bound(structure, ()) / structure['norm'], next(counter), index, (), 0.0))
+
+        results = []
+        expansions = 0
+        while heap and len(results) < n and expansions < self.max_expansions:
+            neg_bound, _, index, chosen, score = heapq.heappop(heap)
+            structure = self.structures[index]
+            slots = structure['slots']
+            depth = len(chosen)
+            if depth == len(slots):
+                results.append({
+                    'outfit': {slots[s][0]: slots[s][1][row] for s, row in enumerate(chosen)},
+                    'score': round(score / structure['norm'], 2)
+                })
+                continue
+
+            expansions += 1
+            gains = structure['scores'][depth].copy()
+            for a, row in enumerate(chosen):
+                gains += self.weight * structure['pairs'][a, depth][row]
+            for row, gain in enumerate(gains):
+                child = chosen + (row,)
+                child_score = score + gain
+                bound = child_score + self._bound(structure, child)
+                heapq.heappush(heap, (-bound / structure['norm'], next(counter), index, child, child_score))
+        return results
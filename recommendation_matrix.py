@@ -0,0 +1,300 @@
+import json
+import mmap
+import multiprocessing
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from clima_index import MESES, categorizar_clima, file_digest
+from clothing_database import CLIMAS, ESTACIONES, OCASIONES
+from outfit_generator import OutfitGenerator
+
+# Formato de la matriz de recomendaciones:
+#   cabecera  -> magic, versión, longitud de la cabecera JSON
+#   JSON      -> dimensiones, sha1 del catálogo y del clima, tabla de prendas
+#   índice    -> por combinación: (offset, longitud) uint32 dentro de los datos
+#   datos     -> por combinación: JSON comprimido con zlib
+#                {'outfit_items': {hueco: nº de prenda o prenda}, 'narrative': texto}
+MATRIX_MAGIC = b'RECO'
+MATRIX_VERSION = 1
+MATRIX_HEADER = struct.Struct('<4sHI')
+MATRIX_ENTRY = struct.Struct('<II')
+
+GENEROS = ['mujer', 'hombre']
+# Marca del nombre del usuario en la narrativa precalculada
+NOMBRE = '{nombre}'
+
+# Estado de cada proceso del pool (lo rellena _init_worker)
+_worker = {}
+
+
+def _combinations(n_provincias):
+    """Orden de las combinaciones en el índice: provincia, mes, ocasión, estación, no_vestidos, género"""
+    for p in range(n_provincias):
+        for m in range(len(MESES)):
+            for ocasion in OCASIONES:
+                for estacion in ESTACIONES:
+                    for no_vestidos in (False, True):
+                        for genero in GENEROS:
+                            yield p, m, ocasion, estacion, no_vestidos, genero
+
+
+def _init_worker(items, outfits, paletas):
+    _worker['items'] = items
+    _worker['outfits'] = outfits
+    _worker['paletas'] = paletas
+    _worker['generator'] = OutfitGenerator()
+
+
+def _render_provincia(climas):
+    """
+    Narrativas de todas las combinaciones de una provincia.
+    El outfit ya viene calculado; solo cambia el clima del mes.
+
+    Args:
+        climas: list - clima de la provincia en cada mes
+
+    Returns:
+        list: registros comprimidos, en el orden de _combinations
+    """
+    items = _worker['items']
+    generator = _worker['generator']
+    records = []
+    for _, m, ocasion, estacion, no_vestidos, genero in _combinations(1):
+        clima_info = climas[m]
+        clima = categorizar_clima(clima_info['temperatura'])
+        refs = _worker['outfits'][ocasion, clima, estacion, no_vestidos, genero]
+        outfit_items = {slot: dict(items[ref]) for slot, ref in refs.items()}
+        # La frase de la intro es aleatoria: la semilla depende solo del contenido,
+        # así el fichero es reproducible y los registros iguales se comparten
+        random.seed(f"{ocasion}|{estacion}|{no_vestidos}|{genero}|{clima_info['temperatura']}|"
+                    f"{clima_info['prob_lluvia']}")
+        result = generator.generate_outfit_complete(
+            user_data={'nombre': NOMBRE, 'ocasion': ocasion, 'genero': genero, 'fit': ''},
+            clima_info=clima_info,
+            colorimetry_result={'season': estacion, 'palette_names': _worker['paletas'][estacion]},
+            outfit_items=outfit_items
+        )
+        record = {
+            'outfit_items': {slot: refs.get(slot, item) for slot, item in result['outfit_items'].items()},
+            'narrative': result['outfit_narrative']
+        }
+        records.append(zlib.compress(json.dumps(record, ensure_ascii=False).encode('utf-8'), 9))
+    return records
+
+
+def build_matrix(output_file='data/recomendaciones.bin', workers=None):
+    """
+    Precalcula la recomendación de catálogo (outfit + narrativa) para cada
+    provincia x mes x ocasión x estación x no_vestidos x género.
+
+    El outfit solo depende de (ocasión, clima, estación, no_vestidos,
+    género), así que se calcula una vez por combinación con la tabla
+    materializada de la app; las narrativas (que llevan temperatura y
+    lluvia) se generan por provincia en un pool de procesos.
+
+    Returns:
+        dict: nº de combinaciones, tamaño en bytes y segundos
+    """
+    # La app carga el catálogo y precalcula su tabla de outfits al importarse
+    from app import clima_index, clothing_db, colorimetry_analyzer, generate_smart_outfit
+
+    start = time.perf_counter()
+    paletas = {season: p['colores_texto'] for season, p in colorimetry_analyzer.paletas.items()}
+
+    items = []
+    item_refs = {}
+    outfits = {}
+    for ocasion in OCASIONES:
+        for clima in CLIMAS:
+            for estacion in ESTACIONES:
+                for no_vestidos in (False, True):
+                    for genero in GENEROS:
+                        outfit = generate_smart_outfit(
+                            user_items=[], db_items=clothing_db, ocasion=ocasion, clima=clima,
+                            temperatura=20, prob_lluvia=30, estacion=estacion,
+                            palette_colors=paletas[estacion], fit_preference=None,
+                            no_vestidos=no_vestidos, no_faldas=False, no_pantalones=False,
+                            no_tops=False, genero=genero
+                        )
+                        refs = {}
+                        for slot, item in outfit.items():
+                            if item['id'] not in item_refs:
+                                item_refs[item['id']] = len(items)
+                                items.append(dict(item))
+                            refs[slot] = item_refs[item['id']]
+                        outfits[ocasion, clima, estacion, no_vestidos, genero] = refs
+
+    provincias = clima_index.provincias()
+    tasks = [[clima_index.get(provincia, mes) for mes in MESES] for provincia in provincias]
+    # spawn: los procesos no heredan los hilos de la app (vigilante del catálogo)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(items, outfits, paletas)) as pool:
+        records = [record for chunk in pool.map(_render_provincia, tasks) for record in chunk]
+
+    header = json.dumps({
+        'provincias': provincias,
+        'meses': MESES,
+        'ocasiones': OCASIONES,
+        'estaciones': ESTACIONES,
+        'generos': GENEROS,
+        'paletas': paletas,
+        'catalog_sha1': file_digest(clothing_db.db_file).hex(),
+        'clima_sha1': file_digest(clima_index.xlsx_file).hex(),
+        'items': items
+    }, ensure_ascii=False).encode('utf-8')
+
+    tmp_file = output_file + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        f.write(MATRIX_HEADER.pack(MATRIX_MAGIC, MATRIX_VERSION, len(header)))
+        f.write(header)
+        # Provincias con el mismo clima en un mes comparten registro
+        offsets = {}
+        blob = []
+        size = 0
+        for record in records:
+            if record not in offsets:
+                offsets[record] = size
+                blob.append(record)
+                size += len(record)
+            f.write(MATRIX_ENTRY.pack(offsets[record], len(record)))
+        for record in blob:
+            f.write(record)
+    os.replace(tmp_file, output_file)
+
+    return {
+        'combinaciones': len(records),
+        'registros': len(blob),
+        'prendas': len(items),
+        'bytes': os.path.getsize(output_file),
+        'segundos': round(time.perf_counter() - start, 2)
+    }
+
+
+class RecommendationMatrix:
+    """
+    Vista de solo lectura sobre la matriz precalculada, mapeada en memoria.
+    Al abrirla solo se decodifica la cabecera JSON; cada consulta lee y
+    descomprime un único registro del mmap.
+    """
+
+    def __init__(self, matrix_file, catalog_file='data/clothing_items.json', xlsx_file='data/clima_provincias.xlsx'):
+        self.catalog_file = catalog_file
+        self.xlsx_file = xlsx_file
+        with open(matrix_file, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, header_len = MATRIX_HEADER.unpack_from(self._mm, 0)
+        if magic != MATRIX_MAGIC or version != MATRIX_VERSION:
+            self._mm.close()
+            raise ValueError(f"Matriz de recomendaciones no válida: {matrix_file}")
+
+        offset = MATRIX_HEADER.size
+        header = json.loads(self._mm[offset:offset + header_len].decode('utf-8'))
+        self.catalog_sha1 = header['catalog_sha1']
+        self.clima_sha1 = header['clima_sha1']
+        self.paletas = header['paletas']
+        self._items = header['items']
+        self._provincias = {p: i for i, p in enumerate(header['provincias'])}
+        self._meses = {m: i for i, m in enumerate(header['meses'])}
+        self._ocasiones = {o: i for i, o in enumerate(header['ocasiones'])}
+        self._estaciones = {e: i for i, e in enumerate(header['estaciones'])}
+        self._generos = {g: i for i, g in enumerate(header['generos'])}
+        self._index_offset = offset + header_len
+        self._data_offset = self._index_offset + len(self) * MATRIX_ENTRY.size
+        self._mtimes = None
+        self._fresh = False
+
+    def __len__(self):
+        return (len(self._provincias) * len(self._meses) * len(self._ocasiones) * len(self._estaciones)
+                * 2 * len(self._generos))
+
+    def _stat_sources(self):
+        """mtime del catálogo y del Excel de clima (None si no existen)"""
+        mtimes = []
+        for path in (self.catalog_file, self.xlsx_file):
+            try:
+                mtimes.append(os.path.getmtime(path))
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def is_fresh(self):
+        """
+        True si se generó con el catálogo y el clima actuales.
+        El sha1 solo se vuelve a calcular si cambia el mtime de alguno.
+        """
+        mtimes = self._stat_sources()
+        if mtimes != self._mtimes:
+            self._mtimes = mtimes
+            try:
+                self._fresh = (file_digest(self.catalog_file).hex() == self.catalog_sha1
+                               and file_digest(self.xlsx_file).hex() == self.clima_sha1)
+            except OSError:
+                self._fresh = False
+        return self._fresh
+
+    def get(self, provincia, mes, ocasion, estacion, no_vestidos, genero):
+        """
+        Recomendación precalculada o None si la combinación no está.
+
+        Returns:
+            dict: {'outfit_items': {hueco: prenda}, 'narrative': texto con NOMBRE}
+        """
+        keys = (self._provincias.get(provincia), self._meses.get(mes), self._ocasiones.get(ocasion),
+                self._estaciones.get(estacion), 1 if no_vestidos else 0, self._generos.get(genero))
+        if None in keys:
+            return None
+        p, m, o, e, v, g = keys
+        index = ((((p * len(self._meses) + m) * len(self._ocasiones) + o) * len(self._estaciones) + e) * 2 + v) \
+            * len(self._generos) + g
+        start, length = MATRIX_ENTRY.unpack_from(self._mm, self._index_offset + index * MATRIX_ENTRY.size)
+        start += self._data_offset
+        record = json.loads(zlib.decompress(self._mm[start:start + length]).decode('utf-8'))
+        record['outfit_items'] = {
+            slot: dict(self._items[ref]) if isinstance(ref, int) else ref
+            for slot, ref in record['outfit_items'].items()
+        }
+        return record
+
+    def close(self):
+        self._mm.close()
+
+
+def open_matrix(matrix_file='data/recomendaciones.bin', catalog_file='data/clothing_items.json',
+                xlsx_file='data/clima_provincias.xlsx'):
+    """Abre la matriz si existe y corresponde al catálogo y clima actuales, si no None"""
+    if not os.path.exists(matrix_file):
+        return None
+    try:
+        matrix = RecommendationMatrix(matrix_file, catalog_file, xlsx_file)
+    except (OSError, ValueError, struct.error) as e:
+        print(f" Matriz de recomendaciones ignorada: {e}")
+        return None
+    if not matrix.is_fresh():
+        print(" Matriz de recomendaciones desactualizada, se genera cada outfit al vuelo.")
+        matrix.close()
+        return None
+    return matrix
+
+
+if __name__ == "__main__":
+    # python recommendation_matrix.py build [procesos]  -> genera data/recomendaciones.bin
+    if len(sys.argv) > 1 and sys.argv[1] == 'build':
+        workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+        stats = build_matrix(workers=workers)
+        print(f" Matriz generada: {stats['combinaciones']} combinaciones ({stats['registros']} registros distintos), "
+              f"{stats['prendas']} prendas, "
+              f"{stats['bytes'] / 1024:.1f} KB en {stats['segundos']} s")
+    else:
+        matrix = open_matrix()
+        if matrix is None:
+            print(" No hay matriz de recomendaciones al día (python recommendation_matrix.py build)")
+        else:
+            record = matrix.get('Madrid', 'Enero', 'casual', 'Primavera', False, 'mujer')
+            print(f" Matriz lista: {len(matrix)} combinaciones")
+            print(record['narrative'].replace(NOMBRE, 'Ana') if record else " Madrid, Enero no está en la matriz")
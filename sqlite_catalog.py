@@ -0,0 +1,319 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+from clothing_database import ClothingDatabase, FrozenItem
+from file_store import file_lock
+from item_tags import derive_tags
+
+MULTI_FIELDS = ('color', 'ocasion', 'clima', 'estacion', 'tags')
+
+# items: una fila por prenda; item_attrs: una fila por valor multivalor.
+# Los índices cubren las consultas de búsqueda (field, value -> pos) y la
+# reconstrucción de prendas (pos -> field, ord, value) sin tocar la tabla.
+SCHEMA = """
+CREATE TABLE items (
+    pos          INTEGER PRIMARY KEY,
+    id           TEXT NOT NULL UNIQUE,
+    tipo         TEXT NOT NULL,
+    nombre       TEXT,
+    nombre_corto TEXT,
+    fit          TEXT,
+    imagen       TEXT,
+    descripcion  TEXT,
+    extra        TEXT
+);
+CREATE INDEX items_tipo ON items (tipo, pos);
+
+CREATE TABLE item_attrs (
+    field TEXT NOT NULL,
+    value TEXT NOT NULL,
+    pos   INTEGER NOT NULL REFERENCES items (pos),
+    ord   INTEGER NOT NULL,
+    PRIMARY KEY (field, value, pos, ord)
+) WITHOUT ROWID;
+CREATE INDEX item_attrs_by_item ON item_attrs (pos, field, ord, value);
+
+CREATE TABLE meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+ITEM_COLUMNS = ('id', 'nombre', 'nombre_corto', 'fit', 'imagen', 'descripcion')
+
+
+def _source_stamp(json_file):
+    """(mtime_ns, tamaño) del JSON, como texto para la tabla meta"""
+    st = os.stat(json_file)
+    return str(st.st_mtime_ns), str(st.st_size)
+
+
+def _sha1_file(json_file):
+    with open(json_file, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def sqlite_is_stale(json_file='data/clothing_items.json', sqlite_file='data/clothing_items.sqlite'):
+    """
+    Indica si hay que (re)migrar: la base de datos no existe, no tiene
+    tabla meta (migrada por una versión anterior) o el JSON ha cambiado.
+
+    Se compara primero el mtime y el tamaño del JSON guardados al migrar;
+    si no coinciden se compara el sha1 del contenido, y si el contenido es
+    el mismo (p. ej. un touch) se actualiza el sello sin reconstruir.
+    """
+    if not os.path.exists(sqlite_file):
+        return True
+    if not os.path.exists(json_file):
+        return False
+
+    try:
+        conn = sqlite3.connect(sqlite_file)
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+            stamp = _source_stamp(json_file)
+            if (meta.get('source_mtime_ns'), meta.get('source_size')) == stamp:
+                return False
+            if meta.get('source_sha1') != _sha1_file(json_file):
+                return True
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                    [('source_mtime_ns', stamp[0]), ('source_size', stamp[1])]
+                )
+            return False
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return True
+
+
+def migrate_json_to_sqlite(json_file='data/clothing_items.json', sqlite_file='data/clothing_items.sqlite'):
+    """
+    Migra el catálogo JSON a SQLite.
+    Se escribe en un fichero temporal y se sustituye de forma atómica, con
+    el cerrojo de la base de datos para que dos workers no compartan el
+    temporal. En la tabla meta se guarda el sello del JSON (ver sqlite_is_stale).
+
+    Returns:
+        int: nº de prendas migradas
+    """
+    with file_lock(sqlite_file):
+        return _migrate(json_file, sqlite_file)
+
+
+def _migrate(json_file, sqlite_file):
+    # sello antes de leer: si el JSON cambia durante la migración, la siguiente comprobación lo detecta
+    stamp = _source_stamp(json_file)
+    with open(json_file, 'rb') as f:
+        raw = f.read()
+    catalog = json.loads(raw)
+
+    tmp_file = sqlite_file + '.tmp'
+    if os.path.exists(tmp_file):
+        os.remove(tmp_file)
+
+    conn = sqlite3.connect(tmp_file)
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany(
+            "INSERT INTO meta (key, value) VALUES (?, ?)",
+            [('source_mtime_ns', stamp[0]), ('source_size', stamp[1]),
+             ('source_sha1', hashlib.sha1(raw).hexdigest())]
+        )
+        pos = 0
+        for tipo, items in catalog.items():
+            for item in items:
+                item['tags'] = derive_tags(item, tipo)
+                extra = {k: v for k, v in item.items()
+                         if k not in ITEM_COLUMNS and k not in MULTI_FIELDS and k != 'tipo'}
+                conn.execute(
+                    "INSERT INTO items (pos, id, tipo, nombre, nombre_corto, fit, imagen, descripcion, extra) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (pos, item['id'], tipo, item.get('nombre'), item.get('nombre_corto'), item.get('fit'),
+                     item.get('imagen'), item.get('descripcion'),
+                     json.dumps(extra, ensure_ascii=False) if extra else None)
+                )
+                for field in MULTI_FIELDS:
+                    values = item.get(field, [])
+                    if isinstance(values, str):
+                        values = [values]
+                    conn.executemany(
+                        "INSERT INTO item_attrs (field, value, pos, ord) VALUES (?, ?, ?, ?)",
+                        [(field, value, pos, ord_) for ord_, value in enumerate(values)]
+                    )
+                pos += 1
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_file, sqlite_file)
+    return pos
+
+
+class SQLiteClothingDatabase(ClothingDatabase):
+    """
+    Catálogo servido desde SQLite, misma API que ClothingDatabase.
+
+    Cada worker abre una única conexión de solo lectura por versión del
+    catálogo (se reabre tras un fork) y las búsquedas son INTERSECT sobre
+    los índices. Si la base de datos no existe o el JSON ha cambiado desde
+    la última migración (ver sqlite_is_stale) se migra automáticamente; el
+    vigilante de recarga sigue el mtime del JSON.
+    Los campos multivalor ausentes se devuelven como lista vacía.
+    """
+
+    def __init__(self, readonly=False, sqlite_file='data/clothing_items.sqlite'):
+        self.sqlite_file = sqlite_file
+        self._lock = threading.Lock()
+        super().__init__(readonly=readonly)
+
+    def _source_file(self):
+        """Fichero que se vigila: el JSON de origen (o la base de datos si solo existe ella)"""
+        return self.db_file if os.path.exists(self.db_file) else self.sqlite_file
+
+    def _read_source(self):
+        """Migra el JSON si la base de datos SQLite no existe o está desactualizada"""
+        with file_lock(self.sqlite_file):
+            if sqlite_is_stale(self.db_file, self.sqlite_file):
+                print(f" Migrando {self.db_file} a {self.sqlite_file}...")
+                migrate_json_to_sqlite(self.db_file, self.sqlite_file)
+        return None
+
+    def _build_index(self, snapshot):
+        """Abre la conexión de esta versión y carga los totales y el vocabulario de colores"""
+        snapshot.conn = None
+        snapshot.conn_pid = None
+        snapshot.total = self._query("SELECT COUNT(*) FROM items", snapshot=snapshot)[0][0]
+        snapshot.colors = [
+            row[0] for row in self._query("SELECT DISTINCT value FROM item_attrs WHERE field = 'color'", snapshot=snapshot)
+        ]
+
+    def _connection(self, snapshot):
+        """Conexión de solo lectura compartida por el proceso"""
+        if snapshot.conn is None or snapshot.conn_pid != os.getpid():
+            snapshot.conn = sqlite3.connect(
+                f"file:{self.sqlite_file}?mode=ro", uri=True, check_same_thread=False
+            )
+            snapshot.conn_pid = os.getpid()
+        return snapshot.conn
+
+    def _query(self, sql, params=(), snapshot=None):
+        snapshot = snapshot or self._snapshot
+        with self._lock:
+            return self._connection(snapshot).execute(sql, params).fetchall()
+
+    def count_items(self):
+        """Número total de prendas del catálogo"""
+        return self._snapshot.total
+
+    def _fetch(self, snapshot, where, params):
+        """Reconstruye las prendas cuyas posiciones cumplen la condición"""
+        rows = self._query(
+            "SELECT pos, tipo, id, nombre, nombre_corto, fit, imagen, descripcion, extra "
+            f"FROM items WHERE {where} ORDER BY pos", params, snapshot
+        )
+        attrs = {}
+        for pos, field, value in self._query(
+            f"SELECT pos, field, value FROM item_attrs WHERE pos IN (SELECT pos FROM items WHERE {where}) "
+            "ORDER BY pos, field, ord", params, snapshot
+        ):
+            attrs.setdefault(pos, {}).setdefault(field, []).append(value)
+
+        results = []
+        for pos, tipo, item_id, nombre, nombre_corto, fit, imagen, descripcion, extra in rows:
+            item_attrs = attrs.get(pos, {})
+            item = {'id': item_id}
+            for key, value in (('nombre', nombre), ('nombre_corto', nombre_corto)):
+                if value is not None:
+                    item[key] = value
+            for field in MULTI_FIELDS:
+                item[field] = item_attrs.get(field, [])
+            for key, value in (('fit', fit), ('imagen', imagen), ('descripcion', descripcion)):
+                if value is not None:
+                    item[key] = value
+            if extra:
+                item.update(json.loads(extra))
+            item['tipo'] = tipo
+            results.append(FrozenItem(item) if self.readonly else item)
+        return results
+
+    def search_items(self, tipo=None, ocasion=None, clima=None, estacion=None, color=None, tags=None):
+        """
+        Búsqueda avanzada de prendas (mismos criterios que ClothingDatabase)
+
+        Returns:
+            list: Prendas que coinciden con los criterios
+        """
+        snapshot = self._snapshot
+        parts = []
+        params = []
+        if tipo:
+            parts.append("SELECT pos FROM items WHERE tipo = ?")
+            params.append(tipo)
+        for field, value in (('ocasion', ocasion), ('clima', clima), ('estacion', estacion), ('tags', tags)):
+            if value:
+                parts.append("SELECT pos FROM item_attrs WHERE field = ? AND value = ?")
+                params.extend([field, value])
+        if color:
+            # lower() de SQLite solo entiende ASCII: se resuelve contra el vocabulario
+            color = color.lower()
+            matching = [c for c in snapshot.colors if color in c.lower()]
+            if not matching:
+                return []
+            parts.append(
+                "SELECT pos FROM item_attrs WHERE field = 'color' AND value IN (%s)" % ','.join('?' * len(matching))
+            )
+            params.extend(matching)
+
+        if not parts:
+            return self._fetch(snapshot, "1", [])
+        return self._fetch(snapshot, f"pos IN ({' INTERSECT '.join(parts)})", params)
+
+    def _catalog_items(self, snapshot):
+        """{tipo: [prendas]} materializado desde la base de datos (ver ClothingDatabase.items)"""
+        return self._group_by_tipo(self._fetch(snapshot, "1", []))
+
+    def _item_at(self, snapshot, pos):
+        """Prenda en una posición del catálogo"""
+        return self._fetch(snapshot, "pos = ?", [pos])[0]
+
+    def _feature_rows(self, snapshot):
+        """
+        Prendas para FeatureMatrix (tipo, fit y campos multivalor) leídas en
+        streaming: dos cursores ordenados por posición que se recorren a la
+        vez, con su propia conexión para no retener la compartida.
+        """
+        conn = sqlite3.connect(f"file:{self.sqlite_file}?mode=ro", uri=True)
+        try:
+            attrs = conn.execute("SELECT pos, field, value FROM item_attrs ORDER BY pos, field, ord")
+            pending = next(attrs, None)
+            for pos, tipo, fit in conn.execute("SELECT pos, tipo, fit FROM items ORDER BY pos"):
+                item = {field: [] for field in MULTI_FIELDS}
+                while pending is not None and pending[0] == pos:
+                    item[pending[1]].append(pending[2])
+                    pending = next(attrs, None)
+                if fit is not None:
+                    item['fit'] = fit
+                item['tipo'] = tipo
+                yield item
+        finally:
+            conn.close()
+
+    def get_item_by_id(self, item_id):
+        """Obtiene una prenda por su ID"""
+        results = self._fetch(self._snapshot, "id = ?", [item_id])
+        return results[0] if results else None
+
+
+if __name__ == "__main__":
+    # python sqlite_catalog.py migrate [catalogo.json] [catalogo.sqlite]
+    if len(sys.argv) > 1 and sys.argv[1] == 'migrate':
+        n = migrate_json_to_sqlite(*sys.argv[2:4])
+        print(f" Catálogo migrado a SQLite: {n} prendas")
+    else:
+        print("Uso: python sqlite_catalog.py migrate [catalogo.json] [catalogo.sqlite]")
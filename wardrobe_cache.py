@@ -0,0 +1,155 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Límites de la caché de armarios (lo que se supere primero)
+MAX_ITEMS = 200_000
+MAX_BYTES = 256 * 1024 * 1024
+
+
+def file_stamp(path):
+    """Huella del fichero para validar la caché: (mtime_ns, tamaño, inodo), None si no existe"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def stamp_bytes(stamp):
+    """Bytes en disco de una huella (o tupla de huellas)"""
+    if stamp is None:
+        return 0
+    if isinstance(stamp[0], int):
+        return stamp[1]
+    return sum(stamp_bytes(part) for part in stamp)
+
+
+class _Entry:
+    __slots__ = ('stamp', 'wardrobe', 'n_items', 'n_bytes', 'derived')
+
+    def __init__(self, stamp, wardrobe, derived=None):
+        self.stamp = stamp
+        self.wardrobe = wardrobe
+        self.n_items = len(wardrobe.get('items', []))
+        self.n_bytes = stamp_bytes(stamp)
+        self.derived = dict(derived or {})
+
+
+class WardrobeCache:
+    """
+    Caché de armarios compartida por todo el proceso, por fichero.
+
+    - Cada lectura valida la entrada con la huella de sus ficheros
+      (file_stamp); si cambió (otro proceso, edición a mano) se vuelve a leer.
+    - Las escrituras de WardrobeManager publican el armario recién guardado
+      (write-through), así la siguiente lectura no vuelve a parsear el JSON.
+    - Expulsa los armarios menos usados (LRU) cuando el total de prendas o
+      de bytes en disco supera el límite.
+
+    Los armarios que devuelve son compartidos y no se deben modificar:
+    WardrobeManager trabaja sobre una copia propia en cada cambio.
+    """
+
+    def __init__(self, max_items=MAX_ITEMS, max_bytes=MAX_BYTES):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_items = 0
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, path, stamp, loader):
+        """
+        Armario del fichero, de la caché si sigue al día.
+
+        Args:
+            path: str - fichero del armario
+            stamp: huella actual de sus ficheros en disco
+            loader: callable() -> armario, para leerlo del disco
+        """
+        return self._entry(path, stamp, loader).wardrobe
+
+    def derived(self, path, stamp, key, loader, builder):
+        """
+        Dato calculado a partir del armario (p. ej. su FeatureMatrix),
+        guardado con la entrada: se invalida y expulsa junto con ella.
+        """
+        entry = self._entry(path, stamp, loader)
+        value = entry.derived.get(key)
+        if value is None:
+            value = entry.derived[key] = builder(entry.wardrobe)
+        return value
+
+    def peek(self, path, stamp, key):
+        """Dato calculado de la entrada si está al día y ya se calculó; si no None (no lee el disco)"""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry.stamp != stamp:
+                return None
+            return entry.derived.get(key)
+
+    def _entry(self, path, stamp, loader):
+        # La huella se toma antes de leer: si el fichero cambia durante la lectura se volverá a leer
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.stamp == stamp:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            if entry is not None:
+                self.invalidations += 1
+        entry = _Entry(stamp, loader())
+        self._store(path, entry)
+        return entry
+
+    def put(self, path, stamp, wardrobe, derived=None):
+        """
+        Publica el armario recién guardado en path (write-through).
+        derived: datos calculados ya al día con este armario (p. ej. el
+        índice actualizado con el cambio), para no reconstruirlos.
+        """
+        self._store(path, _Entry(stamp, wardrobe, derived))
+
+    def discard(self, path):
+        with self._lock:
+            self._remove(path)
+
+    def _remove(self, path):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self.total_items -= entry.n_items
+            self.total_bytes -= entry.n_bytes
+
+    def _store(self, path, entry):
+        with self._lock:
+            self._remove(path)
+            self._entries[path] = entry
+            self.total_items += entry.n_items
+            self.total_bytes += entry.n_bytes
+            # Nunca se expulsa la entrada recién guardada
+            while len(self._entries) > 1 and (self.total_items > self.max_items
+                                              or self.total_bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def stats(self):
+        """Contadores de la caché (para /api/health y benchmarks)"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'wardrobes': len(self._entries),
+                'items': self.total_items,
+                'bytes': self.total_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else None,
+                'invalidations': self.invalidations,
+                'evictions': self.evictions
+            }
@@ -0,0 +1,101 @@
+# Importación masiva de prendas al armario (NDJSON o CSV).
+# La subida se lee línea a línea: nunca se carga entera en memoria, solo
+# las prendas válidas pendientes de guardar. WardrobeManager.import_items
+# las valida como add_item y las guarda por bloques de IMPORT_CHUNK.
+
+import csv
+import json
+import re
+
+from item_schema import LIST_FIELDS
+
+FORMATOS = ('ndjson', 'csv')
+
+# Errores por fila que se devuelven como mucho (el resto solo se cuentan)
+MAX_ERRORS = 100
+
+# Prendas válidas por escritura del armario (una reescritura o un bloque del log)
+IMPORT_CHUNK = 500
+
+# Separadores de valores en una celda CSV multivalor ("azul; blanco")
+_CSV_SEPARATORS = re.compile(r'[;|,]')
+_CSV_LIST_FIELDS = LIST_FIELDS + ('clima_apropiado', 'estacion')
+
+
+def detect_format(content_type=None, filename=None):
+    """Formato de la subida por su nombre o tipo de contenido (NDJSON por defecto)"""
+    if (filename or '').lower().endswith('.csv') or 'csv' in (content_type or ''):
+        return 'csv'
+    return 'ndjson'
+
+
+def _text_lines(stream):
+    """Líneas de texto de un flujo binario, sin BOM"""
+    for number, line in enumerate(stream):
+        if number == 0 and line.startswith(b'\xef\xbb\xbf'):
+            line = line[3:]
+        yield line.decode('utf-8', errors='replace')
+
+
+def iter_ndjson(stream):
+    """
+    Una prenda por línea (objeto JSON). Las líneas en blanco se saltan.
+
+    Yields:
+        (nº de línea, prenda o ValueError si la línea no es válida)
+    """
+    for number, line in enumerate(_text_lines(stream), 1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            yield number, ValueError(f"JSON no válido: {e}")
+            continue
+        if not isinstance(item, dict):
+            yield number, ValueError("La línea no es un objeto JSON")
+            continue
+        yield number, item
+
+
+def _csv_value(field, value):
+    """Celda CSV: los campos multivalor aceptan lista JSON o valores separados por ; | ,"""
+    value = value.strip()
+    if field in _CSV_LIST_FIELDS and not value.startswith('['):
+        return [v.strip() for v in _CSV_SEPARATORS.split(value) if v.strip()]
+    return value
+
+
+def iter_csv(stream):
+    """
+    CSV con cabecera (nombre, tipo, color, ocasion, clima, ...). Las celdas
+    vacías se omiten, así cuentan como campo faltante.
+
+    Yields:
+        (nº de línea, prenda o ValueError si la fila no es válida)
+    """
+    reader = csv.DictReader(_text_lines(stream))
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            # La fila se descarta y se sigue con la siguiente
+            yield reader.line_num, ValueError(f"CSV no válido: {e}")
+            continue
+        if None in row:
+            yield reader.line_num, ValueError("La fila tiene más columnas que la cabecera")
+            continue
+        yield reader.line_num, {field.strip(): _csv_value(field.strip(), value)
+                                for field, value in row.items()
+                                if field and value is not None and value.strip()}
+
+
+def parse_rows(stream, formato):
+    """Filas de la subida según su formato ('ndjson' o 'csv')"""
+    if formato == 'csv':
+        return iter_csv(stream)
+    if formato == 'ndjson':
+        return iter_ndjson(stream)
+    raise ValueError(f"Formato no soportado: {formato} (usa {' o '.join(FORMATOS)})")
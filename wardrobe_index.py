@@ -0,0 +1,159 @@
+# Índices en memoria de un armario: prenda por id en O(1) e índices
+# secundarios (tipo, ocasion, clima, color) para search_items.
+#
+# Se guardan en la caché con el armario (wardrobe_cache) y cada cambio
+# publica un índice nuevo derivado del anterior (changed) en lugar de
+# reconstruirlo: solo se copian los conjuntos afectados, así los
+# lectores que aún usan el índice anterior no lo ven cambiar.
+
+INDEXED_FIELDS = ('tipo', 'ocasion', 'clima', 'color')
+
+_EMPTY = frozenset()
+
+
+def _keys(value):
+    """Claves de índice de un valor: cada elemento si es lista"""
+    values = value if isinstance(value, list) else [value]
+    return [v for v in values if isinstance(v, str)]
+
+
+def matches(item, filters):
+    """
+    Comprueba los filtros de search_items sobre una prenda: en campos
+    lista, que contengan el valor; en el resto, igualdad.
+    """
+    for key, value in filters.items():
+        item_value = item.get(key)
+        if isinstance(item_value, list):
+            if value not in item_value:
+                return False
+        elif item_value != value:
+            return False
+    return True
+
+
+class WardrobeIndex:
+    """
+    Índices de las prendas de un armario.
+
+    - por id: {id: prenda}, en el orden del armario
+    - nº de secuencia por prenda (orden en el armario): {id: seq} y {seq: prenda}
+    - secundarios: {campo: {valor: set(seq)}} para INDEXED_FIELDS; con
+      enteros, ordenar el resultado para devolverlo en el orden del
+      armario es barato
+
+    No se modifica una vez publicado: changed() devuelve uno nuevo.
+    """
+
+    def __init__(self, items=()):
+        self._items = {}
+        self._seq = {}
+        self._by_seq = {}
+        self._postings = {field: {} for field in INDEXED_FIELDS}
+        self._next_seq = 0
+        for item in items:
+            self._set(item)
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, item_id):
+        """Prenda por id, o None"""
+        return self._items.get(item_id)
+
+    def _set(self, item):
+        """Añade o sustituye (misma posición) una prenda, en el sitio"""
+        item_id = item['id']
+        if item_id in self._items:
+            self._unindex(self._items[item_id])
+            seq = self._seq[item_id]
+        else:
+            seq = self._seq[item_id] = self._next_seq
+            self._next_seq += 1
+        self._items[item_id] = item
+        self._by_seq[seq] = item
+        for field in INDEXED_FIELDS:
+            postings = self._postings[field]
+            for key in _keys(item.get(field)):
+                postings.setdefault(key, set()).add(seq)
+
+    def _unindex(self, item):
+        seq = self._seq[item['id']]
+        for field in INDEXED_FIELDS:
+            postings = self._postings[field]
+            for key in _keys(item.get(field)):
+                seqs = postings.get(key)
+                if seqs is not None:
+                    seqs.discard(seq)
+                    if not seqs:
+                        del postings[key]
+
+    def _remove(self, item_id):
+        item = self._items.get(item_id)
+        if item is not None:
+            self._unindex(item)
+            del self._items[item_id]
+            del self._by_seq[self._seq.pop(item_id)]
+
+    def changed(self, item_id, item=None):
+        """
+        Índice con la prenda item_id añadida o sustituida por item, o
+        borrada si item es None. Este índice no se modifica.
+        """
+        touched = set()
+        for changed_item in (self._items.get(item_id), item):
+            if changed_item is not None:
+                for field in INDEXED_FIELDS:
+                    touched.update((field, key) for key in _keys(changed_item.get(field)))
+
+        new = WardrobeIndex()
+        new._items = dict(self._items)
+        new._seq = dict(self._seq)
+        new._by_seq = dict(self._by_seq)
+        new._next_seq = self._next_seq
+        new._postings = {field: dict(postings) for field, postings in self._postings.items()}
+        for field, key in touched:
+            if key in self._postings[field]:
+                new._postings[field][key] = set(self._postings[field][key])
+
+        if item is None:
+            new._remove(item_id)
+        else:
+            new._set(item)
+        return new
+
+    def plan(self, filters):
+        """
+        Plan de una búsqueda: conjuntos de prendas (seq) de los filtros indexados, de
+        la más selectiva a la menos, y filtros que se comprueban prenda a
+        prenda (campos sin índice o valores que no son texto).
+
+        Returns:
+            tuple: (list de sets de seq, dict de filtros restantes)
+        """
+        postings = []
+        residual = {}
+        for key, value in filters.items():
+            if key in self._postings and isinstance(value, str):
+                postings.append(self._postings[key].get(value, _EMPTY))
+            else:
+                residual[key] = value
+        postings.sort(key=len)
+        return postings, residual
+
+    def search(self, filters):
+        """
+        Prendas que cumplen los filtros, en el orden del armario.
+        Parte del conjunto más pequeño y comprueba la pertenencia a
+        las demás; sin filtros indexados recorre todas las prendas.
+        """
+        postings, residual = self.plan(filters)
+        if postings:
+            # set.intersection recorre el primero y comprueba en los demás
+            by_seq = self._by_seq
+            candidates = [by_seq[seq] for seq in sorted(postings[0].intersection(*postings[1:]))]
+        else:
+            candidates = self._items.values()
+        if not residual:
+            return list(candidates)
+        return [item for item in candidates if matches(item, residual)]
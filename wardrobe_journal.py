@@ -0,0 +1,99 @@
+import json
+import os
+
+from wardrobe_stats import copy_stats, count_item
+
+# Tamaño del log a partir del cual se compacta en el JSON del armario
+JOURNAL_MAX_BYTES = 512 * 1024
+
+
+def journal_path(wardrobe_file):
+    """Log de cambios de un armario: data/wardrobes/<usuario>.journal"""
+    return os.path.splitext(wardrobe_file)[0] + '.journal'
+
+
+def read_entries(path, after_seq=0):
+    """
+    Entradas del log con seq > after_seq (las anteriores ya están en el JSON).
+    Una última línea incompleta (caída a mitad de escritura) se ignora.
+    """
+    entries = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if entry['seq'] > after_seq:
+                    entries.append(entry)
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def append_entries(path, entries):
+    """Añade entradas al log (una línea JSON por entrada, sin reescribir nada)"""
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in entries))
+
+
+def entry_id(entry):
+    """Id de la prenda a la que afecta una entrada"""
+    return entry['id'] if entry['op'] == 'delete' else entry['item']['id']
+
+
+def apply_entry(wardrobe, entry, old=None):
+    """
+    Aplica una entrada del log al armario, en el sitio (al reconstruirlo).
+
+    Entradas:
+        {'seq', 'op': 'add' | 'update', 'item': prenda}
+        {'seq', 'op': 'delete', 'id': id}
+
+    El grafo de compatibilidad no va en el log (cada línea sería O(n)):
+    se calcula desde las prendas al usarlo. Si el armario tiene
+    estadísticas ('stats') se ajustan con la prenda que sale y la que entra.
+
+    Args:
+        old: prenda que sale (update/delete) si ya se conoce, p. ej. del
+             índice por id; si no, se busca en las prendas
+    """
+    items = wardrobe['items']
+    item_id = entry_id(entry)
+
+    stats = wardrobe.get('stats')
+    if stats is not None:
+        if entry['op'] != 'add':
+            if old is None:
+                old = next((item for item in items if item['id'] == item_id), None)
+            if old is not None:
+                count_item(stats, old, -1)
+        if entry['op'] != 'delete':
+            count_item(stats, entry['item'])
+
+    if entry['op'] == 'delete':
+        wardrobe['items'] = [item for item in items if item['id'] != item_id]
+    elif entry['op'] == 'add':
+        items.append(entry['item'])
+    else:
+        wardrobe['items'] = [entry['item'] if item['id'] == item_id else item for item in items]
+    wardrobe['journal_seq'] = entry['seq']
+
+
+def apply_entries_copy(wardrobe, entries, old_items=None):
+    """
+    Como apply_entry, para varias entradas seguidas, pero sin tocar el
+    armario recibido (que es el que comparten los lectores de la caché):
+    se copian una vez la lista de prendas y las estadísticas.
+
+    Args:
+        old_items: dict - {id: prenda que sale} ya conocidas (ver apply_entry)
+    """
+    old_items = old_items or {}
+    new_wardrobe = dict(wardrobe, items=list(wardrobe['items']))
+    if 'stats' in wardrobe:
+        new_wardrobe['stats'] = copy_stats(wardrobe['stats'])
+    for entry in entries:
+        apply_entry(new_wardrobe, entry, old_items.get(entry_id(entry)))
+    return new_wardrobe
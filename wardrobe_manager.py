@@ -1,18 +1,63 @@
 import json
 import os
+import sys
+import threading
 from datetime import datetime
 
+from item_ids import new_item_id
+from item_schema import SCHEMA_VERSION, check_item_types, copy_item, migrate_wardrobe, normalize_item
+from feature_matrix import FeatureMatrix
+from compatibility_graph import COMPLEMENTARY, build_graph, edge_score, graph_changed, neighbours
+from wardrobe_cache import WardrobeCache, file_stamp
+from wardrobe_index import WardrobeIndex
+from wardrobe_stats import build_stats, copy_stats, stats_differences
+from wardrobe_import import IMPORT_CHUNK, MAX_ERRORS
+from file_store import atomic_write_json, file_lock
+from wardrobe_journal import (JOURNAL_MAX_BYTES, append_entries, apply_entries_copy, apply_entry, entry_id, journal_path,
+                              read_entries)
+
+# Armarios ya leídos, compartidos por todas las instancias del proceso
+wardrobe_cache = WardrobeCache()
+
+# WARDROBE_STORAGE=journal -> los cambios se añaden a un log por usuario
+# (<usuario>.journal) que se compacta en el JSON en segundo plano
+JOURNAL_MODE = os.environ.get('WARDROBE_STORAGE') == 'journal'
+
+# Campos obligatorios de una prenda ('clima' también como 'clima_apropiado')
+REQUIRED_FIELDS = ('nombre', 'tipo', 'color', 'ocasion', 'clima')
+
+# Armarios con una compactación en marcha
+_compacting = set()
+_compacting_lock = threading.Lock()
+
 class WardrobeManager:
     """
     Sistema de gestión de armario virtual del usuario.
     Permite agregar, editar, eliminar y consultar prendas.
     """
     
-    def __init__(self, user_email):
+    def __init__(self, user_email, journal=None):
+        """
+        Args:
+            user_email: str - usuario dueño del armario
+            journal: bool - guardar los cambios en el log (por defecto según WARDROBE_STORAGE)
+        """
         self.user_email = user_email
         self.wardrobe_file = f"data/wardrobes/{self._sanitize_email(user_email)}.json"
+        self.journal_file = journal_path(self.wardrobe_file)
+        self.journal = JOURNAL_MODE if journal is None else journal
         self._ensure_file_exists()
     
+    @classmethod
+    def for_file(cls, wardrobe_file, journal=None):
+        """Gestor de un fichero de armario ya existente, sin su usuario (herramientas de mantenimiento)"""
+        manager = cls.__new__(cls)
+        manager.user_email = None
+        manager.wardrobe_file = wardrobe_file
+        manager.journal_file = journal_path(wardrobe_file)
+        manager.journal = JOURNAL_MODE if journal is None else journal
+        return manager
+    
     def _sanitize_email(self, email):
         """Convierte email en nombre de archivo seguro"""
         return email.replace('@', '_at_').replace('.', '_')
@@ -21,8 +66,10 @@ class WardrobeManager:
         """Crea archivo de armario si no existe"""
         os.makedirs('data/wardrobes', exist_ok=True)
         if not os.path.exists(self.wardrobe_file):
-            with open(self.wardrobe_file, 'w') as f:
-                json.dump({'items': [], 'created_at': datetime.now().isoformat()}, f)
+            with self._write_lock():
+                if not os.path.exists(self.wardrobe_file):
+                    atomic_write_json(self.wardrobe_file, {'items': [], 'created_at': datetime.now().isoformat(),
+                                                           'schema_version': SCHEMA_VERSION})
     
     def add_item(self, item_data):
         """
@@ -33,105 +80,168 @@ class WardrobeManager:
         - tipo: str (superior, inferior, vestido, calzado, complemento)
         - color: str o list (ej: "blanco" o ["blanco", "azul"])
         - ocasion: str o list (formal, casual, deportiva)
-        - clima_apropiado: str o list (calor, templado, frio)
+        - clima: str o list (calor, templado, frio); también como 'clima_apropiado'
         - fit: str (ajustada, normal, holgada)
         - imagen: str (nombre de archivo, opcional)
         - notas: str (opcional)
         """
-        wardrobe = self._load_wardrobe()
-        
-        # Añadir timestamp y ID único
-        item_data['id'] = self._generate_item_id()
-        item_data['added_at'] = datetime.now().isoformat()
-        
+        with self._write_lock():
+            # Añadir timestamp y ID único
+            item_data['id'] = self._generate_item_id()
+            item_data['added_at'] = datetime.now().isoformat()
+            
+            self._prepare_item(item_data)
+            self._commit('add', item=item_data)
+            return item_data['id']
+    
+    def _prepare_item(self, item_data):
+        """
+        Valida los campos obligatorios y sus tipos y lleva la prenda al
+        esquema canónico (en el sitio). Lanza ValueError si no es válida.
+        """
         # Validar datos básicos
-        required_fields = ['nombre', 'tipo', 'color', 'ocasion', 'clima_apropiado']
-        for field in required_fields:
-            if field not in item_data:
+        for field in REQUIRED_FIELDS:
+            if field not in item_data and not (field == 'clima' and 'clima_apropiado' in item_data):
                 raise ValueError(f"Campo requerido faltante: {field}")
+        check_item_types(item_data)
         
-        # Convertir strings JSON a objetos Python si es necesario
-        for field in ['color', 'ocasion', 'clima_apropiado']:
-            if isinstance(item_data.get(field), str):
-                try:
-                    item_data[field] = json.loads(item_data[field])
-                except:
-                    pass
+        # Esquema canónico (item_schema): listas en minúsculas, clima
+        # unificado y etiquetas derivadas, calculado una sola vez
+        normalize_item(item_data)
+    
+    def import_items(self, rows):
+        """
+        Importación masiva: valida las prendas como add_item y las añade
+        por bloques de IMPORT_CHUNK, cada uno con una sola escritura del
+        armario (en modo log, un bloque de líneas). Solo se guardan en
+        memoria las prendas del bloque en curso.
+        Las filas no válidas se saltan y se informan sin abortar el resto.
         
-        wardrobe['items'].append(item_data)
-        self._save_wardrobe(wardrobe)
+        Args:
+            rows: iterable de (nº de fila, prenda o excepción), p. ej.
+                  wardrobe_import.parse_rows; se consume una sola vez
         
-        return item_data['id']
+        Returns:
+            dict: {'added': nº de prendas añadidas,
+                   'errors': [{'row', 'message'}] (como mucho MAX_ERRORS),
+                   'n_errors': nº total de filas con error}
+        """
+        # La subida se lee y valida fuera del cerrojo
+        added = 0
+        chunk = []
+        errors = []
+        n_errors = 0
+        for row, item_data in rows:
+            try:
+                if isinstance(item_data, Exception):
+                    raise item_data
+                item_data.pop('id', None)
+                self._prepare_item(item_data)
+            except ValueError as e:
+                n_errors += 1
+                if len(errors) < MAX_ERRORS:
+                    errors.append({'row': row, 'message': str(e)})
+                continue
+            chunk.append(item_data)
+            if len(chunk) == IMPORT_CHUNK:
+                added += self._add_items(chunk)
+                chunk = []
+        if chunk:
+            added += self._add_items(chunk)
+        
+        return {'added': added, 'errors': errors, 'n_errors': n_errors}
+    
+    def _add_items(self, items):
+        """Añade un bloque de prendas ya validadas con una sola escritura"""
+        with self._write_lock():
+            added_at = datetime.now().isoformat()
+            for item_data in items:
+                item_data['id'] = self._generate_item_id()
+                item_data['added_at'] = added_at
+            # El índice y el grafo se reconstruyen en la siguiente consulta
+            self._commit_entries(self._load_wardrobe(), [{'op': 'add', 'item': item} for item in items])
+        return len(items)
     
     def get_all_items(self):
-        """Retorna todas las prendas del armario"""
+        """
+        Retorna todas las prendas del armario.
+        Son copias: las de la caché las comparten todas las instancias del proceso.
+        """
         wardrobe = self._load_wardrobe()
-        return wardrobe['items']
+        return [copy_item(item) for item in wardrobe['items']]
     
     def get_item_by_id(self, item_id):
-        """Obtiene una prenda específica por ID"""
-        items = self.get_all_items()
-        for item in items:
-            if item['id'] == item_id:
-                return item
-        return None
+        """Obtiene una prenda específica por ID (índice por id, O(1); copia)"""
+        item = self._index().get(item_id)
+        return copy_item(item) if item is not None else None
+    
+    def feature_matrix(self):
+        """
+        Matriz de características del armario para el generador de outfits.
+        Se guarda en la caché con el armario y se reconstruye solo si cambia.
+        """
+        return wardrobe_cache.derived(self.wardrobe_file, self._stamp(), 'features', self._read_wardrobe,
+                                      lambda wardrobe: FeatureMatrix(wardrobe['items'], user=True))
     
     def update_item(self, item_id, updated_data):
         """Actualiza una prenda existente"""
-        wardrobe = self._load_wardrobe()
-        
-        for i, item in enumerate(wardrobe['items']):
-            if item['id'] == item_id:
-                wardrobe['items'][i].update(updated_data)
-                wardrobe['items'][i]['updated_at'] = datetime.now().isoformat()
-                self._save_wardrobe(wardrobe)
-                return True
-        
-        return False
+        with self._write_lock():
+            current = self._index().get(item_id)
+            if current is None:
+                return False
+            
+            # Copia: la prenda del índice es la compartida de la caché
+            item = dict(current)
+            item.update(updated_data)
+            normalize_item(item)
+            item['updated_at'] = datetime.now().isoformat()
+            self._commit('update', item=item)
+            return True
     
     def delete_item(self, item_id):
         """Elimina una prenda del armario"""
-        wardrobe = self._load_wardrobe()
-        original_length = len(wardrobe['items'])
-        
-        wardrobe['items'] = [item for item in wardrobe['items'] if item['id'] != item_id]
-        
-        if len(wardrobe['items']) < original_length:
-            self._save_wardrobe(wardrobe)
+        with self._write_lock():
+            if self._index().get(item_id) is None:
+                return False
+            self._commit('delete', item_id=item_id)
             return True
-        
-        return False
+    
+    def _graph(self):
+        """
+        Grafo de compatibilidad del armario {id: {tipo: {id_vecino: 0-1}}}
+        entre prendas de tipos complementarios (armonía de color y
+        ocasión/clima en común), con las TOP_EDGES mejores de cada tipo por
+        prenda. No se guarda con el armario: se construye en memoria (NumPy)
+        la primera vez que se usa tras cargarlo y vive en la caché; los
+        cambios lo actualizan solo en lo que toca la prenda.
+        """
+        return wardrobe_cache.derived(self.wardrobe_file, self._stamp(), 'compatibility', self._read_wardrobe,
+                                      lambda wardrobe: build_graph(wardrobe['items']))
+    
+    def get_compatibility(self, item_id):
+        """Prendas más compatibles con una dada: {id: compatibilidad}"""
+        return neighbours(self._graph(), item_id)
     
     def search_items(self, **filters):
         """
         Busca prendas con filtros específicos.
         
+        Los filtros de tipo, ocasion, clima y color usan los índices del
+        armario (wardrobe_index), empezando por el más selectivo; el resto
+        se comprueba solo sobre las prendas que quedan.
+        
         Ejemplos:
         - search_items(tipo='superior', ocasion='formal')
-        - search_items(color='azul', clima_apropiado='frio')
-        """
-        items = self.get_all_items()
-        results = []
-        
-        for item in items:
-            match = True
-            for key, value in filters.items():
-                item_value = item.get(key)
-                
-                # Manejar listas
-                if isinstance(item_value, list):
-                    if value not in item_value:
-                        match = False
-                        break
-                else:
-                    if item_value != value:
-                        match = False
-                        break
-            
-            if match:
-                results.append(item)
+        - search_items(color='azul', clima='frio')
+        - search_items(tipo='calzado', tags='is_boot')
         
-        return results
+        Devuelve copias, como get_all_items.
+        """
+        # Nombre antiguo del campo de clima
+        if 'clima_apropiado' in filters:
+            filters['clima'] = filters.pop('clima_apropiado')
+        
+        return [copy_item(item) for item in self._index().search(filters)]
     
     def get_outfit_suggestions(self, ocasion, clima, fit_preference, season_colors):
         """
@@ -148,20 +258,12 @@ class WardrobeManager:
         """
         # Buscar prendas apropiadas
         suitable_items = []
-        all_items = self.get_all_items()
+        wardrobe = self._load_wardrobe()
+        all_items = wardrobe['items']
         
         for item in all_items:
-            # Verificar ocasión
-            item_ocasiones = item.get('ocasion', [])
-            if isinstance(item_ocasiones, str):
-                item_ocasiones = [item_ocasiones]
-            
-            # Verificar clima
-            item_climas = item.get('clima_apropiado', [])
-            if isinstance(item_climas, str):
-                item_climas = [item_climas]
-            
-            if ocasion in item_ocasiones and clima in item_climas:
+            # Ocasión y clima (listas en minúsculas, ver item_schema)
+            if ocasion in item.get('ocasion', []) and clima in item.get('clima', []):
                 suitable_items.append(item)
         
         if not suitable_items:
@@ -177,12 +279,9 @@ class WardrobeManager:
         color_matched = []
         other_items = []
         
+        season_lower = {c.lower() for c in season_colors}
         for item in suitable_items:
-            item_colors = item.get('color', [])
-            if isinstance(item_colors, str):
-                item_colors = [item_colors]
-            
-            if any(color.lower() in [c.lower() for c in season_colors] for color in item_colors):
+            if any(color in season_lower for color in item.get('color', [])):
                 color_matched.append(item)
             else:
                 other_items.append(item)
@@ -190,66 +289,64 @@ class WardrobeManager:
         # Priorizar prendas con colores de la estación
         suitable_items = color_matched + other_items
         
-        # Construir outfit
+        # Construir outfit recorriendo el grafo de compatibilidad: la primera
+        # prenda es la de mayor prioridad y cada siguiente la que mejor
+        # combina con las ya elegidas (ante empate, la de mayor prioridad).
+        # Solo se añaden tipos que van con todos los elegidos (vestido no
+        # va con superior ni inferior)
+        graph = self._graph()
         outfit = {}
         
         # Buscar cada tipo de prenda
         tipos = ['superior', 'inferior', 'vestido', 'calzado', 'complemento']
         for tipo in tipos:
-            for item in suitable_items:
-                if item.get('tipo') == tipo and tipo not in outfit:
-                    outfit[tipo] = item
-                    break
-        
-        return outfit if outfit else None
+            if any(tipo not in COMPLEMENTARY.get(elegido, ()) for elegido in outfit):
+                continue
+            candidatas = [item for item in suitable_items if item.get('tipo') == tipo]
+            if not candidatas:
+                continue
+            elegidas = list(outfit.values())
+            outfit[tipo] = max(
+                candidatas,
+                key=lambda item: sum(edge_score(graph, item, other) for other in elegidas)
+            )
+        
+        # Copias, como get_all_items
+        return {tipo: copy_item(item) for tipo, item in outfit.items()} if outfit else None
     
     def get_statistics(self):
         """
         Retorna estadísticas del armario.
+        Se guardan con el armario y se ajustan en cada cambio (wardrobe_stats),
+        así no se recorren las prendas.
         """
-        items = self.get_all_items()
-        
-        stats = {
-            'total_items': len(items),
-            'by_type': {},
-            'by_occasion': {},
-            'by_climate': {},
-            'by_color': {}
-        }
+        return copy_stats(self._load_wardrobe()['stats'])
+    
+    def check_statistics(self, repair=False):
+        """
+        Comprueba las estadísticas guardadas recontándolas desde las prendas.
         
-        for item in items:
-            # Por tipo
-            tipo = item.get('tipo', 'unknown')
-            stats['by_type'][tipo] = stats['by_type'].get(tipo, 0) + 1
-            
-            # Por ocasión
-            ocasiones = item.get('ocasion')
-            if isinstance(ocasiones, str):
-                ocasiones = [ocasiones]
-            for ocasion in ocasiones:
-                stats['by_occasion'][ocasion] = stats['by_occasion'].get(ocasion, 0) + 1
-            
-            # Por clima
-            climas = item.get('clima_apropiado')
-            if isinstance(climas, str):
-                climas = [climas]
-            for clima in climas:
-                stats['by_climate'][clima] = stats['by_climate'].get(clima, 0) + 1
-            
-            # Por color
-            colores = item.get('color')
-            if isinstance(colores, str):
-                colores = [colores]
-            for color in colores:
-                stats['by_color'][color] = stats['by_color'].get(color, 0) + 1
+        Args:
+            repair: bool - si no coinciden, guardar las recontadas
         
-        return stats
+        Returns:
+            dict: {contador: (guardado, recontado)} de los que no coinciden
+        """
+        with self._write_lock():
+            wardrobe = self._load_wardrobe()
+            differences = stats_differences(wardrobe.get('stats'), wardrobe['items'])
+            if differences and repair:
+                # Copia: el armario de la caché es compartido
+                self._save_wardrobe(dict(wardrobe, stats=build_stats(wardrobe['items'])),
+                                    derived=self._derived(self._stamp()))
+            return differences
     
     def suggest_missing_items(self):
         """
         Analiza el armario y sugiere qué prendas faltan.
         """
-        stats = self.get_statistics()
+        # Estadísticas guardadas (solo lectura, sin copiarlas)
+        stats = self._load_wardrobe()['stats']
         suggestions = []
         
         # Verificar prendas básicas
@@ -277,23 +374,210 @@ class WardrobeManager:
         return suggestions
     
     def _generate_item_id(self):
-        """Genera ID único para la prenda"""
-        import time
-        return f"item_{int(time.time() * 1000)}"
+        """Genera ID único para la prenda (item_ids: ordenable y sin colisiones)"""
+        return new_item_id()
+    
+    def _stamp(self):
+        """Huella del armario en disco: el JSON y su log de cambios"""
+        return file_stamp(self.wardrobe_file), file_stamp(self.journal_file)
+    
+    def _write_lock(self):
+        """
+        Cerrojo de escritura del armario, entre hilos y entre procesos
+        (cambios y compactación). Las lecturas no lo necesitan.
+        """
+        return file_lock(self.wardrobe_file)
+    
+    def _index(self):
+        """
+        Índices del armario de la caché (por id y secundarios). Se construyen
+        una vez por armario cargado; los cambios publican el índice
+        actualizado junto con el armario.
+        """
+        return wardrobe_cache.derived(self.wardrobe_file, self._stamp(), 'index', self._read_wardrobe,
+                                      lambda wardrobe: WardrobeIndex(wardrobe['items']))
+    
+    def _derived(self, stamp):
+        """
+        Datos calculados ya en la caché para el armario con esa huella
+        (índice, grafo, matriz), para seguir usándolos cuando se reescribe
+        sin cambiar las prendas (compactación, reparación de estadísticas).
+        """
+        derived = {}
+        for key in ('index', 'compatibility', 'features'):
+            value = wardrobe_cache.peek(self.wardrobe_file, stamp, key)
+            if value is not None:
+                derived[key] = value
+        return derived
     
     def _load_wardrobe(self):
-        """Carga el armario desde JSON"""
-        with open(self.wardrobe_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    
-    def _save_wardrobe(self, wardrobe_data):
-        """Guarda el armario a JSON"""
-        with open(self.wardrobe_file, 'w', encoding='utf-8') as f:
-            json.dump(wardrobe_data, f, indent=2, ensure_ascii=False)
+        """
+        Armario de la caché del proceso (se relee solo si el fichero cambió).
+        Es compartido y no se modifica: los cambios publican una copia (_commit).
+        """
+        return wardrobe_cache.get(self.wardrobe_file, self._stamp(), self._read_wardrobe)
+    
+    def _read_wardrobe(self):
+        """
+        Carga el armario desde JSON y le aplica el log de cambios pendiente.
+        Se lee sin cerrojo: si otro proceso compacta entre la lectura del
+        JSON y la del log (JSON nuevo, log borrado) se vuelve a leer.
+        """
+        for _ in range(3):
+            stamp = self._stamp()
+            with open(self.wardrobe_file, 'r', encoding='utf-8') as f:
+                wardrobe = json.load(f)
+            # Armarios anteriores al esquema canónico (item_schema)
+            migrate_wardrobe(wardrobe)
+            # ... o a las estadísticas guardadas (recuento O(n), solo al leer del disco)
+            if 'stats' not in wardrobe:
+                wardrobe['stats'] = build_stats(wardrobe['items'])
+            # Grafo que guardaban versiones anteriores: se calcula en memoria (_graph)
+            wardrobe.pop('compatibility', None)
+            entries = read_entries(self.journal_file, wardrobe.get('journal_seq', 0))
+            if entries:
+                # Prenda que sale de cada entrada sin recorrer el armario (estadísticas)
+                by_id = {item['id']: item for item in wardrobe['items']}
+                for entry in entries:
+                    item_id = entry_id(entry)
+                    if entry['op'] != 'delete':
+                        normalize_item(entry['item'])
+                    apply_entry(wardrobe, entry, by_id.get(item_id) if entry['op'] != 'add' else None)
+                    if entry['op'] == 'delete':
+                        by_id.pop(item_id, None)
+                    else:
+                        by_id[item_id] = entry['item']
+            if self._stamp() == stamp:
+                break
+        return wardrobe
+    
+    def _save_wardrobe(self, wardrobe_data, derived=None):
+        """
+        Guarda el armario a JSON (prendas y estadísticas) y lo publica en la
+        caché tal y como se leería, con los datos calculados (índice, grafo)
+        que ya vengan actualizados con el cambio.
+        """
+        atomic_write_json(self.wardrobe_file, wardrobe_data, indent=2, ensure_ascii=False)
+        # El JSON ya incluye lo que hubiera en el log
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+        wardrobe_cache.put(self.wardrobe_file, self._stamp(), wardrobe_data, derived=derived)
+    
+    def _commit(self, op, item=None, item_id=None):
+        """
+        Aplica un cambio (op 'add' | 'update' | 'delete') al armario de la
+        caché sin modificarlo: se publica una copia con el cambio aplicado,
+        con su índice y su grafo (si ya estaba calculado) actualizados solo
+        en lo que toca la prenda.
+        
+        Se guarda con _commit_entries (JSON entero o una línea en el log).
+        """
+        wardrobe = self._load_wardrobe()
+        index = self._index()
+        graph = wardrobe_cache.peek(self.wardrobe_file, self._stamp(), 'compatibility')
+        entry = {'op': op}
+        if op == 'delete':
+            entry['id'] = item_id
+        else:
+            item_id = item['id']
+            entry['item'] = item
+        derived = {'index': index.changed(item_id, item)}
+        if graph is not None:
+            derived['compatibility'] = graph_changed(graph, wardrobe['items'], item_id, item)
+        # La prenda que se sustituye o borra se toma del índice: las estadísticas se ajustan en O(1)
+        old_items = {item_id: index.get(item_id)} if op != 'add' else None
+        self._commit_entries(wardrobe, [entry], derived=derived, old_items=old_items)
+    
+    def _commit_entries(self, wardrobe, entries, derived=None, old_items=None):
+        """
+        Aplica entradas del log (sin 'seq', se numeran aquí) al armario de
+        la caché y publica la copia resultante, con los datos calculados
+        que ya vengan actualizados (el resto se recalcula al usarse).
+        old_items: {id: prenda que sale} ya conocidas (ver apply_entry).
+        
+        - modo JSON: se reescribe el JSON entero
+        - modo log: se añade una línea por entrada con la operación y la
+          prenda (tamaño O(1); las aristas se recalculan desde las prendas)
+        """
+        seq = wardrobe.get('journal_seq', 0)
+        entries = [{'seq': n, **entry} for n, entry in enumerate(entries, seq + 1)]
+        updated = apply_entries_copy(wardrobe, entries, old_items)
+        
+        if not self.journal:
+            self._save_wardrobe(updated, derived=derived)
+            return
+        
+        append_entries(self.journal_file, entries)
+        wardrobe_cache.put(self.wardrobe_file, self._stamp(), updated, derived=derived)
+        if os.path.getsize(self.journal_file) > JOURNAL_MAX_BYTES:
+            self._schedule_compaction()
+    
+    def _schedule_compaction(self):
+        """Compacta el log en un hilo aparte (uno por armario a la vez)"""
+        with _compacting_lock:
+            if self.wardrobe_file in _compacting:
+                return
+            _compacting.add(self.wardrobe_file)
+        
+        def run():
+            try:
+                self.compact()
+            except OSError as e:
+                print(f"Error compactando {self.journal_file}: {e}")
+            finally:
+                with _compacting_lock:
+                    _compacting.discard(self.wardrobe_file)
+        
+        threading.Thread(target=run, name='wardrobe-compaction', daemon=True).start()
+    
+    def compact(self):
+        """
+        Vuelca el armario (JSON + log) en el JSON y borra el log.
+        El JSON se sustituye de forma atómica; si se cae antes de
+        borrar el log, sus entradas ya están incluidas (journal_seq) y se ignoran.
+        
+        Returns:
+            bool: True si había log que compactar
+        """
+        with self._write_lock():
+            if not os.path.exists(self.journal_file):
+                return False
+            stamp = self._stamp()
+            wardrobe = self._load_wardrobe()
+            # Mismas prendas: el índice y el grafo siguen valiendo
+            derived = self._derived(stamp)
+            atomic_write_json(self.wardrobe_file, wardrobe, indent=2, ensure_ascii=False)
+            os.remove(self.journal_file)
+            wardrobe_cache.put(self.wardrobe_file, self._stamp(), wardrobe, derived=derived)
+            return True
 
 
 # === EJEMPLO DE USO ===
 
+def check_wardrobes(directory='data/wardrobes', repair=False):
+    """
+    Comprobación de consistencia de las estadísticas de todos los armarios
+    guardados (WardrobeManager.check_statistics, con su log si lo tienen).
+    
+    Args:
+        repair: bool - guardar las recontadas en los que no coincidan
+    
+    Returns:
+        dict: {fichero: {contador: (guardado, recontado)}} de los que no coinciden
+    """
+    results = {}
+    if not os.path.isdir(directory):
+        return results
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.json'):
+            continue
+        path = os.path.join(directory, name)
+        differences = WardrobeManager.for_file(path).check_statistics(repair=repair)
+        if differences:
+            results[path] = differences
+    return results
+
+
 def ejemplo_uso():
     """Ejemplos de cómo usar el WardrobeManager"""
     
@@ -306,7 +590,7 @@ def ejemplo_uso():
         'tipo': 'superior',
         'color': 'blanco',
         'ocasion': ['formal', 'casual'],
-        'clima_apropiado': ['templado', 'calor'],
+        'clima': ['templado', 'calor'],
         'fit': 'normal',
         'marca': 'Zara',
         'notas': 'Muy versátil, combina con todo'
@@ -317,7 +601,7 @@ def ejemplo_uso():
         'tipo': 'inferior',
         'color': 'azul',
         'ocasion': ['casual'],
-        'clima_apropiado': ['templado', 'frio'],
+        'clima': ['templado', 'frio'],
         'fit': 'ajustada'
     })
     
@@ -352,4 +636,15 @@ def ejemplo_uso():
 
 
 if __name__ == "__main__":
-    ejemplo_uso()
+    # python wardrobe_manager.py check-stats [--repair]
+    #   -> comprueba (y repara) las estadísticas guardadas de data/wardrobes
+    if len(sys.argv) > 1 and sys.argv[1] == 'check-stats':
+        repair = '--repair' in sys.argv[2:]
+        results = check_wardrobes(repair=repair)
+        print(f" {len(results)} armarios con estadísticas desactualizadas" + (" (reparados)" if repair and results else ""))
+        for path, differences in results.items():
+            print(f"   - {path}")
+            for counter, (stored, recounted) in differences.items():
+                print(f"       {counter}: guardado {stored}, recontado {recounted}")
+    else:
+        ejemplo_uso()
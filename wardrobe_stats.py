@@ -0,0 +1,67 @@
+# Estadísticas del armario (prendas por tipo, ocasión, clima y color).
+# Se guardan con el armario ('stats') y cada cambio las ajusta sumando o
+# restando solo la prenda afectada (apply_entry), así get_statistics y
+# suggest_missing_items no recorren las prendas.
+
+# Contador -> campo de la prenda
+STAT_FIELDS = (
+    ('by_type', 'tipo'),
+    ('by_occasion', 'ocasion'),
+    ('by_climate', 'clima'),
+    ('by_color', 'color'),
+)
+
+
+def empty_stats():
+    stats = {'total_items': 0}
+    for counter, _ in STAT_FIELDS:
+        stats[counter] = {}
+    return stats
+
+
+def _values(item, field):
+    if field == 'tipo':
+        return [item.get('tipo', 'unknown')]
+    return item.get(field, [])
+
+
+def count_item(stats, item, sign=1):
+    """
+    Suma (sign=1) o resta (sign=-1) una prenda a las estadísticas, en el
+    sitio. Los valores que llegan a 0 desaparecen, igual que al recontar.
+    """
+    stats['total_items'] += sign
+    for counter, field in STAT_FIELDS:
+        counts = stats[counter]
+        for value in _values(item, field):
+            n = counts.get(value, 0) + sign
+            if n:
+                counts[value] = n
+            else:
+                counts.pop(value, None)
+
+
+def build_stats(items):
+    """Estadísticas recontadas desde cero"""
+    stats = empty_stats()
+    for item in items:
+        count_item(stats, item)
+    return stats
+
+
+def copy_stats(stats):
+    """Copia independiente (los contadores son dicts pequeños)"""
+    return {key: dict(value) if isinstance(value, dict) else value for key, value in stats.items()}
+
+
+def stats_differences(stats, items):
+    """
+    Comprobación de consistencia: compara las estadísticas guardadas con
+    las recontadas desde las prendas.
+
+    Returns:
+        dict: {contador: (guardado, recontado)} solo de los que no coinciden
+    """
+    expected = build_stats(items)
+    stats = stats or {}
+    return {key: (stats.get(key), value) for key, value in expected.items() if stats.get(key) != value}